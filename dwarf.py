@@ -18,16 +18,10 @@ import os
 import sys
 import argparse
 import shutil
-
-import frida
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QIcon
-from PyQt5.QtWidgets import QApplication
+import threading
 
 from lib import utils
-from lib.git import Git
-from lib.prefs import Prefs
-from ui.app import AppWindow
+from lib.startup_profiler import StartupProfiler
 
 
 def process_args():
@@ -63,6 +57,18 @@ def process_args():
         action='store_true',
         help="debug outputs from frida script")
 
+    parser.add_argument(
+        "--headless",
+        type=str,
+        metavar="SCRIPT",
+        help="run the python session SCRIPT against the target without ui and exit")
+
+    parser.add_argument(
+        "--profile-startup",
+        action='store_true',
+        help="print startup timings and hot spots once the first window is up and exit, "
+             "exit code is 1 when over the startup budget or when network modules were imported")
+
     args = parser.parse_args()
     return args
 
@@ -72,36 +78,89 @@ def _on_restart():
     os.execl(sys.executable, os.path.abspath(__file__), *sys.argv)
 
 
+def _check_frida_update(_prefs):
+    """ runs in background, a new frida is installed at next start by _install_frida_update
+    """
+    import frida
+    from lib import prefs
+    from lib.git import Git
+
+    _git = Git()
+    remote_frida = _git.get_frida_version()
+    local_frida = frida.__version__
+
+    if remote_frida and local_frida != remote_frida[0]['tag_name']:
+        version = remote_frida[0]['tag_name']
+        if _prefs.get(prefs.FRIDA_PENDING_UPDATE) != version:
+            _prefs.put(prefs.FRIDA_PENDING_UPDATE, version)
+            print('frida ' + version + ' will be installed at next start')
+
+
+def _install_frida_update(_prefs):
+    """ install the frida found by the last update check, before frida is imported
+    """
+    from lib import prefs
+
+    version = _prefs.get(prefs.FRIDA_PENDING_UPDATE)
+    if not version:
+        return
+    # cleared first, a failing install is not retried on every start
+    _prefs.put(prefs.FRIDA_PENDING_UPDATE, '')
+
+    print('Updating local frida version to ' + version)
+    try:
+        res = utils.do_shell_command('pip3 install frida --upgrade --user', timeout=300)
+        #from pip import _internal
+        #ret = _internal.main(["install", "--upgrade", "--user", "frida"])
+        if res is None:
+            print('failed to update local frida')
+        elif 'Successfully installed frida-' + version in res:
+            print('frida updated to ' + version)
+        elif 'Requirement already up-to-date' in res:
+            if os.path.exists('.git_cache'):
+                shutil.rmtree('.git_cache', ignore_errors=True)
+        else:
+            print('failed to update local frida')
+            print(res)
+    except Exception as e: # pylint: disable=broad-except, invalid-name
+        print('failed to update local frida')
+        print(str(e))
+
+
 def run_dwarf():
     """ fire it up
     """
+    args = process_args()
+
+    if args.headless:
+        # no qt, no update checks
+        from lib.headless import run_headless
+        sys.exit(run_headless(args))
+
+    profiler = StartupProfiler(enabled=args.profile_startup)
+
+    from PyQt5.QtCore import Qt, QTimer
+    from PyQt5.QtGui import QIcon
+    from PyQt5.QtWidgets import QApplication
+
+    from lib import prefs
+    from lib.prefs import Prefs
+
     _prefs = Prefs()
     local_update_disabled = _prefs.get('disable_local_frida_update', False)
+    if not local_update_disabled and not args.profile_startup:
+        # frida isn't imported yet
+        _install_frida_update(_prefs)
 
-    if not local_update_disabled:
-        _git = Git()
-        remote_frida = _git.get_frida_version()
-        local_frida = frida.__version__
+    from ui.app import AppWindow
+    profiler.mark('imports')
+    # network stuff is imported when it's used
+    profiler.check_not_loaded('requests')
 
-        if remote_frida and local_frida != remote_frida[0]['tag_name']:
-            print('Updating local frida version to ' + remote_frida[0]['tag_name'])
-            try:
-                res = utils.do_shell_command('pip3 install frida --upgrade --user')
-                #from pip import _internal
-                #ret = _internal.main(["install", "--upgrade", "--user", "frida"])
-                if 'Successfully installed frida-' + remote_frida[0]['tag_name'] in res:
-                    _on_restart()
-                elif 'Requirement already up-to-date' in res:
-                    if os.path.exists('.git_cache'):
-                        shutil.rmtree('.git_cache', ignore_errors=True)
-                else:
-                    print('failed to update local frida')
-                    print(res)
-            except Exception as e: # pylint: disable=broad-except, invalid-name
-                print('failed to update local frida')
-                print(str(e))
+    if not local_update_disabled and not args.profile_startup:
+        # network is kept off the startup path, the check only records the version to install
+        threading.Thread(target=_check_frida_update, args=(_prefs,), daemon=True).start()
 
-    args = process_args()
     os.environ["QT_AUTO_SCREEN_SCALE_FACTOR"] = "1"
 
     if os.name == 'nt':
@@ -157,9 +216,21 @@ def run_dwarf():
             _icon = QIcon(utils.resource_path('assets/dwarf.png'))
             qapp.setWindowIcon(_icon)
 
+    profiler.mark('qapplication')
+
     app_window = AppWindow(args)
     app_window.setWindowIcon(_icon)
     app_window.onRestart.connect(_on_restart)
+    profiler.mark('app window')
+
+    if args.profile_startup:
+        def _on_first_window():
+            profiler.mark('event loop')
+            within_budget = profiler.report(_prefs.get(prefs.STARTUP_BUDGET, 2000))
+            qapp.exit(0 if within_budget else 1)
+
+        # fires once the event loop runs, windows are shown by then
+        QTimer.singleShot(0, _on_first_window)
 
     try:
         sys.exit(qapp.exec_())
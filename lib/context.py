@@ -15,7 +15,6 @@ Dwarf - Copyright (C) 2019 Giovanni Rocca (iGio90)
     along with this program.  If not, see <https://www.gnu.org/licenses/>
 """
 from lib.register import Register
-import unicorn
 
 
 class Context(object):
@@ -50,6 +49,8 @@ class EmulatorContext(object):
             raise Exception('unsupported arch')
 
         self._unicorn_registers = {}
+        # unicorn is imported with the emulator, not at module level
+        self._uc_error = unicorn.UcError
 
         for v in unicorn_consts.__dict__:
             if '_REG_' in v:
@@ -63,5 +64,5 @@ class EmulatorContext(object):
         for reg in self._unicorn_registers:
             try:
                 self.__dict__[reg] = uc.reg_read(self._unicorn_registers[reg])
-            except unicorn.unicorn.UcError:
+            except self._uc_error:
                 pass
@@ -92,6 +92,13 @@ function Dwarf() {
     this.java_handlers = {};
     this.memory_watchers = {};
     this.memory_addresses = [];
+    this.memoryScan = null;
+    this.memoryScanId = 0;
+    this.valueScan = null;
+    this.valueScanId = 0;
+
+    // execution times (ms) of apis and sends, pulled by the diagnostics panel
+    this.stats = { 'api': {}, 'send': {} };
 
     // setup pc register
     this.procedure_call_register = null;
@@ -118,13 +125,13 @@ function Dwarf() {
                 var returnval = { 'memory': { 'operation': operation, 'address': address } };
                 if ((watcher.flags & MEMORY_ACCESS_READ) && (operation === 'read')) {
                     MemoryAccessMonitor.disable();
-                    loggedSend('watcher:::' + JSON.stringify(returnval) + ':::' + tid);
+                    loggedSend('watcher', { 'exception': returnval });
                 } else if ((watcher.flags & MEMORY_ACCESS_WRITE) && (operation === 'write')) {
                     MemoryAccessMonitor.disable();
-                    loggedSend('watcher:::' + JSON.stringify(returnval) + ':::' + tid);
+                    loggedSend('watcher', { 'exception': returnval });
                 } else if ((watcher.flags & MEMORY_ACCESS_EXECUTE) && (operation === 'execute')) {
                     MemoryAccessMonitor.disable();
-                    loggedSend('watcher:::' + JSON.stringify(returnval) + ':::' + tid);
+                    loggedSend('watcher', { 'exception': returnval });
                 } else {
                     watcher = null;
                 }
@@ -184,19 +191,19 @@ function Dwarf() {
                         var operation = exception['memory']['operation'];
                         if ((watcher.flags & MEMORY_ACCESS_READ) && (operation === 'read')) {
                             watcher.restore();
-                            loggedSend('watcher:::' + JSON.stringify(exception) + ':::' + tid);
+                            loggedSend('watcher', { 'exception': exception });
                         } else if ((watcher.flags & MEMORY_ACCESS_WRITE) && (operation === 'write')) {
                             watcher.restore();
-                            loggedSend('watcher:::' + JSON.stringify(exception) + ':::' + tid);
+                            loggedSend('watcher', { 'exception': exception });
                         } else if ((watcher.flags & MEMORY_ACCESS_EXECUTE) && (operation === 'execute')) {
                             watcher.restore();
-                            loggedSend('watcher:::' + JSON.stringify(exception) + ':::' + tid);
+                            loggedSend('watcher', { 'exception': exception });
                         } else {
                             watcher = null;
                         }
                     } else {
                         watcher.restore();
-                        loggedSend('watcher:::' + JSON.stringify(exception) + ':::' + tid);
+                        loggedSend('watcher', { 'exception': exception });
                     }
                 } else {
                     watcher = null;
@@ -227,6 +234,19 @@ function Dwarf() {
         return hexStr;
     };
 
+    this._packPointers = function (pointers) {
+        // pack a list of pointers into raw bytes to skip json on the py side
+        if (pointers.length === 0) {
+            return null;
+        }
+        var size = pointers.length * Process.pointerSize;
+        var buf = Memory.alloc(size);
+        for (var i = 0; i < pointers.length; i++) {
+            buf.add(i * Process.pointerSize).writePointer(ptr(pointers[i]));
+        }
+        return buf.readByteArray(size);
+    };
+
     this._hex2a = function (hex) {
         for (var bytes = [], c = 0; c < hex.length; c += 2)
             bytes.push(parseInt(hex.substr(c, 2), 16));
@@ -252,31 +272,124 @@ function Dwarf() {
     };
 
     this._loopApi = function (that) {
+        var tid = Process.getCurrentThreadId();
+
         if (DEBUG) {
-            _log('[' + Process.getCurrentThreadId() + '] looping api');
+            _log('[' + tid + '] looping api');
+        }
+
+        var hook_context = getDwarf().hook_contexts[tid];
+        if (typeof hook_context === 'undefined') {
+            return;
         }
 
-        var op = recv('' + Process.getCurrentThreadId(), function (payload) { });
-        op.wait();
+        while (true) {
+            var next_api = null;
 
-        var hook_context = getDwarf().hook_contexts[Process.getCurrentThreadId()];
+            // park the thread until the py side post an api call into our mailbox
+            var op = recv('' + tid, function (payload) {
+                next_api = payload;
+            });
+            op.wait();
 
-        if (typeof hook_context !== 'undefined') {
-            while (hook_context.next_api === null) {
-                Thread.sleep(0.2);
+            if (next_api === null) {
+                continue;
             }
 
-            if (DEBUG) {
-                _log('[' + Process.getCurrentThreadId() + '] executing ' + hook_context.next_api[0]);
-            }
+            var result = null;
+            var error = null;
+            var released = false;
+
+            if (typeof next_api['batch'] !== 'undefined') {
+                if (DEBUG) {
+                    _log('[' + tid + '] executing batch of ' + next_api['batch'].length + ' apis');
+                }
+
+                result = getDwarf()._batchApi(that, next_api['batch']);
+                released = next_api['batch'].some(function (call) {
+                    return call[0] === 'release';
+                });
+            } else if (typeof next_api['api'] !== 'undefined') {
+                if (DEBUG) {
+                    _log('[' + tid + '] executing ' + next_api['api']);
+                }
+
+                var args = next_api['args'];
+                if (typeof args === 'undefined' || args === null) {
+                    args = [];
+                }
 
-            hook_context.next_api_result = api[hook_context.next_api[0]].apply(that, hook_context.next_api[1]);
-            if (hook_context.next_api[0] !== 'release') {
-                hook_context.next_api = null;
-                getDwarf()._loopApi(that);
+                var start = Date.now();
+                try {
+                    result = api[next_api['api']].apply(that, args);
+                } catch (e) {
+                    _log_err('_loopApi', e);
+                    error = e.toString();
+                }
+                getDwarf()._recordStat('api', next_api['api'], Date.now() - start);
+                released = next_api['api'] === 'release';
             } else {
-                hook_context.next_api = null;
+                continue;
+            }
+
+            getDwarf()._sendApiResult(next_api['id'], result, error);
+
+            if (released) {
+                break;
+            }
+        }
+    };
+
+    this._batchApi = function (that, calls) {
+        var batchStart = Date.now();
+        var results = [];
+        for (var i = 0; i < calls.length; i++) {
+            var args = calls[i][1];
+            if (typeof args === 'undefined' || args === null) {
+                args = [];
+            }
+            var start = Date.now();
+            try {
+                var result = api[calls[i][0]].apply(that, args);
+                if (result instanceof ArrayBuffer) {
+                    // raw data can't travel inside the json array
+                    results.push({ 'raw': getDwarf()._ba2hex(result) });
+                } else {
+                    results.push({ 'result': typeof result === 'undefined' ? null : result });
+                }
+            } catch (e) {
+                _log_err('_batchApi', e);
+                results.push({ 'error': e.toString() });
+            }
+            getDwarf()._recordStat('api', calls[i][0], Date.now() - start);
+        }
+        getDwarf()._recordStat('api', 'batch', Date.now() - batchStart);
+        return results;
+    };
+
+    this._recordStat = function (table, key, elapsed) {
+        var stat = this.stats[table][key];
+        if (typeof stat === 'undefined') {
+            stat = { 'count': 0, 'time': 0, 'max': 0 };
+            this.stats[table][key] = stat;
+        }
+        stat['count'] += 1;
+        stat['time'] += elapsed;
+        if (elapsed > stat['max']) {
+            stat['max'] = elapsed;
+        }
+    };
+
+    this._sendApiResult = function (id, result, error) {
+        if (error !== null) {
+            loggedSend('api_result', { 'id': id, 'error': error });
+        } else if (result instanceof ArrayBuffer) {
+            loggedSend('api_result', { 'id': id, 'raw': true }, result);
+        } else {
+            if (typeof result === 'undefined') {
+                result = null;
             }
+            loggedSend('api_result', { 'id': id, 'result': result });
         }
     };
 
@@ -293,7 +406,7 @@ function Dwarf() {
                 if (DEBUG) {
                     _log('[' + Process.getCurrentThreadId() + '] setting context ' + prop + ': ' + value);
                 }
-                send('set_context_value:::' + prop + ':::' + value);
+                send({ 'type': 'set_context_value', 'property': prop, 'value': '' + value });
                 object[prop] = value;
                 return true;
             }
@@ -464,17 +577,16 @@ function Dwarf() {
             data['arch'] = Process.arch;
             data['platform'] = Process.platform;
             data['java'] = Java.available;
-            data['modules'] = Process.enumerateModulesSync();
             data['pid'] = Process.id;
             data['pointerSize'] = Process.pointerSize;
-            data['ranges'] = Process.enumerateRangesSync('---');
+            // modules and ranges are fetched in pages once their panels are shown
         }
 
         if (DEBUG) {
             _log('[' + tid + '] sendInfos - dispatching infos');
         }
 
-        loggedSend('set_context:::' + JSON.stringify(data));
+        loggedSend('set_context', data);
     };
 
     this.start = function () {
@@ -528,7 +640,7 @@ function Dwarf() {
                         for (var s in getDwarf().nativeOnLoads) {
                             if (w.indexOf(s) >= 0) {
                                 var hook = getDwarf().nativeOnLoads[s];
-                                loggedSend("native_on_load_callback:::" + hook.module + ':::' + 0 + ':::' + Process.getCurrentThreadId());
+                                loggedSend('native_on_load_callback', { 'module': hook.module, 'base': 0 });
                                 getDwarf()._onHook(REASON_HOOK, this.context.pc, this.context, hook, null);
                             }
                         }
@@ -542,7 +654,7 @@ function Dwarf() {
                         for (var s in getDwarf().nativeOnLoads) {
                             if (w.indexOf(s) >= 0) {
                                 var hook = getDwarf().nativeOnLoads[s];
-                                loggedSend("native_on_load_callback:::" + hook.module + ':::' + 0 + ':::' + Process.getCurrentThreadId());
+                                loggedSend('native_on_load_callback', { 'module': hook.module, 'base': 0 });
                                 getDwarf()._onHook(REASON_HOOK, this.context.pc, this.context, hook, null);
                             }
                         }
@@ -556,7 +668,7 @@ function Dwarf() {
                         for (var s in getDwarf().nativeOnLoads) {
                             if (w.indexOf(s) >= 0) {
                                 var hook = getDwarf().nativeOnLoads[s];
-                                loggedSend("native_on_load_callback:::" + hook.module + ':::' + 0 + ':::' + Process.getCurrentThreadId());
+                                loggedSend('native_on_load_callback', { 'module': hook.module, 'base': 0 });
                                 getDwarf()._onHook(REASON_HOOK, this.context.pc, this.context, hook, null);
                             }
                         }
@@ -570,7 +682,7 @@ function Dwarf() {
                         for (var s in getDwarf().nativeOnLoads) {
                             if (w.indexOf(s) >= 0) {
                                 var hook = getDwarf().nativeOnLoads[s];
-                                loggedSend("native_on_load_callback:::" + hook.module + ':::' + 0 + ':::' + Process.getCurrentThreadId());
+                                loggedSend('native_on_load_callback', { 'module': hook.module, 'base': 0 });
                                 getDwarf()._onHook(REASON_HOOK, this.context.pc, this.context, hook, null);
                             }
                         }
@@ -607,7 +719,7 @@ function Dwarf() {
 
                     Interceptor.attach(phdr_tgds_ptr, function (args) {
                         if (hook !== null) {
-                            loggedSend("native_on_load_callback:::" + hook.module + ':::' + args[2] + ':::' + Process.getCurrentThreadId());
+                            loggedSend('native_on_load_callback', { 'module': hook.module, 'base': args[2] });
                             getDwarf()._onHook(REASON_HOOK, this.context.pc, this.context, hook, null);
                             hook = null;
                         }
@@ -616,7 +728,7 @@ function Dwarf() {
                     Interceptor.attach(do_dlopen_ptr, function (args) {
                         try {
                             var w = Memory.readCString(args[0]);
-                            loggedSend('native_on_load_module_loading:::' + Process.getCurrentThreadId() + ':::' + w);
+                            loggedSend('native_on_load_module_loading', { 'module': w });
                             for (var s in getDwarf().nativeOnLoads) {
                                 if (w.indexOf(s) >= 0) {
                                     hook = getDwarf().nativeOnLoads[s];
@@ -643,13 +755,13 @@ function Dwarf() {
 
                                 try {
                                     var w = Memory.readCString(this.context.esi);
-                                    loggedSend('native_on_load_module_loading:::' + Process.getCurrentThreadId() + ':::' + w);
+                                    loggedSend('native_on_load_module_loading', { 'module': w });
                                     for (var s in getDwarf().nativeOnLoads) {
                                         if (w.indexOf(s) >= 0) {
                                             hook = getDwarf().nativeOnLoads[s];
                                             if (typeof hook !== 'undefined') {
                                                 var base = Process.findModuleByName(w).base;
-                                                loggedSend("native_on_load_callback:::" + hook.module + ':::' + base + ':::' + Process.getCurrentThreadId());
+                                                loggedSend('native_on_load_callback', { 'module': hook.module, 'base': base });
                                                 getDwarf()._onHook(REASON_HOOK, this.context.pc, this.context, hook, null);
                                             }
                                         }
@@ -669,6 +781,28 @@ function Dwarf() {
 
 function DwarfApi() {
     this._traced_tid = 0;
+    this._crc32Table = null;
+
+    this._crc32 = function (bytes) {
+        // same crc32 of python zlib, so hashes can be compared with the ones of a snapshot
+        var table = api._crc32Table;
+        if (table === null) {
+            table = new Uint32Array(256);
+            for (var n = 0; n < 256; n++) {
+                var c = n;
+                for (var k = 0; k < 8; k++) {
+                    c = (c & 1) ? (0xEDB88320 ^ (c >>> 1)) : (c >>> 1);
+                }
+                table[n] = c;
+            }
+            api._crc32Table = table;
+        }
+        var crc = 0xFFFFFFFF;
+        for (var i = 0; i < bytes.length; i++) {
+            crc = table[(crc ^ bytes[i]) & 0xFF] ^ (crc >>> 8);
+        }
+        return (crc ^ 0xFFFFFFFF) >>> 0;
+    };
 
     this._detach = function () {
         for (var h in getDwarf().hooks) {
@@ -682,32 +816,6 @@ function DwarfApi() {
         // wait all contexts to be released
     };
 
-    this._internalMemoryScan = function (start, size, pattern) {
-        if (size > 4096) {
-            // scan in chunks of 4096
-            var _start = parseInt(start);
-            var end = _start + size;
-            var result = [];
-            var _break = false;
-            while (true) {
-                var s = 4096;
-                if (_start + s > end) {
-                    s = end - _start;
-                    _break = true;
-                }
-                result = result.concat(Memory.scanSync(start, s, pattern));
-                if (_break || result.length >= 100) {
-                    break;
-                }
-                start = start.add(size);
-                _start += s;
-            }
-            return result;
-        } else {
-            return Memory.scanSync(start, size, pattern);
-        }
-    };
-
     this.addWatcher = function (pt, flags) {
         pt = ptr(pt);
         // default '--?'
@@ -723,7 +831,7 @@ function DwarfApi() {
                 }
                 getDwarf().memory_watchers[pt] = new MemoryWatcher(pt, range.protection, flags);
                 getDwarf().memory_addresses.push({ 'base': pt, 'size': 1 });
-                loggedSend('watcher_added:::' + pt + ':::' + flags);
+                loggedSend('watcher_added', { 'address': pt, 'flags': flags });
             }
             MemoryAccessMonitor.enable(getDwarf().memory_addresses, { onAccess: getDwarf()._onMemoryAccess });
             return;
@@ -735,11 +843,30 @@ function DwarfApi() {
                 return;
             }
             getDwarf().memory_watchers[pt] = new MemoryWatcher(pt, range.protection, flags);
-            loggedSend('watcher_added:::' + pt + ':::' + flags);
+            loggedSend('watcher_added', { 'address': pt, 'flags': flags });
         }
         getDwarf().memory_watchers[pt].watch();
     };
 
+    this.cancelMemoryScan = function () {
+        var scan = getDwarf().memoryScan;
+        if (scan !== null) {
+            scan.cancel();
+            getDwarf().memoryScan = null;
+        }
+    };
+
+    this.cancelValueScan = function () {
+        if (getDwarf().valueScan !== null) {
+            getDwarf().valueScan.cancel();
+        }
+    };
+
+    this.clearValueScan = function () {
+        api.cancelValueScan();
+        getDwarf().valueScan = null;
+    };
+
     this.deleteHook = function (key) {
         if (typeof key === 'number') {
             key = getDwarf()._dethumbify(key);
@@ -751,10 +878,10 @@ function DwarfApi() {
 
         if (typeof hook === 'undefined') {
             if (typeof getDwarf().nativeOnLoads[key] !== 'undefined') {
-                loggedSend('hook_deleted:::native_on_load:::' + key);
+                loggedSend('hook_deleted', { 'hook_type': 'native_on_load', 'key': key });
                 delete getDwarf().nativeOnLoads[key];
             } else if (typeof getDwarf().javaOnLoads[key] !== 'undefined') {
-                loggedSend('hook_deleted:::java_on_load:::' + key);
+                loggedSend('hook_deleted', { 'hook_type': 'java_on_load', 'key': key });
                 delete getDwarf().javaOnLoads[key];
             } else {
                 _log('undefined hook with key: ' + key);
@@ -765,12 +892,12 @@ function DwarfApi() {
         if (hook.interceptor !== null) {
             hook.interceptor.detach();
             delete getDwarf().hooks[key];
-            loggedSend('hook_deleted:::native:::' + key);
+            loggedSend('hook_deleted', { 'hook_type': 'native', 'key': key });
         } else if (hook.javaClassMethod !== null) {
             api.hookJavaConstructor(hook.javaClassMethod, null, true);
             api.hookJavaMethod(hook.javaClassMethod, null, true);
             delete getDwarf().hooks[key];
-            loggedSend('hook_deleted:::java:::' + key);
+            loggedSend('hook_deleted', { 'hook_type': 'java', 'key': key });
         }
     };
 
@@ -794,11 +921,11 @@ function DwarfApi() {
         useCache = useCache | false;
 
         if (useCache && javaHelper !== null && javaHelper._java_classes.length > 0) {
-            loggedSend('enumerate_java_classes_start:::');
+            loggedSend('enumerate_java_classes_start');
             for (var i = 0; i < javaHelper._java_classes.length; i++) {
-                send('enumerate_java_classes_match:::' + javaHelper._java_classes[i]);
+                send({ 'type': 'enumerate_java_classes_match', 'className': javaHelper._java_classes[i] });
             }
-            send('enumerate_java_classes_complete:::');
+            send({ 'type': 'enumerate_java_classes_complete' });
         } else {
             // invalidate cache
             if (javaHelper !== null) {
@@ -806,22 +933,22 @@ function DwarfApi() {
             }
 
             Java.performNow(function () {
-                loggedSend('enumerate_java_classes_start:::');
+                loggedSend('enumerate_java_classes_start');
                 try {
                     Java.enumerateLoadedClasses({
                         onMatch: function (className) {
                             if (javaHelper !== null) {
                                 javaHelper._java_classes.push(className);
                             }
-                            send('enumerate_java_classes_match:::' + className);
+                            send({ 'type': 'enumerate_java_classes_match', 'className': className });
                         },
                         onComplete: function () {
-                            send('enumerate_java_classes_complete:::');
+                            send({ 'type': 'enumerate_java_classes_complete' });
                         }
                     });
                 } catch (e) {
                     _log_err('enumerateJavaClasses', e);
-                    loggedSend('enumerate_java_classes_complete:::');
+                    loggedSend('enumerate_java_classes_complete');
                 }
             });
         }
@@ -841,8 +968,7 @@ function DwarfApi() {
                         "TOKEN").match(/\sTOKEN(.*)\(/)[1]);
                 });
                 var result = getDwarf().uniqueBy(parsedMethods, JSON.stringify);
-                loggedSend('enumerate_java_methods_complete:::' + className + ':::' +
-                    JSON.stringify(result));
+                loggedSend('enumerate_java_methods_complete', { 'className': className, 'methods': result });
             });
         }
     };
@@ -978,11 +1104,48 @@ function DwarfApi() {
         }
     };
 
+    this.getSymbolsByAddress = function (addresses) {
+        // one DebugSymbol per address, a batch resolved with a single call
+        return addresses.map(function (pt) {
+            try {
+                return DebugSymbol.fromAddress(ptr(pt));
+            } catch (e) {
+                return {};
+            }
+        });
+    };
+
     this.javaBacktrace = function () {
         return Java.use("android.util.Log")
             .getStackTraceString(Java.use("java.lang.Exception").$new());
     };
 
+    this.hashPages = function (ranges, pageSize) {
+        // crc32 of each page of the ranges, in order, as little endian uint32. unreadable pages are 0
+        ranges = JSON.parse(ranges);
+        pageSize = pageSize || Process.pageSize;
+        var count = 0;
+        for (var i = 0; i < ranges.length; i++) {
+            count += Math.ceil(ranges[i]['size'] / pageSize);
+        }
+        var hashes = new Uint32Array(count);
+        var index = 0;
+        for (i = 0; i < ranges.length; i++) {
+            var start = ptr(ranges[i]['start']);
+            var size = ranges[i]['size'];
+            for (var offset = 0; offset < size; offset += pageSize) {
+                try {
+                    var page = Memory.readByteArray(start.add(offset), Math.min(pageSize, size - offset));
+                    hashes[index] = api._crc32(new Uint8Array(page));
+                } catch (e) {
+                    hashes[index] = 0;
+                }
+                index++;
+            }
+        }
+        return hashes.buffer;
+    };
+
     this.hookAllJavaMethods = function (className) {
         if (!Java.available) {
             return false;
@@ -1038,7 +1201,7 @@ function DwarfApi() {
                 hook.logic = logic;
             }
             getDwarf().javaOnLoads[clazz] = hook;
-            loggedSend('hook_java_on_load_callback:::' + clazz);
+            loggedSend('hook_java_on_load_callback', { 'className': clazz });
         }
     };
 
@@ -1055,7 +1218,7 @@ function DwarfApi() {
                 hook.logic = logic;
             }
             getDwarf().nativeOnLoads[moduleName] = hook;
-            loggedSend('hook_native_on_load_callback:::' + moduleName);
+            loggedSend('hook_native_on_load_callback', { 'module': moduleName });
         }
     };
 
@@ -1270,7 +1433,7 @@ function DwarfApi() {
     };
 
     this.log = function (what) {
-        loggedSend('log:::' + what);
+        loggedSend('log', { 'what': '' + what });
     };
 
     this.nativeBacktrace = function (ctx) {
@@ -1278,30 +1441,17 @@ function DwarfApi() {
             .map(DebugSymbol.fromAddress);
     };
 
-    this.memoryScan = function (start, size, pattern) {
-        var result = [];
-        try {
-            result = api._internalMemoryScan(ptr(start), size, pattern);
-        } catch (e) {
-            _log_err('memoryScan', e);
-        }
-        loggedSend('memoryscan_result:::' + JSON.stringify(result));
+    this.memoryScan = function (start, size, pattern, chunkSize) {
+        return api.memoryScanList(JSON.stringify([{ 'start': start, 'size': size }]), JSON.stringify([pattern]), chunkSize);
     };
 
-    this.memoryScanList = function (ranges, pattern) {
-        ranges = JSON.parse(ranges);
-        var result = [];
-        for (var i = 0; i < ranges.length; i++) {
-            try {
-                result = result.concat(api._internalMemoryScan(ptr(ranges[i]['start']), ranges[i]['size'], pattern));
-            } catch (e) {
-                _log_err('memoryScanList', e);
-            }
-            if (result.length >= 100) {
-                break;
-            }
-        }
-        loggedSend('memoryscan_result:::' + JSON.stringify(result));
+    this.memoryScanList = function (ranges, patterns, chunkSize) {
+        // a single scan runs at once, starting a new one cancels the previous
+        api.cancelMemoryScan();
+        var scan = new MemoryScan(++getDwarf().memoryScanId, JSON.parse(ranges), JSON.parse(patterns), chunkSize);
+        getDwarf().memoryScan = scan;
+        scan.start();
+        return scan.id;
     };
 
     this.isPrintable = function (char) {
@@ -1406,7 +1556,7 @@ function DwarfApi() {
         var hc = getDwarf().hook_contexts[tid];
         if (typeof hc !== 'undefined') {
             console.log('resuming := ' + hc.tid);
-            loggedSend('release:::' + hc.tid)
+            loggedSend('release', { 'tid': hc.tid });
         }
     };
 
@@ -1414,14 +1564,14 @@ function DwarfApi() {
         if (!getDwarf().proc_resumed) {
             getDwarf().proc_resumed = true;
             console.log('Resuming process...');
-            loggedSend('resume:::0');
+            loggedSend('resume');
         } else {
             console.log('Error: Process already resumed');
         }
     };
 
     this.releaseFromJs = function (tid) {
-        send('release_js:::' + tid);
+        send({ 'type': 'release_js', 'tid': tid });
     };
 
     this.removeWatcher = function (pt) {
@@ -1436,7 +1586,7 @@ function DwarfApi() {
                 });
             }
             delete getDwarf().memory_watchers[pt];
-            loggedSend('watcher_removed:::' + pt);
+            loggedSend('watcher_removed', { 'address': pt });
             return true;
         }
         return false;
@@ -1470,12 +1620,12 @@ function DwarfApi() {
         }
 
         if (data.constructor.name === 'ArrayBuffer') {
-            loggedSend('set_data:::' + key, data)
+            loggedSend('set_data', { 'key': key }, data);
         } else {
             if (data.constructor.name === 'Object') {
                 data = JSON.stringify(data, null, 4);
             }
-            loggedSend('set_data:::' + key + ':::' + data)
+            loggedSend('set_data', { 'key': key, 'value': '' + data });
         }
     };
 
@@ -1552,10 +1702,12 @@ function DwarfApi() {
                 },
 
                 onReceive: function (events) {
-                    loggedSend('tracer:::' + Stalker.parse(events, {
-                        annotate: true,
-                        stringify: true
-                    }));
+                    loggedSend('tracer', {
+                        'events': Stalker.parse(events, {
+                            annotate: true,
+                            stringify: true
+                        })
+                    });
                 }
             });
         } catch (e) {
@@ -1582,20 +1734,41 @@ function DwarfApi() {
         return false;
     };
 
-    this.updateModules = function () {
-        loggedSend('update_modules:::' + Process.getCurrentThreadId() + ':::' +
-            JSON.stringify(Process.enumerateModulesSync()))
+    this.updateModules = function (pageSize) {
+        pagedSend('update_modules', 'modules', Process.enumerateModulesSync(), pageSize);
     };
 
-    this.updateRanges = function () {
+    this.updateRanges = function (pageSize) {
         try {
-            loggedSend('update_ranges:::' + Process.getCurrentThreadId() + ':::' +
-                JSON.stringify(Process.enumerateRangesSync('---')))
+            pagedSend('update_ranges', 'ranges', Process.enumerateRangesSync('---'), pageSize);
         } catch (e) {
             _log_err('updateRanges', e);
         }
     };
 
+    this.valueScan = function (ranges, type, condition, value, chunkSize) {
+        // first pass, a new scan replaces the candidates of the previous one
+        api.cancelValueScan();
+        chunkSize = isNumber(chunkSize) && chunkSize > 0 ? chunkSize : 4 * 1024 * 1024;
+        getDwarf().valueScan = new ValueScan(type);
+        return getDwarf().valueScan.first(++getDwarf().valueScanId, JSON.parse(ranges), condition, value, chunkSize);
+    };
+
+    this.valueScanNext = function (condition, value, chunkSize) {
+        if (getDwarf().valueScan === null) {
+            throw new Error('no value scan to narrow');
+        }
+        chunkSize = isNumber(chunkSize) && chunkSize > 0 ? chunkSize : 4 * 1024 * 1024;
+        return getDwarf().valueScan.next(++getDwarf().valueScanId, condition, value, chunkSize);
+    };
+
+    this.valueScanResults = function (offset, count) {
+        if (getDwarf().valueScan === null) {
+            return [];
+        }
+        return getDwarf().valueScan.results(offset, count);
+    };
+
     this.writeBytes = function (pt, what) {
         try {
             pt = ptr(pt);
@@ -1841,7 +2014,7 @@ function DwarfKernel() {
             var len = fs.allocateRw(Process.pointerSize);
             var read;
             while ((read = fs.getline(buf, len, f)) !== -1) {
-                loggedSend("ftrace:::" + Memory.readUtf8String(Memory.readPointer(buf)));
+                loggedSend('ftrace', { 'data': Memory.readUtf8String(Memory.readPointer(buf)) });
             }
             fs.fclose(f);
         };
@@ -1991,7 +2164,7 @@ function DwarfKernel() {
 
     this.enable = function () {
         if (this.available(true)) {
-            loggedSend('enable_kernel:::')
+            loggedSend('enable_kernel');
         } else {
             console.log('dwarf module not loaded');
         }
@@ -2028,26 +2201,26 @@ function DwarfKernel() {
 
 function Emulator() {
     this.clean = function () {
-        loggedSend('emulator:::clean')
+        loggedSend('emulator', { 'args': ['clean'] });
     };
 
     this.setup = function (tid) {
         if (typeof tid !== 'number') {
             tid = Process.getCurrentThreadId();
         }
-        loggedSend('emulator:::setup:::' + tid);
+        loggedSend('emulator', { 'args': ['setup', '' + tid] });
     };
 
     this.start = function (until) {
-        loggedSend('emulator:::start:::' + until)
+        loggedSend('emulator', { 'args': ['start', '' + until] });
     };
 
     this.step = function () {
-        loggedSend('emulator:::start:::0')
+        loggedSend('emulator', { 'args': ['start', '0'] });
     };
 
     this.stop = function () {
-        loggedSend('emulator:::stop')
+        loggedSend('emulator', { 'args': ['stop'] });
     };
 }
 
@@ -2073,9 +2246,6 @@ function HookContext(tid) {
     this.tid = tid;
     this.context = null;
     this.java_handle = null;
-
-    this.next_api = null;
-    this.next_api_result = 'dwarf_handler';
 }
 
 function JavaHelper() {
@@ -2122,7 +2292,7 @@ function JavaHelper() {
             var hook;
             if (!restore) {
                 if (!internal) {
-                    loggedSend('hook_java_callback:::' + classMethod);
+                    loggedSend('hook_java_callback', { 'classMethod': classMethod });
                 }
                 hook = new Hook();
                 hook.javaClassMethod = classMethod;
@@ -2170,11 +2340,11 @@ function JavaHelper() {
             overload.implementation = function (clazz, resolve) {
                 if (javaHelper !== null && javaHelper._java_classes.indexOf(clazz) === -1) {
                     javaHelper._java_classes.push(clazz);
-                    loggedSend('class_loader_loading_class:::' + Process.getCurrentThreadId() + ':::' + clazz);
+                    loggedSend('class_loader_loading_class', { 'className': clazz });
 
                     var hook = getDwarf().javaOnLoads[clazz];
                     if (typeof hook !== 'undefined') {
-                        loggedSend("java_on_load_callback:::" + clazz + ':::' + Process.getCurrentThreadId());
+                        loggedSend('java_on_load_callback', { 'className': clazz });
                         getDwarf()._onHook(REASON_HOOK, clazz, {}, hook, this);
                     }
                 }
@@ -2319,7 +2489,7 @@ function JavaHelper() {
     this.traceImplementation = function (className, method) {
         return function () {
             var classMethod = className + '.' + method;
-            loggedSend('java_trace:::enter:::' + classMethod + ':::' + JSON.stringify(arguments));
+            loggedSend('java_trace', { 'event': 'enter', 'classMethod': classMethod, 'data': JSON.stringify(arguments) });
             var ret = this[method].apply(this, arguments);
             var traceRet = ret;
             if (typeof traceRet === 'object') {
@@ -2327,12 +2497,179 @@ function JavaHelper() {
             } else if (typeof traceRet === 'undefined') {
                 traceRet = "";
             }
-            loggedSend('java_trace:::leave:::' + classMethod + ':::' + traceRet);
+            loggedSend('java_trace', { 'event': 'leave', 'classMethod': classMethod, 'data': '' + traceRet });
             return ret;
         }
     }
 }
 
+function MemoryScan(id, ranges, patterns, chunkSize) {
+    this.id = id;
+    this.ranges = ranges;
+    this.patterns = patterns;
+    this.chunkSize = isNumber(chunkSize) && chunkSize > 0 ? chunkSize : 4 * 1024 * 1024;
+    // a single pattern is left to Memory.scan, a list is matched in one pass
+    this.matcher = patterns.length > 1 ? new PatternMatcher(patterns) : null;
+    this.lengths = patterns.map(function (pattern) {
+        return pattern.split(':')[0].trim().split(/\s+/).length;
+    });
+    // matches starting in the last bytes of a chunk continue in the next one
+    this.overlap = Math.max.apply(null, this.lengths) - 1;
+    this.cancelled = false;
+    this.count = 0;
+
+    var BATCH_SIZE = 1024;
+    var _this = this;
+    var rangeIndex = 0;
+    var offset = 0;
+    // pending matches per pattern
+    var matches = {};
+    var pending = 0;
+
+    this.start = function () {
+        loggedSend('memoryscan_start', { 'id': _this.id, 'ranges': _this.ranges.length });
+        _this._next();
+    };
+
+    this.cancel = function () {
+        _this.cancelled = true;
+    };
+
+    this._onMatch = function (address, pattern) {
+        if (typeof matches[pattern] === 'undefined') {
+            matches[pattern] = [];
+        }
+        matches[pattern].push(address);
+        pending++;
+        _this.count++;
+        if (pending >= BATCH_SIZE) {
+            _this._flush();
+        }
+    };
+
+    this._flush = function () {
+        for (var pattern in matches) {
+            loggedSend('memoryscan_result', {
+                'id': _this.id, 'range': rangeIndex, 'pattern': parseInt(pattern),
+                'count': matches[pattern].length, 'size': _this.lengths[pattern]
+            }, getDwarf()._packPointers(matches[pattern]));
+        }
+        matches = {};
+        pending = 0;
+    };
+
+    this._scanPages = function (chunk, length, scanLength, scanPage) {
+        // the chunk couldn't be read as a whole, its pages are scanned one by one and the unreadable ones skipped.
+        // scanPage(address, size, limit) reports the matches starting before address + limit, throws when unreadable
+        var pageSize = Process.pageSize;
+        // the first page ends on a page boundary when the chunk doesn't start on one
+        var position = 0;
+        while (position < length) {
+            var size = Math.min(pageSize - chunk.add(position).and(pageSize - 1).toInt32(), length - position);
+            var address = chunk.add(position);
+            try {
+                // matches crossing into the next page need its first bytes
+                scanPage(address, Math.min(size + _this.overlap, scanLength - position), size);
+            } catch (e) {
+                try {
+                    scanPage(address, size, size);
+                } catch (e) {
+                    // unreadable page
+                }
+            }
+            position += size;
+        }
+    };
+
+    this._next = function () {
+        while (rangeIndex < _this.ranges.length && offset >= _this.ranges[rangeIndex]['size']) {
+            _this._flush();
+            rangeIndex++;
+            offset = 0;
+        }
+        if (_this.cancelled || rangeIndex >= _this.ranges.length) {
+            _this._flush();
+            if (getDwarf().memoryScan === _this) {
+                getDwarf().memoryScan = null;
+            }
+            loggedSend('memoryscan_complete', { 'id': _this.id, 'count': _this.count, 'cancelled': _this.cancelled });
+            return;
+        }
+
+        var range = _this.ranges[rangeIndex];
+        var base = ptr(range['start']);
+        var length = Math.min(_this.chunkSize, range['size'] - offset);
+        var scanLength = Math.min(length + _this.overlap, range['size'] - offset);
+        // only matches starting in this chunk are kept, the overlap is scanned again with the next one
+        var limit = base.add(offset + length);
+        var done = false;
+        var onDone = function () {
+            if (done) {
+                return;
+            }
+            done = true;
+            offset += length;
+            loggedSend('memoryscan_progress', {
+                'id': _this.id, 'range': rangeIndex, 'scanned': offset, 'size': range['size']
+            });
+            _this._next();
+        };
+
+        var chunk = base.add(offset);
+        if (_this.matcher !== null) {
+            var matchPage = function (address, size, pageLimit) {
+                _this.matcher.scan(new Uint8Array(address.readByteArray(size)), pageLimit, function (position, pattern) {
+                    _this._onMatch(address.add(position), pattern);
+                });
+            };
+            try {
+                matchPage(chunk, scanLength, length);
+            } catch (e) {
+                _this._scanPages(chunk, length, scanLength, matchPage);
+            }
+            // give rpc calls (i.e. cancel) a chance to run between chunks
+            setTimeout(onDone, 0);
+            return;
+        }
+
+        // matches are reported in order, the ones before an error are not reported again by the retry
+        var lastMatch = null;
+        var scanPage = function (address, size, pageLimit) {
+            var end = address.add(pageLimit);
+            Memory.scanSync(address, size, _this.patterns[0]).forEach(function (match) {
+                if (match.address.compare(end) < 0 && (lastMatch === null || match.address.compare(lastMatch) > 0)) {
+                    _this._onMatch(match.address, 0);
+                }
+            });
+        };
+        try {
+            Memory.scan(chunk, scanLength, _this.patterns[0], {
+                onMatch: function (address, size) {
+                    if (address.compare(limit) < 0) {
+                        lastMatch = address;
+                        _this._onMatch(address, 0);
+                    }
+                    if (_this.cancelled) {
+                        return 'stop';
+                    }
+                },
+                onError: function (reason) {
+                    if (!done && !_this.cancelled) {
+                        _this._scanPages(chunk, length, scanLength, scanPage);
+                    }
+                    onDone();
+                },
+                onComplete: onDone
+            });
+        } catch (e) {
+            // i.e. invalid pattern
+            _log_err('MemoryScan', e);
+            _this.cancel();
+            onDone();
+        }
+    };
+}
+
 function MemoryWatcher(address, perm, flags) {
     this.address = address;
     this.debugSymbols = DebugSymbol.fromAddress(address);
@@ -2369,6 +2706,346 @@ function MemoryWatcher(address, perm, flags) {
     };
 }
 
+function PatternMatcher(patterns) {
+    // aho-corasick automaton over the longest run of fixed bytes of each pattern,
+    // candidates are then checked against the whole pattern (wildcards and masks included)
+    this.patterns = [];
+    this.maxLength = 1;
+
+    var _this = this;
+
+    this._parse = function (pattern) {
+        var parts = pattern.split(':');
+        var tokens = parts[0].trim().split(/\s+/);
+        var maskTokens = parts.length > 1 ? parts[1].trim().split(/\s+/) : null;
+        var values = new Uint8Array(tokens.length);
+        var masks = new Uint8Array(tokens.length);
+        var anchor = 0;
+        var anchorLength = 0;
+        var run = 0;
+        for (var i = 0; i < tokens.length; i++) {
+            var token = tokens[i];
+            if (token.length !== 2) {
+                throw new Error('invalid pattern: ' + pattern);
+            }
+            for (var j = 0; j < 2; j++) {
+                if (token[j] !== '?') {
+                    var nibble = parseInt(token[j], 16);
+                    if (isNaN(nibble)) {
+                        throw new Error('invalid pattern: ' + pattern);
+                    }
+                    values[i] |= nibble << (4 - j * 4);
+                    masks[i] |= 0xF << (4 - j * 4);
+                }
+            }
+            if (maskTokens !== null && i < maskTokens.length) {
+                masks[i] &= parseInt(maskTokens[i], 16);
+                values[i] &= masks[i];
+            }
+            run = masks[i] === 0xFF ? run + 1 : 0;
+            if (run > anchorLength) {
+                anchorLength = run;
+                anchor = i - run + 1;
+            }
+        }
+        if (anchorLength === 0) {
+            throw new Error('pattern without fixed bytes: ' + pattern);
+        }
+        return {
+            'values': values, 'masks': masks, 'length': tokens.length,
+            'anchor': anchor, 'anchorLength': anchorLength
+        };
+    };
+
+    for (var i = 0; i < patterns.length; i++) {
+        var parsed = this._parse(patterns[i]);
+        this.patterns.push(parsed);
+        this.maxLength = Math.max(this.maxLength, parsed.length);
+    }
+
+    // trie of the anchors
+    var transitions = [new Int32Array(256).fill(-1)];
+    var outputs = [[]];
+    for (i = 0; i < this.patterns.length; i++) {
+        var p = this.patterns[i];
+        var state = 0;
+        for (var k = p.anchor; k < p.anchor + p.anchorLength; k++) {
+            if (transitions[state][p.values[k]] === -1) {
+                transitions[state][p.values[k]] = transitions.length;
+                transitions.push(new Int32Array(256).fill(-1));
+                outputs.push([]);
+            }
+            state = transitions[state][p.values[k]];
+        }
+        outputs[state].push(i);
+    }
+
+    // failure links, folded into a dense transition table
+    var fail = new Int32Array(transitions.length);
+    var queue = [];
+    for (var b = 0; b < 256; b++) {
+        if (transitions[0][b] === -1) {
+            transitions[0][b] = 0;
+        } else {
+            queue.push(transitions[0][b]);
+        }
+    }
+    for (var q = 0; q < queue.length; q++) {
+        var r = queue[q];
+        outputs[r] = outputs[r].concat(outputs[fail[r]]);
+        for (b = 0; b < 256; b++) {
+            var u = transitions[r][b];
+            if (u === -1) {
+                transitions[r][b] = transitions[fail[r]][b];
+            } else {
+                fail[u] = transitions[fail[r]][b];
+                queue.push(u);
+            }
+        }
+    }
+    this.table = new Int32Array(transitions.length * 256);
+    for (i = 0; i < transitions.length; i++) {
+        this.table.set(transitions[i], i * 256);
+    }
+    this.outputs = outputs.map(function (output) {
+        return output.length > 0 ? output : null;
+    });
+
+    this.scan = function (bytes, limit, callback) {
+        // callback(position, pattern) for every match starting before limit
+        var table = _this.table;
+        var outputs = _this.outputs;
+        var state = 0;
+        for (var i = 0; i < bytes.length; i++) {
+            state = table[(state << 8) | bytes[i]];
+            var output = outputs[state];
+            if (output === null) {
+                continue;
+            }
+            for (var o = 0; o < output.length; o++) {
+                var p = _this.patterns[output[o]];
+                var start = i + 1 - p.anchorLength - p.anchor;
+                if (start < 0 || start >= limit || start + p.length > bytes.length) {
+                    continue;
+                }
+                var k = 0;
+                while (k < p.length && (bytes[start + k] & p.masks[k]) === p.values[k]) {
+                    k++;
+                }
+                if (k === p.length) {
+                    callback(start, output[o]);
+                }
+            }
+        }
+    };
+}
+
+function ValueScan(type) {
+    // candidates of a cheat engine like value scan, kept here between the passes.
+    // grouped by chunk: offsets from the chunk address (null when every aligned value is a candidate)
+    // and the value read by the last pass
+    var TYPES = {
+        'int8': Int8Array, 'int16': Int16Array, 'int32': Int32Array, 'int64': BigInt64Array,
+        'float': Float32Array, 'double': Float64Array
+    };
+    if (typeof TYPES[type] === 'undefined') {
+        throw new Error('invalid value type: ' + type);
+    }
+
+    this.type = type;
+    this.arrayType = TYPES[type];
+    this.size = this.arrayType.BYTES_PER_ELEMENT;
+    this.groups = [];
+    this.count = 0;
+    this.pass = null;
+
+    var _this = this;
+
+    this.parseValue = function (value) {
+        // wrapped to the scanned type, so that i.e. 200 matches an int8 -56
+        if (_this.type === 'int64') {
+            return BigInt.asIntN(64, BigInt(value));
+        }
+        if (_this.type === 'float' || _this.type === 'double') {
+            value = parseFloat(value);
+        } else {
+            value = parseInt(value);
+        }
+        if (isNaN(value)) {
+            throw new Error('invalid value: ' + value);
+        }
+        return new _this.arrayType([value])[0];
+    };
+
+    this.test = function (condition, value, old, expected) {
+        switch (condition) {
+            case 'unknown':
+                return true;
+            case 'equals':
+                return value === expected;
+            case 'changed':
+                return value !== old;
+            case 'unchanged':
+                return value === old;
+            case 'increased':
+                return value > old;
+            case 'decreased':
+                return value < old;
+        }
+        throw new Error('invalid condition: ' + condition);
+    };
+
+    this.first = function (id, ranges, condition, value, chunkSize) {
+        if (condition !== 'unknown' && condition !== 'equals') {
+            throw new Error('the first scan is either unknown or equals');
+        }
+        // split the ranges in chunks, the first pass reads them as a whole
+        var chunks = [];
+        for (var i = 0; i < ranges.length; i++) {
+            for (var offset = 0; offset < ranges[i]['size']; offset += chunkSize) {
+                chunks.push({
+                    'address': ptr(ranges[i]['start']).add(offset), 'offsets': null,
+                    'length': Math.floor(Math.min(chunkSize, ranges[i]['size'] - offset) / _this.size)
+                });
+            }
+        }
+        return _this._run(id, chunks, condition, value, chunkSize);
+    };
+
+    this.next = function (id, condition, value, chunkSize) {
+        if (condition === 'unknown') {
+            throw new Error('unknown is valid for the first scan only');
+        }
+        return _this._run(id, _this.groups, condition, value, chunkSize);
+    };
+
+    this.cancel = function () {
+        if (_this.pass !== null) {
+            _this.pass.cancelled = true;
+        }
+    };
+
+    this.results = function (offset, count) {
+        // a page of [address, value] across the groups
+        var ret = [];
+        for (var i = 0; i < _this.groups.length && ret.length < count; i++) {
+            var group = _this.groups[i];
+            if (offset >= group.values.length) {
+                offset -= group.values.length;
+                continue;
+            }
+            for (var j = offset; j < group.values.length && ret.length < count; j++) {
+                var delta = group.offsets === null ? j * _this.size : group.offsets[j];
+                ret.push([group.address.add(delta).toString(), group.values[j].toString()]);
+            }
+            offset = 0;
+        }
+        return ret;
+    };
+
+    this._run = function (id, groups, condition, value, chunkSize) {
+        var expected = condition === 'equals' ? _this.parseValue(value) : null;
+        _this.test(condition, 0, 0, expected);
+        _this.cancel();
+
+        var pass = { 'id': id, 'cancelled': false };
+        _this.pass = pass;
+        var result = [];
+        var count = 0;
+        var index = 0;
+
+        var step = function () {
+            var read = 0;
+            while (!pass.cancelled && index < groups.length && read < chunkSize) {
+                var group = groups[index++];
+                var kept = _this._filter(group, condition, expected);
+                if (kept !== null) {
+                    result.push(kept);
+                    count += kept.values.length;
+                }
+                read += _this._span(group);
+            }
+            if (!pass.cancelled && index < groups.length) {
+                loggedSend('valuescan_progress', { 'id': id, 'done': index, 'total': groups.length });
+                // give rpc calls (i.e. cancel) a chance to run between chunks
+                setTimeout(step, 0);
+                return;
+            }
+            if (_this.pass === pass) {
+                _this.pass = null;
+            }
+            // a cancelled pass keeps the previous candidates
+            if (!pass.cancelled) {
+                _this.groups = result;
+                _this.count = count;
+            }
+            loggedSend('valuescan_complete', { 'id': id, 'count': _this.count, 'cancelled': pass.cancelled });
+        };
+
+        loggedSend('valuescan_start', { 'id': id });
+        setTimeout(step, 0);
+        return id;
+    };
+
+    this._filter = function (group, condition, expected) {
+        // re-read the span covering the candidates of the group and keep the ones matching
+        var length = _this._length(group);
+        if (length === 0) {
+            return null;
+        }
+        var first = group.offsets === null ? 0 : group.offsets[0];
+        var span = _this._span(group);
+        var view;
+        try {
+            view = new _this.arrayType(group.address.add(first).readByteArray(span));
+        } catch (e) {
+            // not readable anymore
+            return null;
+        }
+
+        if (condition === 'unknown') {
+            return { 'address': group.address, 'offsets': null, 'values': view };
+        }
+
+        var offsets = new Uint32Array(length);
+        var values = new _this.arrayType(length);
+        var kept = 0;
+        for (var i = 0; i < length; i++) {
+            var offset = group.offsets === null ? i * _this.size : group.offsets[i];
+            var value = view[(offset - first) / _this.size];
+            var old = typeof group.values === 'undefined' ? null : group.values[i];
+            if (_this.test(condition, value, old, expected)) {
+                offsets[kept] = offset;
+                values[kept] = value;
+                kept++;
+            }
+        }
+        if (kept === 0) {
+            return null;
+        }
+        return { 'address': group.address, 'offsets': offsets.slice(0, kept), 'values': values.slice(0, kept) };
+    };
+
+    this._length = function (group) {
+        if (group.offsets !== null) {
+            return group.offsets.length;
+        }
+        // chunks of the first pass are not read yet
+        return typeof group.values === 'undefined' ? group.length : group.values.length;
+    };
+
+    this._span = function (group) {
+        var length = _this._length(group);
+        if (length === 0) {
+            return 0;
+        }
+        if (group.offsets === null) {
+            return length * _this.size;
+        }
+        return group.offsets[length - 1] + _this.size - group.offsets[0];
+    };
+}
+
 rpc.exports = {
     api: function (tid, api_funct, args) {
         if (DEBUG) {
@@ -2380,35 +3057,19 @@ rpc.exports = {
             args = [];
         }
 
-        if (Object.keys(getDwarf().hook_contexts).length > 0) {
-            var hc = getDwarf().hook_contexts[tid];
-            if (typeof hc !== 'undefined') {
-
-                // wait for other apis to return
-                while (hc.next_api !== null) {
-                    Thread.sleep(0.5);
-                    if (DEBUG) {
-                        _log('[' + tid + '] RPC-API: ' + api_funct + ' waiting for other api to return result');
-                    }
-                }
-
-                hc.next_api = [api_funct, args];
-                while (hc.next_api_result === 'dwarf_handler') {
-                    Thread.sleep(0.1);
-                    if (DEBUG) {
-                        _log('[' + tid + '] RPC-API: ' + api_funct + ' waiting for api result');
-                    }
-                }
-                var ret = hc.next_api_result;
-                if (DEBUG) {
-                    _log('[' + tid + '] RPC-API: ' + api_funct + ' api result: ' + ret);
-                }
-                hc.next_api_result = 'dwarf_handler';
-                return ret;
-            }
+        var start = Date.now();
+        try {
+            return api[api_funct].apply(this, args);
+        } finally {
+            getDwarf()._recordStat('api', api_funct, Date.now() - start);
+        }
+    },
+    batch: function (tid, calls) {
+        if (DEBUG) {
+            _log('[' + tid + '] RPC-BATCH: ' + calls.length + ' apis (' + Process.getCurrentThreadId() + ')');
         }
 
-        return api[api_funct].apply(this, args)
+        return getDwarf()._batchApi(this, calls);
     },
     init: function (debug, spawned) {
         DEBUG = debug;
@@ -2440,6 +3101,12 @@ rpc.exports = {
     },
     watchers: function () {
         return JSON.stringify(getDwarf().memory_watchers);
+    },
+    stats: function () {
+        return getDwarf().stats;
+    },
+    resetstats: function () {
+        getDwarf().stats = { 'api': {}, 'send': {} };
     }
 };
 
@@ -2550,11 +3217,13 @@ var InterceptorWrapper = function () {
             if (!(pt instanceof Hook)) {
                 try {
                     getDwarf().hooks[dethumbedPtr] = hook;
-                    loggedSend('hook_native_callback:::' +
-                        getDwarf()._dethumbify(hook.nativePtr) + ':::' +
-                        getDwarf()._ba2hex(hook.bytes) + ':::' +
-                        _logic + ':::' + hook.condition + ':::' + hook.internalHook
-                    );
+                    loggedSend('hook_native_callback', {
+                        'address': getDwarf()._dethumbify(hook.nativePtr),
+                        'bytes': hook.bytes,
+                        'logic': isDefined(_logic) ? '' + _logic : null,
+                        'condition': isDefined(hook.condition) ? '' + hook.condition : null,
+                        'internal': hook.internalHook
+                    });
                 } catch (e) {
                     _log_err('InterceptorWrapper.attach', e);
                     return false;
@@ -2661,12 +3330,36 @@ var ThreadWrapper = function () {
     this._init();
 };
 
-var loggedSend = function (w, p) {
+var pagedSend = function (type, key, items, pageSize) {
+    if (typeof pageSize !== 'number' || pageSize <= 0) {
+        pageSize = 256;
+    }
+    var total = items.length;
+    var offset = 0;
+    do {
+        var message = { 'offset': offset, 'total': total };
+        message[key] = items.slice(offset, offset + pageSize);
+        loggedSend(type, message);
+        offset += pageSize;
+    } while (offset < total);
+};
+
+var loggedSend = function (type, message, data) {
+    if (typeof message === 'undefined' || message === null) {
+        message = {};
+    }
+    message['type'] = type;
+    if (typeof message['tid'] === 'undefined') {
+        message['tid'] = Process.getCurrentThreadId();
+    }
+
     if (DEBUG) {
-        _log('[' + Process.getCurrentThreadId() + '] sending data to py side | ' + w);
+        _log('[' + message['tid'] + '] sending data to py side | ' + type);
     }
 
-    return send(w, p);
+    var start = Date.now();
+    send(message, data);
+    getDwarf()._recordStat('send', type, Date.now() - start);
 };
 
 /*
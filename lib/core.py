@@ -14,22 +14,21 @@ Dwarf - Copyright (C) 2019 Giovanni Rocca (iGio90)
     You should have received a copy of the GNU General Public License
     along with this program.  If not, see <https://www.gnu.org/licenses/>
 """
-import os
-import binascii
+import functools
+import importlib.util
 import json
+import queue
+import threading
 
-from frida.core import Session
-
-import frida
-from PyQt5.QtCore import QObject, pyqtSignal, QThread
-from PyQt5.QtWidgets import QFileDialog, QApplication
+from PyQt5.QtCore import Qt, QObject, pyqtSignal, QThread
+from PyQt5.QtWidgets import QFileDialog, QProgressDialog
 
 from lib import utils, prefs
-from lib.context import Context
-from lib.emulator import Emulator
+from lib.dwarf_core import DwarfCore
 
 from lib.hook import Hook
-from lib.kernel import Kernel
+from lib.message_coalescer import MessageCoalescer
+from lib.snapshot import SnapshotFormatError
 
 from ui.dialog_input import InputDialog
 
@@ -44,6 +43,8 @@ class EmulatorThread(QThread):
         self.cmd = ''
 
     def run(self):
+        from lib.emulator import Emulator
+
         if self.emulator and self.cmd:
             try:
                 result = self.emulator.api(self.cmd)
@@ -56,14 +57,109 @@ class EmulatorThread(QThread):
                 self.onError.emit(error)
 
 
-class Dwarf(QObject):
-    class NoDeviceAssignedError(Exception):
-        """ Raised when no Device
-        """
+class ApiRequest(object):
+    """ dwarf_api call scheduled on the api thread
+
+        callback(result) is invoked on the ui thread unless the request got cancelled
+    """
+
+    def __init__(self, fn, callback=None):
+        self._fn = fn
+        self._done = threading.Event()
+        self.callback = callback
+        self.cancelled = False
+        self.result = None
+
+    def cancel(self):
+        self.cancelled = True
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        self._done.wait(timeout)
+        return self.result
+
+    def run(self):
+        if not self.cancelled:
+            self.result = self._fn()
+        self._done.set()
+
+
+class ApiThread(QThread):
+    onRequestCompleted = pyqtSignal(object, name='onRequestCompleted')
+
+    def __init__(self, parent=None):
+        super().__init__(parent=parent)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._stopping = False
+
+    def submit(self, request):
+        with self._lock:
+            if self._stopping:
+                # the script is going away, nothing would answer
+                request.cancel()
+                request.run()
+                return
+            self._queue.put(request)
+            if not self.isRunning():
+                self.start()
 
-    class CoreScriptNotFoundError(Exception):
-        """ Raised when dwarfscript not found
+    def stop(self):
+        """ cancel the queued requests and wait for the running one, the thread starts again on submit
         """
+        with self._lock:
+            self._stopping = True
+            while True:
+                try:
+                    request = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if request is not None:
+                    request.cancel()
+                    request.run()
+            self._queue.put(None)
+        self.wait()
+        with self._lock:
+            # the sentinel is still there when the thread wasn't running
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._stopping = False
+
+    def run(self):
+        while True:
+            request = self._queue.get()
+            if request is None:
+                break
+            request.run()
+            if not request.cancelled:
+                self.onRequestCompleted.emit(request)
+
+
+class MemoryDumpThread(QThread):
+    """ runs a MemoryDump, a SnapshotCapture, a StringIndexer or a pointer map build and scan
+    """
+    onProgress = pyqtSignal(int, float, name='onProgress')
+    onFinished = pyqtSignal(bool, name='onFinished')
+
+    def __init__(self, dump, parent=None):
+        super().__init__(parent=parent)
+        self.dump = dump
+        self.dump.progress = self._on_progress
+
+    def _on_progress(self, written, length, rate):
+        self.onProgress.emit(int(written * 100 / max(length, 1)), rate)
+
+    def run(self):
+        self.onFinished.emit(self.dump.run())
+
+
+class Dwarf(QObject, DwarfCore):
+    """ Dwarf
+
+        qt side of DwarfCore: agent events are emitted as signals, user input is asked with dialogs
+    """
 
     # ************************************************************************
     # **************************** Signals ***********************************
@@ -86,321 +182,128 @@ class Dwarf(QObject):
     # ranges + modules
     onSetRanges = pyqtSignal(list, name='onSetRanges')
     onSetModules = pyqtSignal(list, name='onSetModules')
-    onLogToConsole = pyqtSignal(str, name='onLogToConsole')
+    onAddRanges = pyqtSignal(list, name='onAddRanges')
+    onAddModules = pyqtSignal(list, name='onAddModules')
+    onLogToConsole = pyqtSignal(list, name='onLogToConsole')
     # thread+context
     onThreadResumed = pyqtSignal(int, name='onThreadResumed')
     onRequestJsThreadResume = pyqtSignal(int, name='onRequestJsThreadResume')
     onApplyContext = pyqtSignal(dict, name='onApplyContext')
     # java
     onEnumerateJavaClassesStart = pyqtSignal(name='onEnumerateJavaClassesStart')
-    onEnumerateJavaClassesMatch = pyqtSignal(str, name='onEnumerateJavaClassesMatch')
+    onEnumerateJavaClassesMatch = pyqtSignal(list, name='onEnumerateJavaClassesMatch')
     onEnumerateJavaClassesComplete = pyqtSignal(name='onEnumerateJavaClassesComplete')
     onEnumerateJavaMethodsComplete = pyqtSignal(list, name='onEnumerateJavaMethodsComplete')
     # trace
     onJavaTraceEvent = pyqtSignal(list, name='onJavaTraceEvent')
-    onTraceData = pyqtSignal(str, name='onTraceData')
+    onTraceData = pyqtSignal(list, name='onTraceData')
     onSetData = pyqtSignal(list, name='onSetData')
     # emulator
     onEmulator = pyqtSignal(list, name='onEmulator')
 
     onBackTrace = pyqtSignal(dict, name='onBackTrace')
 
+    onMemoryScanStart = pyqtSignal(int, name='onMemoryScanStart')
     onMemoryScanResult = pyqtSignal(list, name='onMemoryScanResult')
+    onMemoryScanProgress = pyqtSignal(list, name='onMemoryScanProgress')
+    onMemoryScanComplete = pyqtSignal(list, name='onMemoryScanComplete')
+    onValueScanStart = pyqtSignal(int, name='onValueScanStart')
+    onValueScanProgress = pyqtSignal(list, name='onValueScanProgress')
+    onValueScanComplete = pyqtSignal(list, name='onValueScanComplete')
 
     onContextChanged = pyqtSignal(str, str, name='onContextChanged')
 
+    # deferred work, executed on the ui thread
+    _postRequested = pyqtSignal(object, object, name='postRequested')
+
     # ************************************************************************
     # **************************** Init **************************************
     # ************************************************************************
     def __init__(self, session=None, parent=None, device=None):
-        super(Dwarf, self).__init__(parent=parent)
+        super(Dwarf, self).__init__(
+            parent=parent, device=device, debug_script=parent.dwarf_args.debug_script,
+            diagnostics=parent.prefs.get(prefs.DIAGNOSTICS_ENABLED, default=False))
 
         self._app_window = parent
 
-        self.java_available = False
-
-        # frida device
-        self._device = device
-
-        # process
-        self._pid = 0
-        self._process = None
-        self._script = None
-        self._spawned = False
-        self._resumed = False
-
-        # kernel
-        self._kernel = Kernel(self)
+        self.memory_cache.budget = self._app_window.prefs.get(prefs.MEMORY_CACHE_BUDGET, default=64) * 1024 * 1024
 
-        self._watchers = []
+        # api calls running off the ui thread
+        self._api_thread = ApiThread(self)
+        self._api_thread.onRequestCompleted.connect(self._on_api_request_completed)
 
-        # hooks
-        self.hooks = {}
-        self.native_on_loads = {}
-        self.java_on_loads = {}
-        self.java_hooks = {}
-        self.temporary_input = ''
-        self.native_pending_args = None
-        self.java_pending_args = None
+        # running memory dumps
+        self._dump_threads = []
 
-        # context
-        self._arch = ''
-        self._pointer_size = 0
-        self.contexts = {}
-        self.context_tid = 0
-        self._platform = ''
+        # high rate messages are emitted in batches
+        self._coalescer = MessageCoalescer(
+            self._app_window.prefs.get(prefs.MESSAGES_COALESCE_INTERVAL, default=16), parent=self)
+        self._coalescer.register('onLogToConsole', self.onLogToConsole)
+        self._coalescer.register('onEnumerateJavaClassesMatch', self.onEnumerateJavaClassesMatch)
+        self._coalescer.register('onJavaTraceEvent', self.onJavaTraceEvent)
+        self._coalescer.register('onTraceData', self.onTraceData)
 
-        # tracers
-        self._native_traced_tid = 0
-
-        # emulator stuff
-        self._emulator = Emulator(self)
+        # emulator stuff, unicorn and capstone are loaded on first use
+        self._emulator = None
         self._emu_thread = EmulatorThread(self)
         self._emu_thread.onCmdCompleted.connect(self._on_emu_completed)
         self._emu_thread.onError.connect(self._on_emu_error)
-        self._emu_thread.emulator = self.emulator
         self._emu_queue = []
 
         # connect to self
-        self.onApplyContext.connect(self._on_apply_context)
+        self._postRequested.connect(self._on_post_requested)
         self.onEmulator.connect(self._on_emulator)
-        self.onRequestJsThreadResume.connect(self._on_request_resume_from_js)
-
-        self.keystone_installed = False
-        try:
-            import keystone.keystone_const
-            self.keystone_installed = True
-        except:
-            pass
 
-    def _reinitialize(self):
-        self.java_available = False
-
-        # frida device
-        self._device = None
-
-        # process
-        self._process = None
-        self._script = None
-
-        # hooks
-        self.hooks = {}
-        self.native_on_loads = {}
-        self.java_on_loads = {}
-        self.java_hooks = {}
-        self.temporary_input = ''
-        self.native_pending_args = None
-        self.java_pending_args = None
-
-        # tracers
-        self._native_traced_tid = 0
-
-        self.context_tid = 0
+        self._keystone_installed = None
 
     # ************************************************************************
     # **************************** Properties ********************************
     # ************************************************************************
-    @property
-    def kernel(self):
-        return self._kernel
-
     @property
     def emulator(self):
+        if self._emulator is None:
+            from lib.emulator import Emulator
+            self._emulator = Emulator(self)
         return self._emulator
 
     @property
-    def native_trace_tid(self):
-        return self._native_traced_tid
+    def keystone_installed(self):
+        if self._keystone_installed is None:
+            # don't pay the keystone import until it's needed
+            self._keystone_installed = importlib.util.find_spec('keystone') is not None
+        return self._keystone_installed
 
-    @property
-    def arch(self):
-        return self._arch
-
-    @property
-    def pid(self):
-        return self._pid
-
-    @property
-    def platform(self):
-        return self._platform
-
-    @property
-    def pointer_size(self):
-        return self._pointer_size
+    # ************************************************************************
+    # **************************** Events ************************************
+    # ************************************************************************
+    def _emit(self, event, *args):
+        getattr(self, event).emit(*args)
 
-    @property
-    def process(self):
-        return self._process
+    def _emit_batch(self, event, items):
+        self._coalescer.extend(event, items)
 
-    @property
-    def device(self):
-        return self._device
+    def _flush_batches(self):
+        self._coalescer.flush()
 
-    @device.setter
-    def device(self, value):
-        try:
-            if isinstance(value, frida.core.Device):
-                self._device = value
-        except ValueError:
-            self._device = None
+    def _post(self, fn, *args):
+        self._postRequested.emit(fn, args)
 
-    @property
-    def resumed(self):
-        return self._resumed == True
+    def _on_post_requested(self, fn, args):
+        fn(*args)
 
     # ************************************************************************
     # **************************** Functions *********************************
     # ************************************************************************
-    def is_address_watched(self, ptr):
-        ptr = utils.parse_ptr(ptr)
-        if ptr in self._watchers:
-            return True
-
-        return False
-
-    def attach(self, pid, script=None, print_debug_error=True):
-        """ Attach to pid
-        """
-        if self.device is None:
-            raise self.NoDeviceAssignedError('No Device assigned')
-
-        if self._process is not None:
-            self.detach()
-
-        was_error = False
-        error_msg = ''
-
-        # for commandline arg
-        if isinstance(pid, str):
-            try:
-                process = self.device.get_process(pid)
-                pid = [process.pid, process.name]
-            except frida.ProcessNotFoundError as error:
-                raise Exception('Frida Error: ' + str(error))
-
-        if not isinstance(pid, list):
-            raise Exception('Error pid!=list')
-
-        try:
-            self._process = self.device.attach(pid[0])
-            #self._process.enable_jit()
-            self._pid = pid[0]
-        except frida.ProcessNotFoundError:
-            error_msg = 'Process not found (ProcessNotFoundError)'
-            was_error = True
-        except frida.ProcessNotRespondingError:
-            error_msg = 'Process not responding (ProcessNotRespondingError)'
-            was_error = True
-        except frida.TimedOutError:
-            error_msg = 'Frida timeout (TimedOutError)'
-            was_error = True
-        except frida.ServerNotRunningError:
-            error_msg = 'Frida not running (ServerNotRunningError)'
-            was_error = True
-        except frida.TransportError:
-            error_msg = 'Frida timeout was reached (TransportError)'
-            was_error = True
-        # keep for debug
-        except Exception as error:  # pylint: disable=broad-except
-            error_msg = error
-            was_error = True
-
-        if was_error:
-            raise Exception(error_msg)
-
-        self.onAttached.emit([self.pid, pid[1]])
-        self.load_script(script)
-
     def detach(self):
-        if self._script is not None:
-            self.dwarf_api('_detach')
-            self._script.unload()
-        if self._process is not None:
-            self._process.detach()
-            if self._spawned:
-                self.device.kill(self.pid)
-
-    def load_script(self, script=None, spawned=False):
-        try:
-            if not os.path.exists('lib/core.js'):
-                raise self.CoreScriptNotFoundError('core.js not found!')
-
-            with open('lib/core.js', 'r') as core_script:
-                script_content = core_script.read()
-
-            self._script = self._process.create_script(script_content, runtime='v8')
-            self._script.on('message', self._on_message)
-            self._script.on('destroyed', self._on_destroyed)
-            self._script.load()
-
-            is_debug = self._app_window.dwarf_args.debug_script
-            self._script.exports.init(is_debug, spawned)
-
-            if script is not None:
-                if os.path.exists(script):
-                    with open(script, 'r') as script_file:
-                        user_script = script_file.read()
-
-                    self.dwarf_api('evaluateFunction', user_script)
-
-            # resume immediately
-            self.resume_proc()
-
-            self.onScriptLoaded.emit()
-            return 0
-        except frida.ProcessNotFoundError:
-            error_msg = 'Process not found (ProcessNotFoundError)'
-            was_error = True
-        except frida.ProcessNotRespondingError:
-            error_msg = 'Process not responding (ProcessNotRespondingError)'
-            was_error = True
-        except frida.TimedOutError:
-            error_msg = 'Frida timeout (TimedOutError)'
-            was_error = True
-        except frida.ServerNotRunningError:
-            error_msg = 'Frida not running (ServerNotRunningError)'
-            was_error = True
-        except frida.TransportError:
-            error_msg = 'Frida timeout was reached (TransportError)'
-            was_error = True
-
-        if was_error:
-            utils.show_message_box(error_msg)
-            self._on_destroyed()
-        return 1
-
-    def spawn(self, package, script=None):
-        if self.device is None:
-            raise self.NoDeviceAssignedError('No Device assigned')
-
-        if self._process is not None:
-            self.detach()
-        try:
-            self._pid = self.device.spawn(package)
-            self._process = self.device.attach(self._pid)
-            #self._process.enable_jit()
-            self._spawned = True
-        except Exception as e:
-            raise Exception('Frida Error: ' + str(e))
-
-        self.onAttached.emit([self.pid, package])
-        self.load_script(script, spawned=True)
-
-    def resume_proc(self):
-        if self._spawned and not self._resumed:
-            self._resumed = True
-            try:
-                self.device.resume(self._pid)
-            except frida.InvalidOperationError:
-                # already resumed from other loc
-                pass
+        self._api_thread.stop()
+        super(Dwarf, self).detach()
 
     def add_watcher(self, ptr=None):
         if ptr is None:
             ptr, input = InputDialog.input_pointer(self._app_window)
             if ptr == 0:
                 return
-        return self.dwarf_api('addWatcher', ptr)
+        return super(Dwarf, self).add_watcher(ptr)
 
     def dump_memory(self, file_path=None, ptr=0, length=0):
         if ptr == 0:
@@ -423,41 +326,69 @@ class Dwarf(QObject):
                 if len(r) == 0 or len(r[0]) == 0:
                     return
                 file_path = r[0]
-            data = self.read_memory(ptr, length)
-            if data is not None:
-                with open(file_path, 'wb') as f:
-                    f.write(data)
 
-    def dwarf_api(self, api, args=None, tid=0):
-        if self.pid == 0 or self.process is None:
+            self._start_dump(self.create_memory_dump(file_path, ptr, length), 'dumping 0x{0:x}'.format(ptr))
+
+    def save_snapshot(self, file_path=None):
+        if self.pid == 0:
+            utils.show_message_box('attach to a process before saving a snapshot')
             return
+        if file_path is None:
+            r = QFileDialog.getSaveFileName(self._app_window, caption='Save snapshot', filter='Snapshot (*.dsnap)')
+            if len(r) == 0 or len(r[0]) == 0:
+                return
+            file_path = r[0]
+        self._start_dump(self.create_snapshot_capture(file_path), 'capturing snapshot')
 
-        # when tid is 0 we want to execute the api in the current hooked thread
-        # however, when we release from menu, what we want to do is to release multiple contexts at once
-        # so that we pass 0 as tid.
-        # we check here and setup special rules for release api
-        is_releasing = api == 'release'
-        if not is_releasing and tid == 0:
-            tid = self.context_tid
-
-        if args is not None and not isinstance(args, list):
-            args = [args]
-        if self._script is None:
-            return None
+    def open_snapshot(self, file_path=None):
+        if file_path is None:
+            r = QFileDialog.getOpenFileName(self._app_window, caption='Open snapshot', filter='Snapshot (*.dsnap)')
+            if len(r) == 0 or len(r[0]) == 0:
+                return
+            file_path = r[0]
         try:
-            if tid == 0:
-                for tid in list(self.contexts.keys()):
-                    self._script.post({"type": tid})
-                    if is_releasing:
-                        self._script.exports.api(int(tid), api, [int(tid)])
-                if is_releasing:
-                    return None
-            else:
-                self._script.post({"type": str(tid)})
-            return self._script.exports.api(tid, api, args)
-        except Exception as e:
-            self.log(str(e))
-            return None
+            super(Dwarf, self).open_snapshot(file_path)
+        except (OSError, SnapshotFormatError) as e:
+            utils.show_message_box('unable to open snapshot', str(e))
+
+    def _start_dump(self, dump, label):
+        dump_thread = MemoryDumpThread(dump, parent=self)
+        progress = QProgressDialog(self._app_window)
+        progress.setWindowTitle('Dump')
+        progress.setLabelText(label + '...')
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setRange(0, 100)
+        progress.setMinimumDuration(0)
+        progress.canceled.connect(dump.cancel)
+        dump_thread.onProgress.connect(
+            lambda value, rate: self._on_dump_progress(progress, label, value, rate))
+        dump_thread.onFinished.connect(
+            lambda completed: self._on_dump_finished(dump_thread, progress, completed))
+        self._dump_threads.append(dump_thread)
+        dump_thread.start()
+
+    def dwarf_api_async(self, api, args=None, tid=0, callback=None):
+        """ same as dwarf_api but executed on the api thread without blocking the ui
+
+            returns the ApiRequest which can be waited or cancelled
+        """
+        return self.call_async(functools.partial(self.dwarf_api, api, args, tid), callback)
+
+    def dwarf_api_batch_async(self, calls, tid=0, callback=None):
+        """ same as dwarf_api_batch but executed on the api thread without blocking the ui
+
+            returns the ApiRequest which can be waited or cancelled
+        """
+        return self.call_async(functools.partial(self.dwarf_api_batch, calls, tid), callback)
+
+    def call_async(self, fn, callback=None):
+        """ run fn on the api thread, callback(result) is invoked on the ui thread
+
+            returns the ApiRequest which can be waited or cancelled
+        """
+        request = ApiRequest(fn, callback)
+        self._api_thread.submit(request)
+        return request
 
     def hook_java(self, input_=None, pending_args=None):
         if input_ is None or not isinstance(input_, str):
@@ -466,21 +397,19 @@ class Dwarf(QObject):
                 placeholder='com.package.class or com.package.class.method')
             if not accept:
                 return
-        self.java_pending_args = pending_args
-        input_ = input_.replace(' ', '')
-        self.dwarf_api('hookJava', input_)
+        super(Dwarf, self).hook_java(input_, pending_args=pending_args)
 
     def hook_native(self, input_=None, pending_args=None, own_input=None):
         if input_ is None or not isinstance(input_, str):
             ptr, input_ = InputDialog.input_pointer(self._app_window)
+            if ptr > 0:
+                self.temporary_input = input_
+                if own_input is not None:
+                    self.temporary_input = own_input
+                self.native_pending_args = pending_args
+                self.dwarf_api('hookNative', ptr)
         else:
-            ptr = utils.parse_ptr(self._app_window.dwarf.dwarf_api('evaluatePtr', input_))
-        if ptr > 0:
-            self.temporary_input = input_
-            if own_input is not None:
-                self.temporary_input = own_input
-            self.native_pending_args = pending_args
-            self.dwarf_api('hookNative', ptr)
+            super(Dwarf, self).hook_native(input_, pending_args=pending_args, own_input=own_input)
 
     def hook_native_on_load(self, input_=None):
         if input_ is None or not isinstance(input_, str):
@@ -490,10 +419,7 @@ class Dwarf(QObject):
             if len(input_) == 0:
                 return
 
-        if input_ in self._app_window.dwarf.native_on_loads:
-            return
-
-        self.dwarf_api('hookNativeOnLoad', input_)
+        super(Dwarf, self).hook_native_on_load(input_)
 
     def hook_java_on_load(self, input_=None):
         if input_ is None or not isinstance(input_, str):
@@ -504,16 +430,10 @@ class Dwarf(QObject):
             if len(input_) == 0:
                 return
 
-        if input_ in self._app_window.dwarf.native_on_loads:
-            return
-
-        self.dwarf_api('hookJavaOnLoad', input_)
-
-    def log(self, what):
-        self.onLogToConsole.emit(str(what))
+        super(Dwarf, self).hook_java_on_load(input_)
 
     def native_tracer_start(self, tid=0):
-        if self.native_traced_tid > 0:
+        if self._native_traced_tid > 0:
             return
         if tid == 0:
             accept, tid = InputDialog.input(self._app_window, hint='insert thread id to trace',
@@ -527,254 +447,55 @@ class Dwarf(QObject):
                     tid = int(tid)
             except:
                 return
-        self.native_traced_tid = tid
-        return self.dwarf_api('startNativeTracer', [tid, True])
+        return super(Dwarf, self).native_tracer_start(tid)
 
     def native_tracer_stop(self):
-        if self.native_traced_tid == 0:
+        if self._native_traced_tid == 0:
             return
-        self.dwarf_api('stopNativeTracer')
+        super(Dwarf, self).native_tracer_stop()
         if self._app_window.trace_panel is not None:
             self._app_window.trace_panel.stop()
-        self.native_traced_tid = 0
         # self._app_window.get_menu().on_native_tracer_change(False)
 
-    def read_memory(self, ptr, length):
-        if length > 1024 * 1024:
-            position = 0
-            next_size = 1024 * 1024
-            data = bytearray()
-            while True:
-                try:
-                    data += self.dwarf_api('readBytes', [ptr + position, next_size])
-                except:
-                    return None
-                position += next_size
-                diff = length - position
-                if diff > 1024 * 1024:
-                    next_size = 1024 * 1024
-                elif diff > 0:
-                    next_size = diff
-                else:
-                    break
-            ret = bytes(data)
-            del data
-            return ret
-        else:
-            return self.dwarf_api('readBytes', [ptr, length])
-
-    def remove_watcher(self, ptr):
-        return self.dwarf_api('removeWatcher', ptr)
-
-    def search(self, start, size, pattern):
-        # sanify args
-        start = utils.parse_ptr(start)
-        size = int(size)
-        # convert to frida accepted pattern
-        pattern = ' '.join([pattern[i:i + 2] for i in range(0, len(pattern), 2)])
-        self.dwarf_api('memoryScan', [start, size, pattern])
-
-    def search_list(self, ranges_list, pattern):
-        pattern = ' '.join([pattern[i:i + 2] for i in range(0, len(pattern), 2)])
-        self.dwarf_api('memoryScanList', [json.dumps(ranges_list), pattern])
-
     # ************************************************************************
     # **************************** Handlers **********************************
     # ************************************************************************
-    def _on_message(self, message, data):
-        QApplication.processEvents()
-        if 'payload' not in message:
-            print('payload: ' + str(message))
-            return
-
-        what = message['payload']
-        parts = what.split(':::')
-        if len(parts) < 2:
-            print(what)
-            return
-
-        cmd = parts[0]
-        if cmd == 'backtrace':
-            self.onBackTrace.emit(json.loads(parts[1]))
-        elif cmd == 'class_loader_loading_class':
-            str_fmt = ('@thread {0} loading class := {1}'.format(parts[1], parts[2]))
-            self.log(str_fmt)
-        elif cmd == 'emulator':
-            self.onEmulator.emit(parts[1:])
-        elif cmd == 'enumerate_java_classes_start':
-            self.onEnumerateJavaClassesStart.emit()
-        elif cmd == 'enumerate_java_classes_match':
-            self.onEnumerateJavaClassesMatch.emit(parts[1])
-        elif cmd == 'enumerate_java_classes_complete':
-            self.onEnumerateJavaClassesComplete.emit()
-        elif cmd == 'enumerate_java_methods_complete':
-            self.onEnumerateJavaMethodsComplete.emit([parts[1], json.loads(parts[2])])
-        elif cmd == 'ftrace':
-            if self.app.get_ftrace_panel() is not None:
-                self.app.get_ftrace_panel().append_data(parts[1])
-        elif cmd == 'enable_kernel':
-            self._app_window.get_menu().enable_kernel_menu()
-        elif cmd == 'hook_java_callback':
-            h = Hook(Hook.HOOK_JAVA)
-            h.set_ptr(1)
-            h.set_input(parts[1])
-            if self.java_pending_args:
-                h.set_condition(self.java_pending_args['condition'])
-                h.set_logic(self.java_pending_args['logic'])
-                self.java_pending_args = None
-            self.java_hooks[h.get_input()] = h
-            self.onAddJavaHook.emit(h)
-        elif cmd == 'hook_java_on_load_callback':
-            h = Hook(Hook.HOOK_JAVA)
-            h.set_ptr(0)
-            h.set_input(parts[1])
-            self.java_on_loads[parts[1]] = h
-            self.onAddJavaOnLoadHook.emit(h)
-        elif cmd == 'hook_native_callback':
-            h = Hook(Hook.HOOK_NATIVE)
-            h.set_ptr(int(parts[1], 16))
-            h.set_input(self.temporary_input)
-            h.set_bytes(binascii.unhexlify(parts[2]))
-            self.temporary_input = ''
-            h.set_condition(parts[4])
-            h.set_logic(parts[3])
-            h.internalHook = parts[5] == 'true'
-            self.native_pending_args = None
-            if not h.internalHook:
-                self.hooks[h.get_ptr()] = h
-                self.onAddNativeHook.emit(h)
-        elif cmd == 'hook_native_on_load_callback':
-            h = Hook(Hook.HOOK_ONLOAD)
-            h.set_ptr(0)
-            h.set_input(parts[1])
-            self.native_on_loads[parts[1]] = h
-            self.onAddNativeOnLoadHook.emit(h)
-        elif cmd == 'hook_deleted':
-            if parts[1] == 'java':
-                self.java_hooks.pop(parts[2])
-            elif parts[1] == 'native_on_load':
-                self.native_on_loads.pop(parts[2])
-            elif parts[1] == 'java_on_load':
-                self.java_on_loads.pop(parts[2])
-            else:
-                self.hooks.pop(utils.parse_ptr(parts[2]))
-            self.onDeleteHook.emit(parts)
-        elif cmd == 'java_on_load_callback':
-            str_fmt = ('Hook java onload {0} @thread := {1}'.format(parts[1], parts[2]))
-            self.log(str_fmt)
-            self.onHitJavaOnLoad.emit(parts[1])
-        elif cmd == 'java_trace':
-            self.onJavaTraceEvent.emit(parts)
-        elif cmd == 'log':
-            self.log(parts[1])
-        elif cmd == 'native_on_load_callback':
-            str_fmt = ('Hook native onload {0} @thread := {1}'.format(parts[1], parts[3]))
-            self.log(str_fmt)
-            self.onHitNativeOnLoad.emit([parts[1], parts[2]])
-        elif cmd == 'native_on_load_module_loading':
-            str_fmt = ('@thread {0} loading module := {1}'.format(parts[1], parts[2]))
-            self.log(str_fmt)
-        elif cmd == 'release':
-            if parts[1] in self.contexts:
-                del self.contexts[parts[1]]
-            self.onThreadResumed.emit(int(parts[1]))
-        elif cmd == 'resume':
-            if not self.resumed:
-                self.resume_proc()
-        elif cmd == 'release_js':
-            # releasing the thread must be done by calling py funct dwarf_api('release')
-            # there are cases in which we want to release the thread from a js api so we need to call this
-            self.onRequestJsThreadResume.emit(int(parts[1]))
-        elif cmd == 'set_context':
-            data = json.loads(parts[1])
-            if 'modules' in data:
-                self.onSetModules.emit(data['modules'])
-            if 'ranges' in data:
-                self.onSetRanges.emit(data['ranges'])
-            if 'backtrace' in data:
-                self.onBackTrace.emit(data['backtrace'])
-
-            self.onApplyContext.emit(data)
-        elif cmd == 'set_context_value':
-            context_property = parts[1]
-            value = parts[2]
-            self.onContextChanged.emit(str(context_property), value)
-        elif cmd == 'set_data':
-            if data:
-                self.onSetData.emit(['raw', parts[1], data])
-            else:
-                self.onSetData.emit(['plain', parts[1], str(parts[2])])
-        elif cmd == 'tracer':
-            self.onTraceData.emit(parts[1])
-        elif cmd == 'unhandled_exception':
-            # todo
-            pass
-        elif cmd == 'update_modules':
-            modules = json.loads(parts[2])
-            # todo update onloads bases
-            self.onSetModules.emit(modules)
-        elif cmd == 'update_ranges':
-            self.onSetRanges.emit(json.loads(parts[2]))
-        elif cmd == 'watcher':
-            exception = json.loads(parts[1])
-            self.log('watcher hit op %s address %s @thread := %s' %
-                     (exception['memory']['operation'], exception['memory']['address'], parts[2]))
-        elif cmd == 'watcher_added':
-            self._watchers.append(utils.parse_ptr(parts[1]))
-            self.onWatcherAdded.emit(parts[1], int(parts[2]))
-        elif cmd == 'watcher_removed':
-            self._watchers.remove(utils.parse_ptr(parts[1]))
-            self.onWatcherRemoved.emit(parts[1])
-        elif cmd == 'memoryscan_result':
-            if parts[1] == '':
-                self.onMemoryScanResult.emit([])
-            else:
-                self.onMemoryScanResult.emit(json.loads(parts[1]))
+    def _handle_ftrace(self, message, data):
+        if self._app_window.ftrace is not None:
+            self._app_window.ftrace.append_data(message['data'])
+
+    def _handle_enable_kernel(self, message, data):
+        self._app_window.get_menu().enable_kernel_menu()
+
+    @staticmethod
+    def _on_dump_progress(progress, label, value, rate):
+        progress.setLabelText('{0} - {1:.1f} MB/s'.format(label, rate / (1024 * 1024)))
+        progress.setValue(value)
+
+    def _on_dump_finished(self, dump_thread, progress, completed):
+        progress.close()
+        dump = dump_thread.dump
+        if completed:
+            self.log('dumped {0:d} bytes to {1} in {2:.2f}s'.format(dump.written, dump.file_path, dump.elapsed))
         else:
-            print('unknown message: ' + what)
+            self.log('dump to {0} cancelled'.format(dump.file_path))
+        if dump_thread in self._dump_threads:
+            self._dump_threads.remove(dump_thread)
 
-    def _on_apply_context(self, context_data):
-        reason = context_data['reason']
-        if reason == -1:
-            # set initial context
-            self._arch = context_data['arch']
-            self._platform = context_data['platform']
-            self._pointer_size = context_data['pointerSize']
-            self.java_available = context_data['java']
-            str_fmt = ('injected into := {0:d}'.format(self.pid))
-            self.log(str_fmt)
-
-            # unlock java on loads
-            if self.java_available:
-                self._app_window.hooks_panel.new_menu.addAction(
-                    'Java class loading', self._app_window.hooks_panel._on_add_java_on_load)
-        elif 'context' in context_data:
-            context = Context(context_data['context'])
-            self.contexts[str(context_data['tid'])] = context
-
-            sym = ''
-            if 'pc' in context_data['context']:
-                name = context_data['ptr']
-                if 'symbol' in context_data['context']['pc'] and \
-                        context_data['context']['pc']['symbol']['name'] is not None:
-                    sym = context_data['context']['pc']['symbol']['moduleName']
-                    sym += ' - '
-                    sym += context_data['context']['pc']['symbol']['name']
-            else:
-                name = context_data['ptr']
+    def _on_api_request_completed(self, request):
+        if not request.cancelled and request.callback is not None:
+            request.callback(request.result)
 
-            if context_data['reason'] == 0:
-                self.log('hook %s %s @thread := %d' % (name, sym, context_data['tid']))
+    def _on_apply_context(self, context_data):
+        super(Dwarf, self)._on_apply_context(context_data)
 
-        if not reason == -1 and self.context_tid == 0:
-            self.context_tid = context_data['tid']
+        # unlock java on loads
+        if context_data['reason'] == -1 and self.java_available:
+            self._app_window.hooks_panel.new_menu.addAction(
+                'Java class loading', self._app_window.hooks_panel._on_add_java_on_load)
 
-    def _on_destroyed(self):
-        self._reinitialize()
-        str_fmt = ('Detached from {0:d}. Script destroyed.'.format(self.pid))
-        print(str_fmt)
-        self.log(str_fmt)
-        self.onScriptDestroyed.emit()
+    def _on_script_error(self, error_msg):
+        utils.show_message_box(error_msg)
 
     def _on_emulator(self, data):
         if not self._app_window.emulator_panel:
@@ -782,6 +503,7 @@ class Dwarf(QObject):
             self._app_window.show_main_tab('emulator')
 
         if self.emulator and self._emu_thread:
+            self._emu_thread.emulator = self.emulator
             if not self._emu_thread.isRunning():
                 self._emu_thread.cmd = data
                 self._emu_thread.start()
@@ -802,37 +524,23 @@ class Dwarf(QObject):
         if self._emu_queue:
             self._emu_queue.clear()
 
-    def _on_request_resume_from_js(self, tid):
-        self.dwarf_api('release', tid, tid=tid)
-
     def save_session(self):
-        hooks = None
-        native_on_loads = None
-        java_on_loads = None
-        watchers = None
-        if self._script is not None:
-            hooks = json.loads(self._script.exports.hooks())
-            for hook_key in list(hooks.keys()):
-                hook = hooks[hook_key]
-                if 'internalHook' in hook and hook['internalHook']:
-                    del hooks[hook_key]
-            native_on_loads = json.loads(self._script.exports.nativeonloads())
-            java_on_loads = json.loads(self._script.exports.javaonloads())
-            watchers = json.loads(self._script.exports.watchers())
-
         session_object = {
-            'session': self._app_window.session_manager.session.session_type,
-            'hooks': hooks,
-            'nativeOnLoads': native_on_loads,
-            'javaOnLoads': java_on_loads,
-            'watchers': watchers,
+            'session': self._app_window.session_manager.session.session_type
+        }
+        session_object.update(self.get_session())
+        session_object.update({
             'bookmarks': self._app_window.bookmarks_panel.bookmarks,
             'user_script': self._app_window.console_panel.get_js_console().function_content
-        }
+        })
 
         _file = QFileDialog.getSaveFileName(self._app_window)
         if len(_file) > 0:
             _file = _file[0]
+            # the string index is too big for the session json, it's saved aside
+            if len(self.string_index) > 0:
+                session_object['strings'] = _file + '.strings'
+                self.string_index.save(session_object['strings'])
             with open(_file, 'w') as f:
                 f.write(json.dumps(session_object, indent=2))
 
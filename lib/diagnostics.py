@@ -0,0 +1,212 @@
+"""
+Dwarf - Copyright (C) 2019 Giovanni Rocca (iGio90)
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>
+"""
+import csv
+import json
+import threading
+import time
+from collections import deque
+
+
+def payload_size(payload):
+    """ rough size in bytes of what travels on the wire for payload
+    """
+    if payload is None:
+        return 0
+    if isinstance(payload, (bytes, bytearray, str)):
+        return len(payload)
+    try:
+        return len(json.dumps(payload, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+def percentile(samples, pct):
+    """ nearest rank percentile of a sorted list
+    """
+    if not samples:
+        return 0
+    rank = int(round(pct / 100.0 * (len(samples) - 1)))
+    return samples[rank]
+
+
+class _ApiStats(object):
+    def __init__(self, max_samples):
+        self.calls = 0
+        self.errors = 0
+        self.total_time = 0
+        self.max_time = 0
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.samples = deque(maxlen=max_samples)
+
+
+class _MessageStats(object):
+    def __init__(self):
+        self.count = 0
+        self.bytes = 0
+        self.handler_time = 0
+        self.first = 0
+        self.last = 0
+
+
+class Diagnostics(object):
+    """ Diagnostics
+
+        collects host side numbers of the api round-trips and of the messages
+        coming from the agent. agent side timings are merged in with set_agent_stats
+
+        times are stored in seconds and reported in ms
+    """
+
+    def __init__(self, enabled=False, max_samples=2048):
+        self.enabled = enabled
+        self._max_samples = max_samples
+        self._lock = threading.Lock()
+        self._apis = {}
+        self._messages = {}
+        self._agent_stats = {'api': {}, 'send': {}}
+        self._start = time.time()
+
+    def reset(self):
+        with self._lock:
+            self._apis = {}
+            self._messages = {}
+            self._agent_stats = {'api': {}, 'send': {}}
+            self._start = time.time()
+
+    def record_api(self, api, elapsed, bytes_out=0, bytes_in=0, error=False):
+        with self._lock:
+            if api not in self._apis:
+                self._apis[api] = _ApiStats(self._max_samples)
+            stats = self._apis[api]
+            stats.calls += 1
+            if error:
+                stats.errors += 1
+            stats.total_time += elapsed
+            stats.max_time = max(stats.max_time, elapsed)
+            stats.bytes_out += bytes_out
+            stats.bytes_in += bytes_in
+            stats.samples.append(elapsed)
+
+    def record_message(self, msg_type, elapsed, size=0):
+        now = time.time()
+        with self._lock:
+            if msg_type not in self._messages:
+                self._messages[msg_type] = _MessageStats()
+                self._messages[msg_type].first = now
+            stats = self._messages[msg_type]
+            stats.count += 1
+            stats.bytes += size
+            stats.handler_time += elapsed
+            stats.last = now
+
+    def set_agent_stats(self, agent_stats):
+        """ agent_stats: {'api': {name: {count, time, max}}, 'send': {type: {count, time, max}}}
+            as returned by the agent stats export
+        """
+        if not isinstance(agent_stats, dict):
+            return
+        with self._lock:
+            self._agent_stats = {
+                'api': agent_stats.get('api', {}),
+                'send': agent_stats.get('send', {})
+            }
+
+    def api_rows(self):
+        rows = []
+        with self._lock:
+            for api in sorted(self._apis):
+                stats = self._apis[api]
+                samples = sorted(stats.samples)
+                agent = self._agent_stats['api'].get(api)
+                host_avg = stats.total_time / stats.calls * 1000
+                row = {
+                    'name': api,
+                    'count': stats.calls,
+                    'errors': stats.errors,
+                    'avg_ms': round(host_avg, 3),
+                    'p50_ms': round(percentile(samples, 50) * 1000, 3),
+                    'p95_ms': round(percentile(samples, 95) * 1000, 3),
+                    'p99_ms': round(percentile(samples, 99) * 1000, 3),
+                    'max_ms': round(stats.max_time * 1000, 3),
+                    'bytes_out': stats.bytes_out,
+                    'bytes_in': stats.bytes_in,
+                    'agent_avg_ms': '',
+                    'transport_avg_ms': ''
+                }
+                if agent is not None and agent.get('count', 0) > 0:
+                    # agent times are in ms
+                    agent_avg = agent['time'] / agent['count']
+                    row['agent_avg_ms'] = round(agent_avg, 3)
+                    row['transport_avg_ms'] = round(max(host_avg - agent_avg, 0), 3)
+                rows.append(row)
+        return rows
+
+    def message_rows(self):
+        rows = []
+        now = time.time()
+        with self._lock:
+            for msg_type in sorted(self._messages):
+                stats = self._messages[msg_type]
+                elapsed = max(now - self._start, 0.001)
+                agent = self._agent_stats['send'].get(msg_type)
+                row = {
+                    'name': msg_type,
+                    'count': stats.count,
+                    'rate_s': round(stats.count / elapsed, 2),
+                    'bytes': stats.bytes,
+                    'handler_avg_ms': round(stats.handler_time / stats.count * 1000, 3),
+                    'agent_send_avg_ms': ''
+                }
+                if agent is not None and agent.get('count', 0) > 0:
+                    row['agent_send_avg_ms'] = round(agent['time'] / agent['count'], 3)
+                rows.append(row)
+        return rows
+
+    def to_dict(self):
+        with self._lock:
+            agent_stats = dict(self._agent_stats)
+        return {
+            'uptime': time.time() - self._start,
+            'apis': self.api_rows(),
+            'messages': self.message_rows(),
+            'agent': agent_stats
+        }
+
+    def dump_json(self, path):
+        with open(path, 'w') as f:
+            f.write(json.dumps(self.to_dict(), indent=2))
+
+    def dump_csv(self, path):
+        api_rows = self.api_rows()
+        message_rows = self.message_rows()
+
+        fields = ['kind']
+        for row in api_rows + message_rows:
+            for key in row:
+                if key not in fields:
+                    fields.append(key)
+
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fields, restval='')
+            writer.writeheader()
+            for row in api_rows:
+                row['kind'] = 'api'
+                writer.writerow(row)
+            for row in message_rows:
+                row['kind'] = 'message'
+                writer.writerow(row)
@@ -0,0 +1,171 @@
+"""
+Dwarf - Copyright (C) 2019 Giovanni Rocca (iGio90)
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>
+"""
+import bisect
+import threading
+from collections import OrderedDict
+
+from capstone import CS_ARCH_X86, CS_MODE_THUMB
+
+from lib.instruction import Instruction
+
+# longest instruction of the supported archs (x86)
+MAX_INSTRUCTION_SIZE = 15
+
+
+class DisassemblyBlocks(object):
+    """ DisassemblyBlocks
+
+        instructions of a Range decoded on demand in blocks of BLOCK_SIZE bytes. a block is decoded
+        from where the last instruction of the block before it ends, when that one is decoded, so
+        variable length instructions stay in sync. a block decoded before its predecessor is
+        decoded again once the predecessor shows it started out of sync. anchors (the addresses
+        the range was opened at) always start an instruction
+
+        bytes which don't decode are skipped. the jump symbols of a block are resolved in one call.
+        the least recently used blocks are dropped past MAX_BLOCKS
+    """
+
+    BLOCK_SIZE = 0x1000
+    MAX_BLOCKS = 256
+
+    def __init__(self, dwarf, dwarf_range, capstone):
+        self.dwarf = dwarf
+        self.base = dwarf_range.base
+        self.size = dwarf_range.size
+        self.data = dwarf_range.data
+        self.mode = capstone.mode
+
+        self._capstone = capstone
+        # block index -> (entry address, [Instruction])
+        self._blocks = OrderedDict()
+        self._anchors = []
+        self._lock = threading.Lock()
+
+        if capstone.arch == CS_ARCH_X86:
+            self._alignment = 1
+        elif capstone.mode & CS_MODE_THUMB:
+            self._alignment = 2
+        else:
+            self._alignment = 4
+
+    @property
+    def tail(self):
+        return self.base + self.size
+
+    @property
+    def count(self):
+        return (self.size + self.BLOCK_SIZE - 1) // self.BLOCK_SIZE
+
+    def block_index(self, address):
+        return (address - self.base) // self.BLOCK_SIZE
+
+    def block(self, index):
+        """ instructions of the block, None when not decoded yet
+        """
+        with self._lock:
+            entry = self._blocks.get(index)
+            if entry is None:
+                return None
+            self._blocks.move_to_end(index)
+            return entry[1]
+
+    def add_anchor(self, address):
+        """ address known to start an instruction, i.e. a jump target
+        """
+        with self._lock:
+            i = bisect.bisect_left(self._anchors, address)
+            if i < len(self._anchors) and self._anchors[i] == address:
+                return
+            self._anchors.insert(i, address)
+            # drop what got decoded across it
+            index = self.block_index(address)
+            for block_index in (index - 1, index):
+                entry = self._blocks.get(block_index)
+                if entry is None:
+                    continue
+                if address < entry[0] or any(instruction.address < address < instruction.address + len(instruction.bytes)
+                                             for instruction in entry[1]):
+                    del self._blocks[block_index]
+
+    def decode(self, index):
+        """ decode the block (again) and return its instructions
+        """
+        start = self.base + index * self.BLOCK_SIZE
+        end = min(start + self.BLOCK_SIZE, self.tail)
+        entry = start
+        previous = self.block(index - 1)
+        if previous:
+            # the last instruction of the previous block can spill into this one
+            last = previous[-1]
+            entry = max(start, last.address + len(last.bytes))
+
+        instructions = []
+        address = entry
+        data = self.data[entry - self.base:min(end + MAX_INSTRUCTION_SIZE, self.tail) - self.base]
+        while address < end:
+            decoded = False
+            i = bisect.bisect_right(self._anchors, address)
+            anchor = self._anchors[i] if i < len(self._anchors) else None
+            for cap_inst in self._capstone.disasm(data[address - entry:], address):
+                if cap_inst.address >= end:
+                    address = end
+                    break
+                if anchor is not None and cap_inst.address + cap_inst.size > anchor:
+                    # restart at the anchor
+                    address = anchor
+                    decoded = True
+                    break
+                instructions.append(Instruction(self.dwarf, cap_inst, resolve_symbol=False))
+                address = cap_inst.address + cap_inst.size
+                decoded = True
+            if not decoded:
+                address += self._alignment - (address - self.base) % self._alignment
+
+        jumps = [instruction.jump_address for instruction in instructions if instruction.jump_address != 0]
+        if jumps:
+            symbols = self.dwarf.symbol_resolver.resolve(jumps)
+            for instruction in instructions:
+                if instruction.jump_address != 0:
+                    instruction.set_symbol(symbols[instruction.jump_address])
+
+        with self._lock:
+            self._blocks[index] = (entry, instructions)
+            following = self._blocks.get(index + 1)
+            if following is not None:
+                spill = instructions[-1].address + len(instructions[-1].bytes) if instructions else start
+                if following[0] != max(spill, end):
+                    # decoded out of sync
+                    del self._blocks[index + 1]
+            while len(self._blocks) > self.MAX_BLOCKS:
+                self._blocks.popitem(last=False)
+        return instructions
+
+    def instructions(self, first, last):
+        """ instructions of the decoded blocks [first, last], stops at the first one not decoded
+        """
+        lines = []
+        for index in range(max(first, 0), min(last, self.count - 1) + 1):
+            block = self.block(index)
+            if block is None:
+                break
+            lines += block
+        return lines
+
+    def find(self, lines, address):
+        """ index in lines of the instruction at address, or of the first one after it
+        """
+        return bisect.bisect_left([line.address for line in lines], address)
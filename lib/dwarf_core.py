@@ -0,0 +1,1213 @@
+"""
+Dwarf - Copyright (C) 2019 Giovanni Rocca (iGio90)
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>
+"""
+import os
+import binascii
+import json
+import mmap
+import queue
+import threading
+import time
+
+import frida
+
+from lib import utils
+from lib.context import Context
+from lib.diagnostics import Diagnostics, payload_size
+from lib.hook import Hook
+from lib.kernel import Kernel
+from lib.memory_cache import MemoryCache
+from lib.memory_diff import MemoryDiff
+from lib.memory_dump import MemoryDump
+from lib.patch_index import PatchIndex
+from lib.pointer_scan import PointerMapBuilder
+from lib.snapshot import Snapshot, SnapshotCapture
+from lib.script_cache import ScriptCache
+from lib.search_pattern import SearchPattern
+from lib.string_index import StringIndex, StringIndexer
+from lib.symbol_resolver import SymbolResolver
+
+
+class _Dispatcher(threading.Thread):
+    """ runs event callbacks and deferred work away from the frida thread
+        so that they can call back into the agent
+    """
+
+    def __init__(self):
+        super().__init__(name='DwarfDispatcher', daemon=True)
+        self._queue = queue.Queue()
+
+    def post(self, fn, args):
+        self._queue.put((fn, args))
+
+    def stop(self):
+        self._queue.put(None)
+
+    def run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            fn, args = item
+            try:
+                fn(*args)
+            except Exception as e:  # pylint: disable=broad-except
+                print('dispatcher: ' + str(e))
+
+
+# apis after which the cached target memory can't be trusted anymore
+_MEMORY_INVALIDATING_APIS = (
+    'deleteHook', 'evaluate', 'evaluateFunction', 'hookNative', 'injectBlob', 'release', 'resume'
+)
+
+# value scans, as understood by the agent
+VALUE_SCAN_TYPES = ('int8', 'int16', 'int32', 'int64', 'float', 'double')
+VALUE_SCAN_CONDITIONS = ('unknown', 'equals', 'changed', 'unchanged', 'increased', 'decreased')
+
+
+class DwarfCore(object):
+    """ DwarfCore
+
+        frida session, agent api and agent messages without any ui or qt dependency
+
+        events are named after the signals of the qt Dwarf (onAddNativeHook, onLogToConsole...)
+        and can be listened with on(event, callback). callbacks run on a dispatcher thread
+    """
+
+    class NoDeviceAssignedError(Exception):
+        """ Raised when no Device
+        """
+
+    class CoreScriptNotFoundError(Exception):
+        """ Raised when dwarfscript not found
+        """
+
+    # ************************************************************************
+    # **************************** Init **************************************
+    # ************************************************************************
+    def __init__(self, device=None, debug_script=False, diagnostics=False, **kwargs):
+        super(DwarfCore, self).__init__(**kwargs)
+
+        self.debug_script = debug_script
+
+        self.java_available = False
+
+        # frida device
+        self._device = device
+
+        # process
+        self._pid = 0
+        self._process = None
+        self._script = None
+        self._spawned = False
+        self._resumed = False
+
+        # kernel
+        self._kernel = Kernel(self)
+
+        self._watchers = []
+
+        # hooks
+        self.hooks = {}
+        self.native_on_loads = {}
+        self.java_on_loads = {}
+        self.java_hooks = {}
+        self.temporary_input = ''
+        self.native_pending_args = None
+        self.java_pending_args = None
+
+        # context
+        self._arch = ''
+        self._pointer_size = 0
+        self.contexts = {}
+        self.context_tid = 0
+        self._platform = ''
+
+        # tracers
+        self._native_traced_tid = 0
+
+        # api calls dispatched to threads parked in a hook context
+        self._api_lock = threading.Lock()
+        self._api_request_id = 0
+        self._api_requests = {}
+
+        # rpc and message path instrumentation
+        self.diagnostics = Diagnostics(enabled=diagnostics)
+
+        # target memory pages, shared by everything reading through read_memory
+        self.memory_cache = MemoryCache()
+
+        # original bytes of the native hooks, overlaid on the ranges memory
+        self.hook_patches = PatchIndex()
+
+        # opened snapshot, serves read_memory and ranges instead of the target
+        self.snapshot = None
+
+        # strings of the target memory, searched without touching the target
+        self.string_index = StringIndex()
+
+        # DebugSymbols of the target addresses, looked up in batches
+        self.symbol_resolver = SymbolResolver(self._lookup_symbols)
+
+        # page hashes baseline to find what changed in memory
+        self.memory_diff = MemoryDiff(self)
+
+        # agent snapshots, set to None to always load the agent from source
+        self.script_cache = ScriptCache()
+        self.injection_time = 0
+
+        # event listeners
+        self._listeners = {}
+        self._dispatcher = None
+
+        # agent messages dispatch table
+        self._message_handlers = {
+            'api_result': self._handle_api_result,
+            'class_loader_loading_class': self._handle_class_loader_loading_class,
+            'emulator': self._handle_emulator,
+            'enable_kernel': self._handle_enable_kernel,
+            'enumerate_java_classes_complete': self._handle_enumerate_java_classes_complete,
+            'enumerate_java_classes_match': self._handle_enumerate_java_classes_match,
+            'enumerate_java_classes_start': self._handle_enumerate_java_classes_start,
+            'enumerate_java_methods_complete': self._handle_enumerate_java_methods_complete,
+            'ftrace': self._handle_ftrace,
+            'hook_deleted': self._handle_hook_deleted,
+            'hook_java_callback': self._handle_hook_java_callback,
+            'hook_java_on_load_callback': self._handle_hook_java_on_load_callback,
+            'hook_native_callback': self._handle_hook_native_callback,
+            'hook_native_on_load_callback': self._handle_hook_native_on_load_callback,
+            'java_on_load_callback': self._handle_java_on_load_callback,
+            'java_trace': self._handle_java_trace,
+            'log': self._handle_log,
+            'memoryscan_complete': self._handle_memoryscan_complete,
+            'memoryscan_progress': self._handle_memoryscan_progress,
+            'memoryscan_result': self._handle_memoryscan_result,
+            'memoryscan_start': self._handle_memoryscan_start,
+            'native_on_load_callback': self._handle_native_on_load_callback,
+            'native_on_load_module_loading': self._handle_native_on_load_module_loading,
+            'release': self._handle_release,
+            'release_js': self._handle_release_js,
+            'resume': self._handle_resume,
+            'set_context': self._handle_set_context,
+            'set_context_value': self._handle_set_context_value,
+            'set_data': self._handle_set_data,
+            'tracer': self._handle_tracer,
+            'update_modules': self._handle_update_modules,
+            'update_ranges': self._handle_update_ranges,
+            'valuescan_complete': self._handle_valuescan_complete,
+            'valuescan_progress': self._handle_valuescan_progress,
+            'valuescan_start': self._handle_valuescan_start,
+            'watcher': self._handle_watcher,
+            'watcher_added': self._handle_watcher_added,
+            'watcher_removed': self._handle_watcher_removed,
+        }
+
+    def _reinitialize(self):
+        self.java_available = False
+
+        # frida device
+        self._device = None
+
+        # process
+        self._process = None
+        self._script = None
+
+        # hooks
+        self.hooks = {}
+        self.native_on_loads = {}
+        self.java_on_loads = {}
+        self.java_hooks = {}
+        self.temporary_input = ''
+        self.native_pending_args = None
+        self.java_pending_args = None
+
+        # tracers
+        self._native_traced_tid = 0
+
+        self.context_tid = 0
+
+        self.memory_cache.invalidate()
+        self.hook_patches.clear()
+        self.string_index.clear()
+        self.symbol_resolver.invalidate()
+
+    # ************************************************************************
+    # **************************** Properties ********************************
+    # ************************************************************************
+    @property
+    def kernel(self):
+        return self._kernel
+
+    @property
+    def native_trace_tid(self):
+        return self._native_traced_tid
+
+    @property
+    def arch(self):
+        return self._arch
+
+    @property
+    def pid(self):
+        return self._pid
+
+    @property
+    def platform(self):
+        return self._platform
+
+    @property
+    def pointer_size(self):
+        return self._pointer_size
+
+    @property
+    def process(self):
+        return self._process
+
+    @property
+    def script(self):
+        return self._script
+
+    @property
+    def device(self):
+        return self._device
+
+    @device.setter
+    def device(self, value):
+        try:
+            if isinstance(value, frida.core.Device):
+                self._device = value
+        except ValueError:
+            self._device = None
+
+    @property
+    def resumed(self):
+        return self._resumed == True
+
+    # ************************************************************************
+    # **************************** Events ************************************
+    # ************************************************************************
+    def on(self, event, callback):
+        """ listen to event, see the signals of the qt Dwarf for names and arguments
+        """
+        if event not in self._listeners:
+            self._listeners[event] = []
+        self._listeners[event].append(callback)
+
+    def _emit(self, event, *args):
+        if event in self._listeners:
+            self._post(self._dispatch_event, event, args)
+
+    def _emit_batch(self, event, items):
+        """ events carrying lists of high rate items
+        """
+        self._emit(event, items)
+
+    def _flush_batches(self):
+        pass
+
+    def _dispatch_event(self, event, args):
+        for callback in self._listeners.get(event, []):
+            callback(*args)
+
+    def _post(self, fn, *args):
+        """ run fn out of the frida thread, in order
+        """
+        if self._dispatcher is None:
+            self._dispatcher = _Dispatcher()
+            self._dispatcher.start()
+        self._dispatcher.post(fn, args)
+
+    def _stop_dispatcher(self, timeout=None):
+        if self._dispatcher is not None:
+            dispatcher = self._dispatcher
+            self._dispatcher = None
+            dispatcher.stop()
+            if dispatcher is not threading.current_thread():
+                dispatcher.join(timeout)
+
+    # ************************************************************************
+    # **************************** Functions *********************************
+    # ************************************************************************
+    def is_address_watched(self, ptr):
+        ptr = utils.parse_ptr(ptr)
+        if ptr in self._watchers:
+            return True
+
+        return False
+
+    def attach(self, pid, script=None, print_debug_error=True):
+        """ Attach to pid
+        """
+        if self.device is None:
+            raise self.NoDeviceAssignedError('No Device assigned')
+
+        if self._process is not None:
+            self.detach()
+
+        was_error = False
+        error_msg = ''
+
+        # for commandline arg
+        if isinstance(pid, str):
+            try:
+                process = self.device.get_process(pid)
+                pid = [process.pid, process.name]
+            except frida.ProcessNotFoundError as error:
+                raise Exception('Frida Error: ' + str(error))
+
+        if not isinstance(pid, list):
+            raise Exception('Error pid!=list')
+
+        try:
+            self._process = self.device.attach(pid[0])
+            #self._process.enable_jit()
+            self._pid = pid[0]
+        except frida.ProcessNotFoundError:
+            error_msg = 'Process not found (ProcessNotFoundError)'
+            was_error = True
+        except frida.ProcessNotRespondingError:
+            error_msg = 'Process not responding (ProcessNotRespondingError)'
+            was_error = True
+        except frida.TimedOutError:
+            error_msg = 'Frida timeout (TimedOutError)'
+            was_error = True
+        except frida.ServerNotRunningError:
+            error_msg = 'Frida not running (ServerNotRunningError)'
+            was_error = True
+        except frida.TransportError:
+            error_msg = 'Frida timeout was reached (TransportError)'
+            was_error = True
+        # keep for debug
+        except Exception as error:  # pylint: disable=broad-except
+            error_msg = error
+            was_error = True
+
+        if was_error:
+            raise Exception(error_msg)
+
+        self._emit('onAttached', [self.pid, pid[1]])
+        self.load_script(script)
+
+    def detach(self):
+        if self._script is not None:
+            self.dwarf_api('_detach')
+            self._script.unload()
+        if self._process is not None:
+            self._process.detach()
+            if self._spawned:
+                self.device.kill(self.pid)
+        self._stop_dispatcher(timeout=5)
+
+    def load_script(self, script=None, spawned=False):
+        try:
+            if not os.path.exists('lib/core.js'):
+                raise self.CoreScriptNotFoundError('core.js not found!')
+
+            with open('lib/core.js', 'r') as core_script:
+                script_content = core_script.read()
+
+            start = time.perf_counter()
+            target = self._get_script_cache_target()
+            from_snapshot = self._create_agent(script_content, target)
+            try:
+                self._script.exports.init(self.debug_script, spawned)
+            except frida.core.RPCException:
+                if not from_snapshot:
+                    raise
+                # the snapshot didn't bring the agent up, drop it and go with the source
+                self._script.off('destroyed', self._on_destroyed)
+                self._script.unload()
+                self.script_cache.invalidate(script_content, 'v8', target)
+                from_snapshot = self._create_agent(script_content, target, use_cache=False)
+                self._script.exports.init(self.debug_script, spawned)
+
+            self.injection_time = (time.perf_counter() - start) * 1000
+            self.log('agent injected in {0:.1f} ms{1}'.format(
+                self.injection_time, ' (snapshot)' if from_snapshot else ''))
+
+            if script is not None:
+                if os.path.exists(script):
+                    with open(script, 'r') as script_file:
+                        user_script = script_file.read()
+
+                    self.dwarf_api('evaluateFunction', user_script)
+
+            # resume immediately
+            self.resume_proc()
+
+            self._emit('onScriptLoaded')
+            return 0
+        except frida.ProcessNotFoundError:
+            error_msg = 'Process not found (ProcessNotFoundError)'
+            was_error = True
+        except frida.ProcessNotRespondingError:
+            error_msg = 'Process not responding (ProcessNotRespondingError)'
+            was_error = True
+        except frida.TimedOutError:
+            error_msg = 'Frida timeout (TimedOutError)'
+            was_error = True
+        except frida.ServerNotRunningError:
+            error_msg = 'Frida not running (ServerNotRunningError)'
+            was_error = True
+        except frida.TransportError:
+            error_msg = 'Frida timeout was reached (TransportError)'
+            was_error = True
+
+        if was_error:
+            self._on_script_error(error_msg)
+            self._on_destroyed()
+        return 1
+
+    def _create_agent(self, source, target, use_cache=True):
+        """ create and load the agent script, returns True when it comes from a cached snapshot
+        """
+        from_snapshot = False
+        if use_cache and self.script_cache is not None:
+            self._script, from_snapshot = self.script_cache.create_script(
+                self._process, source, runtime='v8', target=target)
+        else:
+            self._script = self._process.create_script(source, runtime='v8')
+        self._script.on('message', self._on_message)
+        self._script.on('destroyed', self._on_destroyed)
+        self._script.load()
+        return from_snapshot
+
+    def _get_script_cache_target(self):
+        """ snapshots are bound to the target os/arch
+        """
+        try:
+            params = self.device.query_system_parameters()
+            return '{0}-{1}'.format(params['os']['id'], params['arch'])
+        except Exception:  # pylint: disable=broad-except
+            return self.device.id
+
+    def spawn(self, package, script=None):
+        if self.device is None:
+            raise self.NoDeviceAssignedError('No Device assigned')
+
+        if self._process is not None:
+            self.detach()
+        try:
+            self._pid = self.device.spawn(package)
+            self._process = self.device.attach(self._pid)
+            #self._process.enable_jit()
+            self._spawned = True
+        except Exception as e:
+            raise Exception('Frida Error: ' + str(e))
+
+        self._emit('onAttached', [self.pid, package])
+        self.load_script(script, spawned=True)
+
+    def resume_proc(self):
+        if self._spawned and not self._resumed:
+            self._resumed = True
+            try:
+                self.device.resume(self._pid)
+            except frida.InvalidOperationError:
+                # already resumed from other loc
+                pass
+
+    def add_watcher(self, ptr):
+        return self.dwarf_api('addWatcher', ptr)
+
+    def create_memory_dump(self, file_path, ptr, length, progress=None):
+        """ MemoryDump streaming the memory to file_path, dumps bypass the memory cache
+        """
+        return MemoryDump(self._read_memory, file_path, ptr, length, progress=progress, log=self.log)
+
+    def dump_memory(self, file_path, ptr, length):
+        return self.create_memory_dump(file_path, ptr, length).run()
+
+    def create_string_indexer(self, ranges=None, reindex=False, progress=None):
+        """ StringIndexer filling string_index with the readable ranges, from the snapshot when one is opened
+
+            ranges is a list of (base, size), all of them when None
+        """
+        if self.snapshot is not None:
+            snapshot = self.snapshot
+            if ranges is None:
+                ranges = [(int(r['base'], 16), r['size']) for r in snapshot.get_ranges() if 'r' in r['protection']]
+            create_dump = lambda ptr, length: MemoryDump(snapshot.read, None, ptr, length, log=self.log)
+        else:
+            if ranges is None:
+                ranges = [(int(r['base'], 16), int(r['size'])) for r in self.dwarf_api('enumerateRanges') or []
+                          if 'r' in r['protection']]
+            create_dump = lambda ptr, length: self.create_memory_dump(None, ptr, length)
+        return StringIndexer(self.string_index, ranges, create_dump, reindex=reindex, progress=progress)
+
+    def create_dump_string_indexer(self, file_path, base, progress=None):
+        """ StringIndexer adding a raw dump file, mapped at base, to string_index
+        """
+        with open(file_path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        create_dump = lambda ptr, length: MemoryDump(
+            lambda address, size: data[address - base:address - base + size], None, ptr, length, log=self.log)
+        return StringIndexer(self.string_index, [(base, len(data))], create_dump, reindex=True, progress=progress)
+
+    def create_pointer_map_builder(self, progress=None):
+        """ PointerMapBuilder over the writable ranges, keeping the pointers into any readable range.
+            from the snapshot when one is opened
+        """
+        if self.snapshot is not None:
+            snapshot = self.snapshot
+            ranges = [(int(r['base'], 16), r['size'], r['protection']) for r in snapshot.get_ranges()]
+            modules = snapshot.modules
+            create_dump = lambda ptr, length: MemoryDump(snapshot.read, None, ptr, length, log=self.log)
+        else:
+            ranges = [(int(r['base'], 16), int(r['size']), r['protection'])
+                      for r in self.dwarf_api('enumerateRanges') or []]
+            modules = json.loads(self.dwarf_api('enumerateModules') or '[]')
+            create_dump = lambda ptr, length: self.create_memory_dump(None, ptr, length)
+        writable = [(base, size) for base, size, protection in ranges if 'w' in protection and 'r' in protection]
+        readable = [(base, size) for base, size, protection in ranges if 'r' in protection]
+        return PointerMapBuilder(writable, readable, create_dump, pointer_size=self.pointer_size or 8,
+                                 modules=modules, progress=progress)
+
+    def resolve_pointer_paths(self, paths):
+        """ addresses the PointerPaths lead to in the current process (or snapshot), None for the broken ones
+        """
+        if self.snapshot is not None:
+            modules = self.snapshot.modules
+        else:
+            modules = json.loads(self.dwarf_api('enumerateModules') or '[]')
+        module_bases = {module['name']: utils.parse_ptr(module['base']) for module in modules}
+        pointer_size = self.pointer_size or 8
+
+        def read_pointer(address):
+            data = self.read_memory(address, pointer_size)
+            if data is None or len(data) != pointer_size:
+                return None
+            return int.from_bytes(data, 'little')
+
+        return [path.resolve(module_bases, read_pointer) for path in paths]
+
+    def create_snapshot_capture(self, file_path, progress=None):
+        """ SnapshotCapture of every readable range, the modules and the thread contexts
+        """
+        return SnapshotCapture(self, file_path, progress=progress)
+
+    def save_snapshot(self, file_path):
+        return self.create_snapshot_capture(file_path).run()
+
+    def open_snapshot(self, file_path):
+        """ memory reads, ranges and contexts are served by the snapshot until close_snapshot
+        """
+        snapshot = Snapshot(file_path)
+        self.close_snapshot()
+        self.snapshot = snapshot
+        if self.pid == 0:
+            self._arch = snapshot.arch
+            self._platform = snapshot.platform
+            self._pointer_size = snapshot.pointer_size
+            self.contexts = dict(snapshot.contexts)
+            if self.contexts:
+                self.context_tid = int(next(iter(self.contexts)))
+        self.memory_cache.invalidate()
+        self.log('opened snapshot of {0:d} taken on {1} ({2:d} ranges)'.format(
+            snapshot.pid, time.ctime(snapshot.time), len(snapshot.ranges)))
+        self._emit('onSetModules', snapshot.modules)
+        self._emit('onSetRanges', snapshot.get_ranges())
+
+    def close_snapshot(self):
+        if self.snapshot is not None:
+            self.snapshot.close()
+            self.snapshot = None
+            self.memory_cache.invalidate()
+
+    def dwarf_api(self, api, args=None, tid=0):
+        if self.pid == 0 or self.process is None:
+            return
+
+        # when tid is 0 we want to execute the api in the current hooked thread
+        # however, when we release from menu, what we want to do is to release multiple contexts at once
+        # so that we pass 0 as tid.
+        # we check here and setup special rules for release api
+        is_releasing = api == 'release'
+        if not is_releasing and tid == 0:
+            tid = self.context_tid
+
+        if args is not None and not isinstance(args, list):
+            args = [args]
+        if self._script is None:
+            return None
+
+        result = None
+        error = False
+        start = time.perf_counter()
+        try:
+            if tid == 0 and is_releasing:
+                for context_tid in list(self.contexts.keys()):
+                    self._context_api(context_tid, {'api': api, 'args': [int(context_tid)]})
+            elif tid != 0 and str(tid) in self.contexts:
+                result = self._context_api(tid, {'api': api, 'args': args})
+            else:
+                result = self._script.exports.api(tid, api, args)
+        except Exception as e:
+            error = True
+            self.log(str(e))
+
+        self._invalidate_memory(api, args)
+
+        if self.diagnostics.enabled:
+            self.diagnostics.record_api(api, time.perf_counter() - start,
+                                        bytes_out=payload_size(args), bytes_in=payload_size(result),
+                                        error=error)
+        return result
+
+    def dwarf_api_batch(self, calls, tid=0):
+        """ execute a list of [api, args] in a single round-trip
+
+            returns a list of [result, error] in the same order of calls
+        """
+        if self.pid == 0 or self.process is None or self._script is None:
+            return None
+
+        if tid == 0:
+            tid = self.context_tid
+
+        batch = []
+        for api, args in calls:
+            if args is None:
+                args = []
+            elif not isinstance(args, list):
+                args = [args]
+            batch.append([api, args])
+            self._invalidate_memory(api, args)
+
+        start = time.perf_counter()
+        try:
+            if str(tid) in self.contexts:
+                results = self._context_api(tid, {'batch': batch})
+            else:
+                results = self._script.exports.batch(tid, batch)
+        except Exception as e:
+            self.log(str(e))
+            results = None
+
+        if self.diagnostics.enabled:
+            self.diagnostics.record_api('batch', time.perf_counter() - start,
+                                        bytes_out=payload_size(batch), bytes_in=payload_size(results),
+                                        error=results is None)
+
+        if results is None:
+            return None
+
+        ret = []
+        for result in results:
+            if 'error' in result:
+                self.log(result['error'])
+                ret.append([None, result['error']])
+            elif 'raw' in result:
+                ret.append([bytes.fromhex(result['raw']), None])
+            else:
+                ret.append([result['result'], None])
+        return ret
+
+    def update_agent_stats(self):
+        """ pull the execution times measured on the agent side into diagnostics
+        """
+        if self._script is None:
+            return None
+        try:
+            stats = self._script.exports.stats()
+        except Exception as e:
+            self.log(str(e))
+            return None
+        self.diagnostics.set_agent_stats(stats)
+        return stats
+
+    def reset_diagnostics(self):
+        self.diagnostics.reset()
+        self.memory_cache.reset_stats()
+        if self._script is not None:
+            try:
+                self._script.exports.resetstats()
+            except Exception as e:
+                self.log(str(e))
+
+    def _context_api(self, tid, payload):
+        """ post the api call (or batch) into the mailbox of the thread parked in tid context
+            and block until the thread sends back the result
+        """
+        with self._api_lock:
+            self._api_request_id += 1
+            request_id = self._api_request_id
+            request = {'event': threading.Event(), 'result': None, 'error': None}
+            self._api_requests[request_id] = request
+
+        try:
+            payload['type'] = str(tid)
+            payload['id'] = request_id
+            self._script.post(payload)
+            while not request['event'].wait(0.5):
+                # the thread got released or the script died while waiting
+                if self._script is None or str(tid) not in self.contexts:
+                    return None
+        finally:
+            with self._api_lock:
+                self._api_requests.pop(request_id, None)
+
+        if request['error'] is not None:
+            raise Exception(request['error'])
+        return request['result']
+
+    def hook_java(self, input_, pending_args=None):
+        self.java_pending_args = pending_args
+        input_ = input_.replace(' ', '')
+        self.dwarf_api('hookJava', input_)
+
+    def hook_native(self, input_, pending_args=None, own_input=None):
+        ptr = utils.parse_ptr(self.dwarf_api('evaluatePtr', input_))
+        if ptr > 0:
+            self.temporary_input = input_
+            if own_input is not None:
+                self.temporary_input = own_input
+            self.native_pending_args = pending_args
+            self.dwarf_api('hookNative', ptr)
+
+    def hook_native_on_load(self, input_):
+        if input_ in self.native_on_loads:
+            return
+
+        self.dwarf_api('hookNativeOnLoad', input_)
+
+    def hook_java_on_load(self, input_):
+        if input_ in self.native_on_loads:
+            return
+
+        self.dwarf_api('hookJavaOnLoad', input_)
+
+    def log(self, what):
+        self._emit_batch('onLogToConsole', [str(what)])
+
+    def native_tracer_start(self, tid):
+        if self._native_traced_tid > 0:
+            return
+        self._native_traced_tid = tid
+        return self.dwarf_api('startNativeTracer', [tid, True])
+
+    def native_tracer_stop(self):
+        if self._native_traced_tid == 0:
+            return
+        self.dwarf_api('stopNativeTracer')
+        self._native_traced_tid = 0
+
+    def read_memory(self, ptr, length):
+        if self.snapshot is not None:
+            return self.snapshot.read(ptr, length)
+        return self.read_target_memory(ptr, length)
+
+    def read_target_memory(self, ptr, length):
+        """ read_memory from the target even when a snapshot is opened
+        """
+        return self.memory_cache.read(ptr, length, self._read_memory)
+
+    def _lookup_symbols(self, addresses):
+        return self.dwarf_api('getSymbolsByAddress', [[hex(address) for address in addresses]])
+
+    def get_range(self, ptr):
+        """ range containing ptr, from the snapshot when one is opened
+        """
+        if self.snapshot is not None:
+            return self.snapshot.get_range(ptr)
+        return self.dwarf_api('getRange', ptr)
+
+    def _read_memory(self, ptr, length):
+        if length > 1024 * 1024:
+            position = 0
+            next_size = 1024 * 1024
+            data = bytearray()
+            while True:
+                try:
+                    data += self.dwarf_api('readBytes', [ptr + position, next_size])
+                except:
+                    return None
+                position += next_size
+                diff = length - position
+                if diff > 1024 * 1024:
+                    next_size = 1024 * 1024
+                elif diff > 0:
+                    next_size = diff
+                else:
+                    break
+            ret = bytes(data)
+            del data
+            return ret
+        else:
+            return self.dwarf_api('readBytes', [ptr, length])
+
+    def _invalidate_memory(self, api, args):
+        if api == 'writeBytes':
+            try:
+                self.memory_cache.invalidate(utils.parse_ptr(args[0]), len(args[1]))
+            except (IndexError, TypeError, ValueError):
+                self.memory_cache.invalidate()
+        elif api in _MEMORY_INVALIDATING_APIS:
+            self.memory_cache.invalidate()
+
+    def remove_watcher(self, ptr):
+        return self.dwarf_api('removeWatcher', ptr)
+
+    def search(self, start, size, pattern):
+        return self.search_list([{'start': hex(utils.parse_ptr(start)), 'size': int(size)}], pattern)
+
+    def search_list(self, ranges_list, patterns, chunk_size=0):
+        """ scan ranges_list ([{'start', 'size'}]) for one or more patterns in a single pass, returns the scan id
+
+            patterns are hex strings or SearchPattern, matches are tagged with the index of their pattern.
+            the agent streams onMemoryScanResult / onMemoryScanProgress until onMemoryScanComplete,
+            starting a new scan cancels the running one
+        """
+        if not isinstance(patterns, list):
+            patterns = [patterns]
+        # convert to frida accepted patterns
+        patterns = SearchPattern.check_list([SearchPattern.parse('hex:' + pattern) if isinstance(pattern, str)
+                                             else pattern for pattern in patterns])
+        return self.dwarf_api('memoryScanList', [json.dumps(ranges_list),
+                                                 json.dumps([pattern.pattern for pattern in patterns]), chunk_size])
+
+    def cancel_search(self):
+        self.dwarf_api('cancelMemoryScan')
+
+    def value_scan(self, ranges_list, value_type, condition, value=None, chunk_size=0):
+        """ first pass of a value scan over ranges_list, condition is either 'unknown' or 'equals'
+
+            value_type is one of VALUE_SCAN_TYPES. candidates stay in the agent, which reports
+            onValueScanProgress and onValueScanComplete with their count. returns the pass id
+        """
+        return self.dwarf_api('valueScan', [json.dumps(ranges_list), value_type, condition,
+                                            None if value is None else str(value), chunk_size])
+
+    def value_scan_next(self, condition, value=None, chunk_size=0):
+        """ narrow the candidates, condition is one of VALUE_SCAN_CONDITIONS but unknown
+        """
+        return self.dwarf_api('valueScanNext', [condition, None if value is None else str(value), chunk_size])
+
+    def value_scan_results(self, offset, count):
+        """ a page of the candidates as [address, value]
+        """
+        return self.dwarf_api('valueScanResults', [offset, count]) or []
+
+    def cancel_value_scan(self):
+        self.dwarf_api('cancelValueScan')
+
+    def clear_value_scan(self):
+        self.dwarf_api('clearValueScan')
+
+    def get_session(self):
+        """ hooks, onloads and watchers living in the agent, as stored in session files
+        """
+        hooks = None
+        native_on_loads = None
+        java_on_loads = None
+        watchers = None
+        if self._script is not None:
+            hooks = json.loads(self._script.exports.hooks())
+            for hook_key in list(hooks.keys()):
+                hook = hooks[hook_key]
+                if 'internalHook' in hook and hook['internalHook']:
+                    del hooks[hook_key]
+            native_on_loads = json.loads(self._script.exports.nativeonloads())
+            java_on_loads = json.loads(self._script.exports.javaonloads())
+            watchers = json.loads(self._script.exports.watchers())
+
+        return {
+            'hooks': hooks,
+            'nativeOnLoads': native_on_loads,
+            'javaOnLoads': java_on_loads,
+            'watchers': watchers
+        }
+
+    # ************************************************************************
+    # **************************** Handlers **********************************
+    # ************************************************************************
+    def _on_message(self, message, data):
+        if 'payload' not in message:
+            print('payload: ' + str(message))
+            return
+
+        payload = message['payload']
+        if not isinstance(payload, dict) or 'type' not in payload:
+            # plain send() from user scripts
+            print(payload)
+            return
+
+        handler = self._message_handlers.get(payload['type'])
+        if handler is None:
+            print('unknown message: ' + str(payload))
+            return
+
+        if not self.diagnostics.enabled:
+            handler(payload, data)
+            return
+
+        start = time.perf_counter()
+        handler(payload, data)
+        self.diagnostics.record_message(payload['type'], time.perf_counter() - start,
+                                        size=payload_size(payload) + payload_size(data))
+
+    def _handle_api_result(self, message, data):
+        with self._api_lock:
+            request = self._api_requests.get(message['id'])
+        if request is None:
+            return
+
+        if 'error' in message:
+            request['error'] = message['error']
+        elif 'raw' in message:
+            request['result'] = data
+        else:
+            request['result'] = message['result']
+        request['event'].set()
+
+    def _handle_class_loader_loading_class(self, message, data):
+        str_fmt = ('@thread {0} loading class := {1}'.format(message['tid'], message['className']))
+        self.log(str_fmt)
+
+    def _handle_emulator(self, message, data):
+        self._emit('onEmulator', message['args'])
+
+    def _handle_enumerate_java_classes_start(self, message, data):
+        self._flush_batches()
+        self._emit('onEnumerateJavaClassesStart')
+
+    def _handle_enumerate_java_classes_match(self, message, data):
+        self._emit_batch('onEnumerateJavaClassesMatch', [message['className']])
+
+    def _handle_enumerate_java_classes_complete(self, message, data):
+        # deliver pending matches before completion
+        self._flush_batches()
+        self._emit('onEnumerateJavaClassesComplete')
+
+    def _handle_enumerate_java_methods_complete(self, message, data):
+        self._emit('onEnumerateJavaMethodsComplete', [message['className'], message['methods']])
+
+    def _handle_ftrace(self, message, data):
+        self.log(message['data'])
+
+    def _handle_enable_kernel(self, message, data):
+        pass
+
+    def _handle_hook_java_callback(self, message, data):
+        h = Hook(Hook.HOOK_JAVA)
+        h.set_ptr(1)
+        h.set_input(message['classMethod'])
+        if self.java_pending_args:
+            h.set_condition(self.java_pending_args['condition'])
+            h.set_logic(self.java_pending_args['logic'])
+            self.java_pending_args = None
+        self.java_hooks[h.get_input()] = h
+        self._emit('onAddJavaHook', h)
+
+    def _handle_hook_java_on_load_callback(self, message, data):
+        h = Hook(Hook.HOOK_JAVA)
+        h.set_ptr(0)
+        h.set_input(message['className'])
+        self.java_on_loads[message['className']] = h
+        self._emit('onAddJavaOnLoadHook', h)
+
+    def _handle_hook_native_callback(self, message, data):
+        self.memory_cache.invalidate()
+        h = Hook(Hook.HOOK_NATIVE)
+        h.set_ptr(utils.parse_ptr(message['address']))
+        h.set_input(self.temporary_input)
+        h.set_bytes(binascii.unhexlify(message['bytes']))
+        self.temporary_input = ''
+        h.set_condition(message['condition'])
+        h.set_logic(message['logic'])
+        h.internalHook = message['internal']
+        self.native_pending_args = None
+        self.hook_patches.add(h.get_ptr(), h.get_bytes())
+        if not h.internalHook:
+            self.hooks[h.get_ptr()] = h
+            self._emit('onAddNativeHook', h)
+
+    def _handle_hook_native_on_load_callback(self, message, data):
+        h = Hook(Hook.HOOK_ONLOAD)
+        h.set_ptr(0)
+        h.set_input(message['module'])
+        self.native_on_loads[message['module']] = h
+        self._emit('onAddNativeOnLoadHook', h)
+
+    def _handle_hook_deleted(self, message, data):
+        self.memory_cache.invalidate()
+        hook_type = message['hook_type']
+        key = str(message['key'])
+        if hook_type == 'java':
+            self.java_hooks.pop(key)
+        elif hook_type == 'native_on_load':
+            self.native_on_loads.pop(key)
+        elif hook_type == 'java_on_load':
+            self.java_on_loads.pop(key)
+        else:
+            self.hooks.pop(utils.parse_ptr(key))
+            self.hook_patches.remove(utils.parse_ptr(key))
+        self._emit('onDeleteHook', [message['type'], hook_type, key])
+
+    def _handle_java_on_load_callback(self, message, data):
+        str_fmt = ('Hook java onload {0} @thread := {1}'.format(message['className'], message['tid']))
+        self.log(str_fmt)
+        self._emit('onHitJavaOnLoad', message['className'])
+
+    def _handle_java_trace(self, message, data):
+        self._emit_batch('onJavaTraceEvent',
+                         [[message['type'], message['event'], message['classMethod'], message['data']]])
+
+    def _handle_log(self, message, data):
+        self.log(message['what'])
+
+    def _handle_memoryscan_complete(self, message, data):
+        self._emit('onMemoryScanComplete', [message['id'], message['count'], message['cancelled']])
+
+    def _handle_memoryscan_progress(self, message, data):
+        self._emit('onMemoryScanProgress', [message['id'], message['range'], message['scanned'], message['size']])
+
+    def _handle_memoryscan_result(self, message, data):
+        pointers = utils.unpack_pointers(data, self.pointer_size)
+        self._emit('onMemoryScanResult', [message['id'], message['range'],
+                                          [{'address': hex(pointer), 'size': message['size'], 'pattern': message['pattern']}
+                                           for pointer in pointers]])
+
+    def _handle_memoryscan_start(self, message, data):
+        self._emit('onMemoryScanStart', message['id'])
+
+    def _handle_native_on_load_callback(self, message, data):
+        str_fmt = ('Hook native onload {0} @thread := {1}'.format(message['module'], message['tid']))
+        self.log(str_fmt)
+        self.symbol_resolver.invalidate()
+        self._emit('onHitNativeOnLoad', [message['module'], str(message['base'])])
+
+    def _handle_native_on_load_module_loading(self, message, data):
+        str_fmt = ('@thread {0} loading module := {1}'.format(message['tid'], message['module']))
+        self.log(str_fmt)
+        self.symbol_resolver.invalidate()
+
+    def _handle_release(self, message, data):
+        self.memory_cache.invalidate()
+        tid = str(message['tid'])
+        if tid in self.contexts:
+            del self.contexts[tid]
+        self._emit('onThreadResumed', int(tid))
+
+    def _handle_resume(self, message, data):
+        if not self.resumed:
+            self.resume_proc()
+
+    def _handle_release_js(self, message, data):
+        # releasing the thread must be done by calling py funct dwarf_api('release')
+        # there are cases in which we want to release the thread from a js api so we need to call this
+        self._post(self._on_request_resume_from_js, int(message['tid']))
+        self._emit('onRequestJsThreadResume', int(message['tid']))
+
+    def _handle_set_context(self, message, data):
+        if 'backtrace' in message:
+            self._emit('onBackTrace', message['backtrace'])
+
+        self._post(self._on_apply_context, message)
+        self._emit('onApplyContext', message)
+
+    def _handle_set_context_value(self, message, data):
+        self._emit('onContextChanged', str(message['property']), str(message['value']))
+
+    def _handle_set_data(self, message, data):
+        if data:
+            self._emit('onSetData', ['raw', message['key'], data])
+        else:
+            self._emit('onSetData', ['plain', message['key'], str(message['value'])])
+
+    def _handle_tracer(self, message, data):
+        self._emit_batch('onTraceData', message['events'])
+
+    def _handle_update_modules(self, message, data):
+        # todo update onloads bases
+        # modules and ranges are sent in pages, the first one replaces what we have
+        if message.get('offset', 0):
+            self._emit('onAddModules', message['modules'])
+        else:
+            # modules got loaded or unloaded since the symbols were cached
+            self.symbol_resolver.invalidate()
+            self._emit('onSetModules', message['modules'])
+
+    def _handle_update_ranges(self, message, data):
+        if message.get('offset', 0):
+            self._emit('onAddRanges', message['ranges'])
+        else:
+            self._emit('onSetRanges', message['ranges'])
+
+    def _handle_valuescan_complete(self, message, data):
+        self._emit('onValueScanComplete', [message['id'], message['count'], message['cancelled']])
+
+    def _handle_valuescan_progress(self, message, data):
+        self._emit('onValueScanProgress', [message['id'], message['done'], message['total']])
+
+    def _handle_valuescan_start(self, message, data):
+        self._emit('onValueScanStart', message['id'])
+
+    def _handle_watcher(self, message, data):
+        exception = message['exception']
+        self.log('watcher hit op %s address %s @thread := %s' %
+                 (exception['memory']['operation'], exception['memory']['address'], message['tid']))
+
+    def _handle_watcher_added(self, message, data):
+        self._watchers.append(utils.parse_ptr(message['address']))
+        self._emit('onWatcherAdded', message['address'], int(message['flags']))
+
+    def _handle_watcher_removed(self, message, data):
+        self._watchers.remove(utils.parse_ptr(message['address']))
+        self._emit('onWatcherRemoved', message['address'])
+
+    def _on_apply_context(self, context_data):
+        reason = context_data['reason']
+        if reason == -1:
+            # set initial context
+            self._arch = context_data['arch']
+            self._platform = context_data['platform']
+            self._pointer_size = context_data['pointerSize']
+            self.java_available = context_data['java']
+            str_fmt = ('injected into := {0:d}'.format(self.pid))
+            self.log(str_fmt)
+        elif 'context' in context_data:
+            context = Context(context_data['context'])
+            self.contexts[str(context_data['tid'])] = context
+
+            sym = ''
+            if 'pc' in context_data['context']:
+                name = context_data['ptr']
+                if 'symbol' in context_data['context']['pc'] and \
+                        context_data['context']['pc']['symbol']['name'] is not None:
+                    sym = context_data['context']['pc']['symbol']['moduleName']
+                    sym += ' - '
+                    sym += context_data['context']['pc']['symbol']['name']
+            else:
+                name = context_data['ptr']
+
+            if context_data['reason'] == 0:
+                self.log('hook %s %s @thread := %d' % (name, sym, context_data['tid']))
+
+        if not reason == -1 and self.context_tid == 0:
+            self.context_tid = context_data['tid']
+
+    def _on_destroyed(self):
+        self._reinitialize()
+        str_fmt = ('Detached from {0:d}. Script destroyed.'.format(self.pid))
+        print(str_fmt)
+        self.log(str_fmt)
+        self._emit('onScriptDestroyed')
+
+    def _on_script_error(self, error_msg):
+        print(error_msg)
+
+    def _on_request_resume_from_js(self, tid):
+        self.dwarf_api('release', tid, tid=tid)
@@ -334,7 +334,7 @@ class Emulator(QThread):
             return 301
 
         try:
-            self.uc.mem_write(range_.base, range_.data)
+            self.uc.mem_write(range_.base, bytes(range_.data))
         except Exception as e:
             self.dwarf.log(e)
             return 302
@@ -0,0 +1,98 @@
+"""
+Dwarf - Copyright (C) 2019 Giovanni Rocca (iGio90)
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>
+"""
+import os
+import threading
+import traceback
+
+import frida
+
+from lib.dwarf_core import DwarfCore
+
+
+def _get_device(args):
+    if args.type in ('android', 'ios'):
+        if args.device:
+            return frida.get_device(id=args.device)
+        return frida.get_usb_device()
+    elif args.type == 'remote':
+        return frida.get_remote_device()
+    return frida.get_local_device()
+
+
+def _print_lines(lines):
+    for line in lines:
+        print(line)
+
+
+def run_headless(args):
+    """ attach (or spawn) args.package, run the python session script in args.headless and detach
+
+        the script runs with 'dwarf' (a DwarfCore) and 'destroyed' (threading.Event set when
+        the agent goes away) in its globals. returns the process exit code
+    """
+    script_path = args.headless
+    if not os.path.exists(script_path):
+        print('session script not found: ' + script_path)
+        return 1
+
+    if args.package is None:
+        print('headless mode needs a target, use -p')
+        return 1
+
+    dwarf = DwarfCore(device=_get_device(args), debug_script=args.debug_script)
+    dwarf.on('onLogToConsole', _print_lines)
+    destroyed = threading.Event()
+    dwarf.on('onScriptDestroyed', destroyed.set)
+
+    try:
+        if args.spawn:
+            print('* Trying to spawn {0}'.format(args.package))
+            dwarf.spawn(args.package, args.script)
+        else:
+            print('* Trying to attach to {0}'.format(args.package))
+            dwarf.attach(args.package, args.script, False)
+    except Exception as e:  # pylint: disable=broad-except
+        print('-failed-')
+        print('Reason: ' + str(e))
+        return 1
+
+    if dwarf.process is None:
+        # script failed to load
+        return 1
+
+    exit_code = 0
+    try:
+        with open(script_path, 'r') as script_file:
+            code = compile(script_file.read(), script_path, 'exec')
+        exec(code, {
+            '__name__': '__main__',
+            '__file__': script_path,
+            'dwarf': dwarf,
+            'destroyed': destroyed
+        })
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else 0
+    except Exception:  # pylint: disable=broad-except
+        traceback.print_exc()
+        exit_code = 1
+    finally:
+        try:
+            dwarf.detach()
+        except Exception as e:  # pylint: disable=broad-except
+            print('failed to detach: ' + str(e))
+
+    return exit_code
@@ -0,0 +1,217 @@
+"""
+Dwarf - Copyright (C) 2019 Giovanni Rocca (iGio90)
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>
+"""
+import functools
+import mmap
+import multiprocessing
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+
+@functools.lru_cache(maxsize=64)
+def compile_pattern(pattern):
+    """ frida pattern -> (bytes, None) when it has no wildcards, (None, regex) otherwise
+
+        the regex is a lookahead so that overlapping matches are reported as Memory.scan does
+    """
+    parts = pattern.split(':')
+    tokens = parts[0].split()
+    masks = parts[1].split() if len(parts) > 1 else []
+    needle = bytearray()
+    expression = b''
+    fixed = True
+    for i, token in enumerate(tokens):
+        value = 0
+        mask = 0
+        for j, nibble in enumerate(token):
+            if nibble != '?':
+                value |= int(nibble, 16) << (4 - j * 4)
+                mask |= 0xf << (4 - j * 4)
+        if i < len(masks):
+            mask &= int(masks[i], 16)
+            value &= mask
+        if mask == 0xff:
+            needle.append(value)
+            expression += re.escape(bytes([value]))
+            continue
+        fixed = False
+        if mask == 0:
+            expression += b'.'
+        else:
+            expression += b'[' + b''.join(re.escape(bytes([byte])) for byte in range(256)
+                                          if byte & mask == value) + b']'
+    if fixed:
+        return bytes(needle), None
+    return None, re.compile(b'(?=' + expression + b')', re.DOTALL)
+
+
+def search_buffer(data, patterns, start=0, end=None, limit=None):
+    """ [(pattern index, offset)] of the matches starting in [start, limit) of data[start:end]
+
+        data is anything exposing the buffer protocol with find (bytes, mmap)
+    """
+    if end is None:
+        end = len(data)
+    if limit is None:
+        limit = end
+    matches = []
+    for index, pattern in enumerate(patterns):
+        needle, regex = compile_pattern(pattern)
+        if needle is not None:
+            offset = data.find(needle, start, end)
+            while 0 <= offset < limit:
+                matches.append((index, offset))
+                offset = data.find(needle, offset + 1, end)
+        else:
+            for match in regex.finditer(data, start, end):
+                if match.start() >= limit:
+                    break
+                matches.append((index, match.start()))
+    return matches
+
+
+def _search_file(file_path, file_offset, length, limit, patterns):
+    # runs in the pool, offsets in the results are relative to file_offset
+    granularity = mmap.ALLOCATIONGRANULARITY
+    map_offset = file_offset - file_offset % granularity
+    skew = file_offset - map_offset
+    with open(file_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), skew + length, access=mmap.ACCESS_READ, offset=map_offset) as data:
+            return [(index, offset - skew) for index, offset in
+                    search_buffer(data, patterns, skew, skew + length, skew + limit)]
+
+
+class HostSearch(object):
+    """ HostSearch
+
+        pattern search over memory living on this side: snapshots, dumps, emulator.
+        keeps the scanning off the target, results match the ones of the live search
+
+        sources are dicts with 'range' (index reported with the results), 'base', 'size' and either
+        'file' / 'offset' (searched by a process pool through mmap) or 'read' (callable returning bytes,
+        searched in the thread calling run)
+
+        on_result(range, pattern, [addresses]) and progress(range, scanned, size) are called from
+        the thread running the search, log(message) reports the chunks failing to be searched
+    """
+
+    CHUNK_SIZE = 64 * 1024 * 1024
+
+    def __init__(self, sources, patterns, on_result=None, progress=None, processes=None,
+                 chunk_size=CHUNK_SIZE, log=None):
+        self.sources = sources
+        self.patterns = patterns
+        self.on_result = on_result
+        self.progress = progress
+        self.log = log
+        self.processes = processes
+        self.chunk_size = chunk_size
+
+        self.count = 0
+        self.elapsed = 0
+
+        self._cancel = threading.Event()
+        # matches starting in the last bytes of a chunk continue in the next one
+        self._overlap = max(len(pattern.split(':')[0].split()) for pattern in patterns) - 1
+        # progress is reported per range, which can be split in several sources
+        self._scanned = {}
+        self._sizes = {}
+        for source in sources:
+            self._sizes[source['range']] = self._sizes.get(source['range'], 0) + source['size']
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def run(self):
+        """ search all the sources, returns False when cancelled
+        """
+        start = time.perf_counter()
+        chunks = []
+        for source in self.sources:
+            for offset in range(0, source['size'], self.chunk_size):
+                chunks.append((source, offset, min(self.chunk_size, source['size'] - offset)))
+
+        files = [chunk for chunk in chunks if 'file' in chunk[0]]
+        if files:
+            self._run_files(files)
+        for source, offset, length in chunks:
+            if 'file' in source:
+                continue
+            if self.cancelled:
+                break
+            scan_length = min(length + self._overlap, source['size'] - offset)
+            data = source['read'](source['base'] + offset, scan_length)
+            if data is not None:
+                self._add_results(source, offset, search_buffer(data, self.patterns, limit=length))
+            self._add_progress(source, length)
+
+        self.elapsed = time.perf_counter() - start
+        return not self.cancelled
+
+    def _run_files(self, chunks):
+        pending = {}
+        # spawned, forking the threads of the ui along is asking for trouble
+        with ProcessPoolExecutor(self.processes, mp_context=multiprocessing.get_context('spawn')) as pool:
+            for source, offset, length in chunks:
+                scan_length = min(length + self._overlap, source['size'] - offset)
+                future = pool.submit(_search_file, source['file'], source.get('offset', 0) + offset,
+                                     scan_length, length, self.patterns)
+                pending[future] = (source, offset, length)
+
+            while pending:
+                done, _ = wait(list(pending.keys()), return_when=FIRST_COMPLETED)
+                for future in done:
+                    source, offset, length = pending.pop(future)
+                    if future.cancelled():
+                        continue
+                    try:
+                        self._add_results(source, offset, future.result())
+                    except Exception as e:
+                        self._log('failed to search {0} at 0x{1:x} ({2:d} bytes): {3}'.format(
+                            source['file'], source.get('offset', 0) + offset, length, e))
+                    self._add_progress(source, length)
+
+                if self.cancelled:
+                    for future in pending:
+                        future.cancel()
+
+    def _add_results(self, source, offset, matches):
+        by_pattern = {}
+        for index, position in matches:
+            by_pattern.setdefault(index, []).append(source['base'] + offset + position)
+        for index, addresses in sorted(by_pattern.items()):
+            self.count += len(addresses)
+            if self.on_result is not None:
+                self.on_result(source['range'], index, addresses)
+
+    def _add_progress(self, source, length):
+        range_ = source['range']
+        scanned = self._scanned.get(range_, 0) + length
+        self._scanned[range_] = scanned
+        if self.progress is not None:
+            self.progress(range_, scanned, self._sizes[range_])
+
+    def _log(self, message):
+        if self.log is not None:
+            self.log(message)
+        else:
+            print('host search: ' + message)
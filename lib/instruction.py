@@ -21,7 +21,8 @@ from capstone.x86_const import *
 
 
 class Instruction(object):
-    def __init__(self, dwarf, instruction):
+    def __init__(self, dwarf, instruction, resolve_symbol=True):
+        # resolve_symbol False leaves the jump symbol to set_symbol, for callers resolving a batch
         self.id = instruction.id
         self.address = instruction.address
 
@@ -56,16 +57,18 @@ class Instruction(object):
         self.symbol_module = None
         self.string = None
 
-        if self.jump_address != 0:
-            sym = dwarf.dwarf_api('getSymbolByAddress', self.jump_address)
-            if sym is not None:
-                self.symbol_name = sym['name']
-                self.symbol_module = '-'
-                if 'moduleName' in sym:
-                    self.symbol_module = sym['moduleName']
+        if self.jump_address != 0 and resolve_symbol:
+            self.set_symbol(dwarf.symbol_resolver.resolve_one(self.jump_address))
         # elif len(instruction.operands) > 0:
         #    for op in instruction.operands:
         #        if op.type == CS_OP_IMM:
         #            self.string = dwarf.dwarf_api('readString', op.value.imm)
         #            # if len([x for x in self.string if not x.isprintable()]) > 0:
         #            #self.string = None
+
+    def set_symbol(self, sym):
+        """ jump symbol, a DebugSymbol dict
+        """
+        if sym is not None:
+            self.symbol_name = sym['name']
+            self.symbol_module = sym.get('moduleName') or '-'
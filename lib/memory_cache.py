@@ -0,0 +1,132 @@
+"""
+Dwarf - Copyright (C) 2019 Giovanni Rocca (iGio90)
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>
+"""
+import threading
+from collections import OrderedDict
+
+
+class MemoryCache(object):
+    """ MemoryCache
+
+        host side cache of the target memory, split in pages and evicted
+        lru first once the budget (in bytes) is exceeded
+
+        hits and misses are counted per page
+    """
+
+    def __init__(self, budget=64 * 1024 * 1024, page_size=4096):
+        self.page_size = page_size
+        self.budget = budget
+        self.enabled = True
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._pages = OrderedDict()
+        self._size = 0
+        # bumped on each invalidation, reads started before it don't store their pages
+        self._generation = 0
+
+    def read(self, ptr, length, fetch):
+        """ read length bytes at ptr, missing pages are read with fetch(ptr, length)
+        """
+        if length <= 0:
+            return bytes()
+
+        page_mask = ~(self.page_size - 1)
+        first = ptr & page_mask
+        last = (ptr + length - 1) & page_mask
+        if not self.enabled or last - first + self.page_size > self.budget:
+            with self._lock:
+                self.misses += (last - first) // self.page_size + 1
+            return fetch(ptr, length)
+
+        pages = {}
+        runs = []
+        with self._lock:
+            generation = self._generation
+            for page in range(first, last + self.page_size, self.page_size):
+                data = self._pages.get(page)
+                if data is None:
+                    self.misses += 1
+                    if runs and runs[-1][0] + runs[-1][1] == page:
+                        runs[-1][1] += self.page_size
+                    else:
+                        runs.append([page, self.page_size])
+                else:
+                    self.hits += 1
+                    self._pages.move_to_end(page)
+                    pages[page] = data
+
+        for run_start, run_length in runs:
+            data = fetch(run_start, run_length)
+            if data is None or len(data) != run_length:
+                # the page aligned read went out of a readable range, read only what was asked
+                return fetch(ptr, length)
+            for offset in range(0, run_length, self.page_size):
+                pages[run_start + offset] = bytes(data[offset:offset + self.page_size])
+
+        if runs:
+            self._store(pages, generation)
+
+        data = b''.join(pages[page] for page in range(first, last + self.page_size, self.page_size))
+        return data[ptr - first:ptr - first + length]
+
+    def invalidate(self, ptr=None, length=0):
+        """ drop the pages in [ptr, ptr + length) or everything when ptr is None
+        """
+        with self._lock:
+            self._generation += 1
+            if ptr is None:
+                self._pages.clear()
+                self._size = 0
+                return
+
+            page_mask = ~(self.page_size - 1)
+            last = (ptr + max(length, 1) - 1) & page_mask
+            for page in range(ptr & page_mask, last + self.page_size, self.page_size):
+                data = self._pages.pop(page, None)
+                if data is not None:
+                    self._size -= len(data)
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'pages': len(self._pages),
+                'size': self._size,
+                'budget': self.budget
+            }
+
+    def _store(self, pages, generation):
+        with self._lock:
+            if generation != self._generation:
+                return
+            for page, data in pages.items():
+                if page in self._pages:
+                    continue
+                self._pages[page] = data
+                self._size += len(data)
+            while self._size > self.budget and self._pages:
+                _, data = self._pages.popitem(last=False)
+                self._size -= len(data)
@@ -0,0 +1,171 @@
+"""
+Dwarf - Copyright (C) 2019 Giovanni Rocca (iGio90)
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>
+"""
+import json
+import struct
+import zlib
+
+
+def page_hashes(data, page_size=4096):
+    """ crc32 of each page of data, the same the agent computes in hashPages
+    """
+    return [zlib.crc32(data[offset:offset + page_size]) for offset in range(0, len(data), page_size)]
+
+
+class PageChange(object):
+    """ a page whose hash differs from the baseline
+
+        old is None when the baseline was taken on the device (only hashes are known)
+    """
+
+    def __init__(self, address, old, new):
+        self.address = address
+        self.old = old
+        self.new = new
+
+    @property
+    def size(self):
+        return len(self.new) if self.new is not None else 0
+
+    def changed_runs(self):
+        """ [address, length] of the bytes which differ, the whole page when old is unknown
+        """
+        if self.old is None or self.new is None:
+            return [[self.address, self.size]]
+        runs = []
+        for i, (old, new) in enumerate(zip(self.old, self.new)):
+            if old == new:
+                continue
+            if runs and runs[-1][0] + runs[-1][1] == self.address + i:
+                runs[-1][1] += 1
+            else:
+                runs.append([self.address + i, 1])
+        return runs
+
+
+class MemoryDiff(object):
+    """ MemoryDiff
+
+        hashes the pages of a set of ranges on the device, later compares them with a new hash set
+        and reads only the pages which changed
+
+        the baseline can also be a snapshot, which gives the old bytes of the changed pages as well
+    """
+
+    def __init__(self, dwarf, page_size=4096):
+        self.page_size = page_size
+        self.changes = []
+
+        self._dwarf = dwarf
+        # [[base, size]] of the ranges being compared
+        self._ranges = []
+        # base -> hashes of the pages of the range
+        self._baseline = {}
+        self._snapshot = None
+
+    @property
+    def has_baseline(self):
+        return len(self._baseline) > 0
+
+    def take_baseline(self, ranges):
+        """ hash the pages of ranges ([[base, size]]) on the device
+        """
+        self._snapshot = None
+        self._ranges = [[int(base), int(size)] for base, size in ranges]
+        self._baseline = self._hash_ranges(self._ranges)
+        self.changes = []
+        return self._baseline
+
+    def take_baseline_from_snapshot(self, snapshot, ranges=None):
+        """ use the memory captured in snapshot as baseline, ranges defaults to all the snapshot ranges
+        """
+        if ranges is None:
+            ranges = [[int(entry['base'], 16), entry['size']] for entry in snapshot.ranges]
+        self._snapshot = snapshot
+        self._ranges = []
+        self._baseline = {}
+        for base, size in ranges:
+            entry = snapshot.find_range(base)
+            if entry is None:
+                continue
+            self._ranges.append([base, size])
+            self._baseline[base] = page_hashes(snapshot.read(base, size) or bytes(), self.page_size)
+        self.changes = []
+        return self._baseline
+
+    def compare(self):
+        """ hash the ranges again and read the pages which differ, returns a list of PageChange
+        """
+        current = self._hash_ranges(self._ranges)
+        changed = []
+        for base, _ in self._ranges:
+            old_hashes = self._baseline.get(base, [])
+            for i, new_hash in enumerate(current.get(base, [])):
+                if i >= len(old_hashes) or old_hashes[i] != new_hash:
+                    changed.append(base + i * self.page_size)
+
+        # read the changed pages in runs
+        runs = []
+        for address in changed:
+            length = self._page_length(address)
+            if runs and runs[-1][0] + runs[-1][1] == address:
+                runs[-1][1] += length
+            else:
+                runs.append([address, length])
+
+        self.changes = []
+        for address, length in runs:
+            # whatever we had for those pages is stale
+            self._dwarf.memory_cache.invalidate(address, length)
+            data = self._dwarf.read_target_memory(address, length)
+            old_data = None
+            if self._snapshot is not None:
+                old_data = self._snapshot.read(address, length)
+            for offset in range(0, length, self.page_size):
+                new = data[offset:offset + self.page_size] if data else None
+                old = old_data[offset:offset + self.page_size] if old_data else None
+                self.changes.append(PageChange(address + offset, old, new))
+        return self.changes
+
+    def changed_pages_by_range(self):
+        """ base -> number of changed pages
+        """
+        counts = {}
+        for base, size in self._ranges:
+            counts[base] = len([c for c in self.changes if base <= c.address < base + size])
+        return counts
+
+    def _page_length(self, address):
+        for base, size in self._ranges:
+            if base <= address < base + size:
+                return min(self.page_size, base + size - address)
+        return self.page_size
+
+    def _hash_ranges(self, ranges):
+        if not ranges:
+            return {}
+        data = self._dwarf.dwarf_api('hashPages', [
+            json.dumps([{'start': hex(base), 'size': size} for base, size in ranges]), self.page_size])
+        if not data:
+            return {}
+        hashes = struct.unpack('<%dI' % (len(data) // 4), data)
+        ret = {}
+        index = 0
+        for base, size in ranges:
+            count = (size + self.page_size - 1) // self.page_size
+            ret[base] = list(hashes[index:index + count])
+            index += count
+        return ret
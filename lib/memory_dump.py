@@ -0,0 +1,135 @@
+"""
+Dwarf - Copyright (C) 2019 Giovanni Rocca (iGio90)
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class MemoryDump(object):
+    """ MemoryDump
+
+        streams [ptr, ptr + length) to file_path keeping several chunk reads in flight,
+        each chunk is written at its offset as soon as it comes back
+
+        chunks which can't be read are retried page by page, unreadable pages are zero filled
+
+        read(ptr, length) -> bytes, anything shorter than length is an unreadable read
+        progress(written, length, bytes_per_sec) is called from the thread running the dump
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+    PAGE_SIZE = 4096
+
+    def __init__(self, read, file_path, ptr, length, chunk_size=CHUNK_SIZE, in_flight=4,
+                 progress=None, log=None):
+        self.file_path = file_path
+        self.ptr = ptr
+        self.length = length
+        self.chunk_size = chunk_size
+        self.in_flight = max(1, in_flight)
+
+        self.written = 0
+        self.unreadable = 0
+        self.elapsed = 0
+
+        self.progress = progress
+
+        self._read = read
+        self._log = log
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def run(self):
+        """ dump to file_path, returns False when cancelled
+        """
+        with open(self.file_path, 'wb') as f:
+            f.truncate(self.length)
+            return self.write_to(f)
+
+    def write_to(self, f, file_offset=0):
+        """ dump into the already opened f starting at file_offset, returns False when cancelled
+        """
+        start = time.perf_counter()
+        offsets = iter(range(0, self.length, self.chunk_size))
+        with ThreadPoolExecutor(self.in_flight) as pool:
+            pending = set()
+            for offset in offsets:
+                pending.add(pool.submit(self._read_chunk, offset))
+                if len(pending) >= self.in_flight:
+                    break
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    offset, data = future.result()
+                    f.seek(file_offset + offset)
+                    f.write(data)
+                    self.written += len(data)
+                    self.elapsed = time.perf_counter() - start
+                    if self.progress is not None:
+                        self.progress(self.written, self.length, self.written / max(self.elapsed, 1e-6))
+
+                    if self.cancelled:
+                        continue
+                    offset = next(offsets, None)
+                    if offset is not None:
+                        pending.add(pool.submit(self._read_chunk, offset))
+
+                if self.cancelled:
+                    for future in pending:
+                        future.cancel()
+                    break
+
+        self.elapsed = time.perf_counter() - start
+        if self.unreadable and self._log is not None:
+            self._log('dump 0x{0:x}: {1:d} unreadable bytes zero filled'.format(self.ptr, self.unreadable))
+        return not self.cancelled
+
+    def _read_chunk(self, offset):
+        length = min(self.chunk_size, self.length - offset)
+        data = self._read(self.ptr + offset, length)
+        if self._is_readable(data, length):
+            return offset, bytes(data)
+
+        # go page by page, zero filling what's not readable
+        chunk = bytearray(length)
+        address = self.ptr + offset
+        tail = address + length
+        while address < tail and not self.cancelled:
+            page_length = min(self.PAGE_SIZE - address % self.PAGE_SIZE, tail - address)
+            data = self._read(address, page_length)
+            if self._is_readable(data, page_length):
+                position = address - self.ptr - offset
+                chunk[position:position + page_length] = data
+            else:
+                with self._lock:
+                    self.unreadable += page_length
+                if self._log is not None:
+                    self._log('dump: unable to read 0x{0:x} - 0x{1:x}'.format(address, address + page_length))
+            address += page_length
+        return offset, bytes(chunk)
+
+    @staticmethod
+    def _is_readable(data, length):
+        return isinstance(data, (bytes, bytearray)) and len(data) == length
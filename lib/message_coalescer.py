@@ -0,0 +1,79 @@
+"""
+Dwarf - Copyright (C) 2019 Giovanni Rocca (iGio90)
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>
+"""
+import threading
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+
+class MessageCoalescer(QObject):
+    """ MessageCoalescer
+
+        buffers high rate messages coming from the agent and flushes them
+        as a single list per message type every interval ms
+
+        usage:
+            coalescer.register('log', self.onLogToConsole)
+            coalescer.push('log', what)
+    """
+
+    _flushRequested = pyqtSignal(name='flushRequested')
+
+    def __init__(self, interval=16, parent=None):
+        super(MessageCoalescer, self).__init__(parent)
+
+        self._lock = threading.Lock()
+        self._buffers = {}
+        self._signals = {}
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(interval)
+        self._timer.timeout.connect(self.flush)
+
+        # pushes may come from frida thread, the timer must be started on its own thread
+        self._flushRequested.connect(self._timer.start)
+
+    def register(self, name, signal):
+        """ signal(list) receiving the batches of name
+        """
+        self._signals[name] = signal
+
+    def set_interval(self, interval):
+        self._timer.setInterval(interval)
+
+    def push(self, name, item):
+        self.extend(name, [item])
+
+    def extend(self, name, items):
+        with self._lock:
+            schedule = len(self._buffers) == 0
+            if name not in self._buffers:
+                self._buffers[name] = []
+            self._buffers[name].extend(items)
+
+        if schedule:
+            self._flushRequested.emit()
+
+    def flush(self):
+        """ emit everything buffered so far
+        """
+        with self._lock:
+            buffers = self._buffers
+            self._buffers = {}
+
+        for name in buffers:
+            self._signals[name].emit(buffers[name])
@@ -0,0 +1,75 @@
+"""
+Dwarf - Copyright (C) 2019 Giovanni Rocca (iGio90)
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>
+"""
+import threading
+from bisect import bisect_left, bisect_right, insort
+
+
+class PatchIndex(object):
+    """ PatchIndex
+
+        interval index of bytes patched over the target memory (i.e. original bytes of native hooks)
+        kept in sync with the hook messages, so ranges don't need to ask the agent for them
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # sorted start addresses
+        self._starts = []
+        self._patches = {}
+        # longest patch, bounds how far back find() has to look
+        self._max_length = 0
+
+    def __len__(self):
+        return len(self._starts)
+
+    def add(self, address, bytes_):
+        if not bytes_:
+            return
+        with self._lock:
+            if address not in self._patches:
+                insort(self._starts, address)
+            self._patches[address] = bytes(bytes_)
+            self._max_length = max(self._max_length, len(bytes_))
+
+    def remove(self, address):
+        with self._lock:
+            if self._patches.pop(address, None) is None:
+                return
+            del self._starts[bisect_left(self._starts, address)]
+            if not self._patches:
+                self._max_length = 0
+
+    def clear(self):
+        with self._lock:
+            self._starts = []
+            self._patches = {}
+            self._max_length = 0
+
+    def find(self, start, end):
+        """ list of (address, bytes) overlapping [start, end)
+        """
+        with self._lock:
+            if not self._starts:
+                return []
+            first = bisect_right(self._starts, start - self._max_length)
+            last = bisect_left(self._starts, end)
+            ret = []
+            for address in self._starts[first:last]:
+                bytes_ = self._patches[address]
+                if address + len(bytes_) > start:
+                    ret.append((address, bytes_))
+            return ret
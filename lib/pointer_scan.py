@@ -0,0 +1,344 @@
+"""
+Dwarf - Copyright (C) 2019 Giovanni Rocca (iGio90)
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>
+"""
+import bisect
+import json
+import struct
+import sys
+import threading
+import time
+from array import array
+
+from lib import utils
+
+
+def _word_format(pointer_size):
+    # array typecode holding a pointer sized unsigned word
+    for code in ('I', 'L', 'Q'):
+        if array(code).itemsize == pointer_size:
+            return code
+    raise ValueError('unsupported pointer size {0}'.format(pointer_size))
+
+
+class PointerMap(object):
+    """ PointerMap
+
+        reverse pointer map: every aligned, pointer sized value of the scanned ranges which points
+        into a readable range, sorted by value so the pointers to [address - max_offset, address]
+        are a bisect away
+
+        modules are kept along to tell which pointers are static
+    """
+
+    MAGIC = b'DWARFPTR'
+    VERSION = 1
+
+    _HEADER = struct.Struct('<8sIIQ')
+
+    def __init__(self, pointer_size=8, modules=None):
+        self.pointer_size = pointer_size
+        self.values = array(_word_format(pointer_size))
+        self.addresses = array(_word_format(pointer_size))
+        self.modules = []
+        self._module_bases = []
+        self.set_modules(modules or [])
+
+    def __len__(self):
+        return len(self.values)
+
+    def set_modules(self, modules):
+        # modules as given by enumerateModules, base as hex string or int
+        self.modules = sorted(({'name': m['name'], 'base': utils.parse_ptr(m['base']), 'size': int(m['size'])}
+                               for m in modules), key=lambda m: m['base'])
+        self._module_bases = [m['base'] for m in self.modules]
+
+    def module_at(self, address):
+        """ (module name, offset) of the module containing address, None when not in a module
+        """
+        i = bisect.bisect_right(self._module_bases, address) - 1
+        if i >= 0:
+            module = self.modules[i]
+            if address < module['base'] + module['size']:
+                return module['name'], address - module['base']
+        return None
+
+    def pointers_to(self, address, max_offset):
+        """ [(pointer address, offset)] of the pointers to [address - max_offset, address]
+        """
+        lo = bisect.bisect_left(self.values, max(0, address - max_offset))
+        hi = bisect.bisect_right(self.values, address, lo)
+        return [(self.addresses[i], address - self.values[i]) for i in range(lo, hi)]
+
+    def save(self, file_path):
+        with open(file_path, 'wb') as f:
+            f.write(self._HEADER.pack(self.MAGIC, self.VERSION, self.pointer_size, len(self.values)))
+            self.values.tofile(f)
+            self.addresses.tofile(f)
+            f.write(json.dumps(self.modules).encode('utf8'))
+
+    @classmethod
+    def load(cls, file_path):
+        with open(file_path, 'rb') as f:
+            magic, version, pointer_size, count = cls._HEADER.unpack(f.read(cls._HEADER.size))
+            if magic != cls.MAGIC or version != cls.VERSION:
+                raise ValueError('{0} is not a pointer map'.format(file_path))
+            pointer_map = cls(pointer_size)
+            pointer_map.values.fromfile(f, count)
+            pointer_map.addresses.fromfile(f, count)
+            pointer_map.set_modules(json.loads(f.read().decode('utf8') or '[]'))
+        return pointer_map
+
+
+class PointerMapBuilder(object):
+    """ PointerMapBuilder
+
+        builds a PointerMap out of ranges read through MemoryDump, the values are kept when they
+        point into one of targets. ranges and targets are lists of (base, size)
+
+        progress(done, length, bytes_per_sec) is called from the thread running the builder
+    """
+
+    def __init__(self, ranges, targets, create_dump, pointer_size=8, modules=None, progress=None):
+        # create_dump(ptr, length) -> MemoryDump reading the range
+        self.ranges = ranges
+        self.progress = progress
+        self.pointer_map = PointerMap(pointer_size, modules)
+
+        self.length = sum(size for base, size in ranges)
+        self.done = 0
+        self.elapsed = 0
+
+        targets = sorted(targets)
+        self._starts = [base for base, size in targets]
+        self._ends = [base + size for base, size in targets]
+        self._create_dump = create_dump
+        self._dump = None
+        self._cancel = threading.Event()
+        self._start = 0
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+        dump = self._dump
+        if dump is not None:
+            dump.cancel()
+
+    def run(self):
+        """ build the map, returns False when cancelled. pointer_map holds the ranges read before cancelling
+        """
+        self._start = time.perf_counter()
+        values, addresses = [], []
+        for base, size in self.ranges:
+            if self.cancelled:
+                break
+            sink = _PointerSink(self, base, values, addresses)
+            self._dump = self._create_dump(base, size)
+            self._dump.progress = lambda written, length, rate, done=self.done: self._on_progress(written + done)
+            self._dump.write_to(sink)
+            self._dump = None
+            self.done += size
+
+        order = sorted(range(len(values)), key=values.__getitem__)
+        self.pointer_map.values.extend(values[i] for i in order)
+        self.pointer_map.addresses.extend(addresses[i] for i in order)
+        self.elapsed = time.perf_counter() - self._start
+        return not self.cancelled
+
+    def feed(self, address, data, values, addresses):
+        pointer_size = self.pointer_map.pointer_size
+        # ranges are page aligned, the words are read at pointer aligned addresses
+        skip = -address % pointer_size
+        words = array(self.pointer_map.values.typecode)
+        words.frombytes(data[skip:len(data) - (len(data) - skip) % pointer_size])
+        if sys.byteorder != 'little':
+            words.byteswap()
+
+        if not self._starts:
+            return
+        address += skip
+        lo, hi = self._starts[0], self._ends[-1]
+        starts, ends = self._starts, self._ends
+        for i, value in enumerate(words):
+            if lo <= value < hi and value < ends[bisect.bisect_right(starts, value) - 1]:
+                values.append(value)
+                addresses.append(address + i * pointer_size)
+
+    def _on_progress(self, done):
+        self.elapsed = time.perf_counter() - self._start
+        if self.progress is not None:
+            self.progress(done, self.length, done / max(self.elapsed, 1e-6))
+
+
+class _PointerSink(object):
+    # file like target of MemoryDump.write_to, each chunk is mapped at base + its offset
+
+    def __init__(self, builder, base, values, addresses):
+        self._builder = builder
+        self._base = base
+        self._position = 0
+        self._values = values
+        self._addresses = addresses
+
+    def seek(self, position):
+        self._position = position
+
+    def write(self, data):
+        self._builder.feed(self._base + self._position, data, self._values, self._addresses)
+
+
+class PointerPath(object):
+    """ PointerPath
+
+        module + offset holds a pointer, offsets are added to it and to each pointer read after
+        it, the last one giving the address
+    """
+
+    def __init__(self, module, offset, offsets):
+        self.module = module
+        self.offset = offset
+        self.offsets = list(offsets)
+
+    def __str__(self):
+        return '{0}+0x{1:x}'.format(self.module, self.offset) + ''.join(
+            ' -> 0x{0:x}'.format(offset) for offset in self.offsets)
+
+    def __eq__(self, other):
+        return isinstance(other, PointerPath) and self.to_dict() == other.to_dict()
+
+    def __hash__(self):
+        return hash((self.module, self.offset, tuple(self.offsets)))
+
+    def resolve(self, module_bases, read_pointer):
+        """ address the path leads to, None when the module is not loaded or a pointer can't be read
+
+            module_bases maps module names to their base, read_pointer(address) -> int or None
+        """
+        base = module_bases.get(self.module)
+        if base is None:
+            return None
+        address = base + self.offset
+        for offset in self.offsets:
+            value = read_pointer(address)
+            if value is None:
+                return None
+            address = value + offset
+        return address
+
+    def to_dict(self):
+        return {'module': self.module, 'offset': self.offset, 'offsets': self.offsets}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['module'], data['offset'], data['offsets'])
+
+
+def save_paths(file_path, paths):
+    with open(file_path, 'w') as f:
+        json.dump([path.to_dict() for path in paths], f)
+
+
+def load_paths(file_path):
+    with open(file_path, 'r') as f:
+        return [PointerPath.from_dict(data) for data in json.load(f)]
+
+
+class PointerScan(object):
+    """ PointerScan
+
+        walks a PointerMap backwards from target: the pointers to [target - max_offset, target],
+        then the pointers to those, up to max_depth levels. every pointer living in a module starts
+        paths to target, module + offset being what survives a restart
+
+        progress(depth, max_depth, nodes_per_sec) is called from the thread running the scan
+    """
+
+    def __init__(self, pointer_map, target, max_depth=5, max_offset=0x1000, max_results=10000, progress=None):
+        self.pointer_map = pointer_map
+        self.target = target
+        self.max_depth = max_depth
+        self.max_offset = max_offset
+        self.max_results = max_results
+        self.progress = progress
+
+        self.paths = []
+        self.elapsed = 0
+
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def run(self):
+        """ fill paths, shortest first. returns False when cancelled
+        """
+        start = time.perf_counter()
+        pointer_map = self.pointer_map
+        # shortest distance to target of each address reached, and the edges (next address, offset) out of it
+        depths = {self.target: 0}
+        edges = {}
+        statics = []
+        level = [self.target]
+        nodes = 0
+        for depth in range(1, self.max_depth + 1):
+            next_level = []
+            for address in level:
+                if self.cancelled:
+                    break
+                for pointer, offset in pointer_map.pointers_to(address, self.max_offset):
+                    edges.setdefault(pointer, []).append((address, offset))
+                    if pointer in depths:
+                        continue
+                    depths[pointer] = depth
+                    if pointer_map.module_at(pointer) is not None:
+                        statics.append(pointer)
+                    else:
+                        next_level.append(pointer)
+            nodes += len(level)
+            self.elapsed = time.perf_counter() - start
+            if self.progress is not None:
+                self.progress(depth, self.max_depth, nodes / max(self.elapsed, 1e-6))
+            if self.cancelled or not next_level:
+                break
+            level = next_level
+
+        paths = []
+        for pointer in statics:
+            if self.cancelled or len(paths) >= self.max_results:
+                break
+            module, offset = pointer_map.module_at(pointer)
+            for offsets in self._walk(pointer, depths, edges, self.max_depth):
+                paths.append(PointerPath(module, offset, offsets))
+                if len(paths) >= self.max_results:
+                    break
+        self.paths = sorted(paths, key=lambda path: len(path.offsets))
+        self.elapsed = time.perf_counter() - start
+        return not self.cancelled
+
+    def _walk(self, address, depths, edges, budget):
+        # offset chains from address to target in at most budget steps
+        for next_address, offset in edges.get(address, ()):
+            if next_address == self.target:
+                yield [offset]
+            elif depths[next_address] < budget:
+                for offsets in self._walk(next_address, depths, edges, budget - 1):
+                    yield [offset] + offsets
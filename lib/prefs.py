@@ -27,6 +27,12 @@ VIEW_WATCHERS = 'view_watchers'
 EMULATOR_CALLBACKS_PATH = 'emulator_callbacks_path'
 EMULATOR_INSTRUCTIONS_DELAY = 'emulator_instructions_delay'
 
+MESSAGES_COALESCE_INTERVAL = 'messages_coalesce_interval'
+DIAGNOSTICS_ENABLED = 'diagnostics_enabled'
+STARTUP_BUDGET = 'startup_budget_ms'
+MEMORY_CACHE_BUDGET = 'memory_cache_budget_mb'
+# frida version found by the update check, installed at next start
+FRIDA_PENDING_UPDATE = 'frida_pending_update'
 
 RECENT_SESSIONS = 'recent_sessions'
 
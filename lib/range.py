@@ -14,10 +14,137 @@ Dwarf - Copyright (C) 2019 Giovanni Rocca (iGio90)
     You should have received a copy of the GNU General Public License
     along with this program.  If not, see <https://www.gnu.org/licenses/>
 """
-import json
+import functools
+import threading
 
 from lib import utils
-from lib.hook import Hook
+
+
+class RangeData(object):
+    """ RangeData
+
+        bytes like view of a memory range, pages are read the first time they are accessed
+
+        views which don't want to block can check what's still missing with missing()
+        and load it from another thread with fetch()
+    """
+
+    PAGE_SIZE = 4096
+
+    def __init__(self, size, read, page_size=PAGE_SIZE, overlay=None):
+        # read(offset, length) -> bytes or None
+        self._read = read
+        # overlay(offset, length) -> [(offset, bytes)] patched over each page when it's loaded
+        self._overlay = overlay
+        self._size = size
+        self.page_size = page_size
+
+        self._lock = threading.Lock()
+        self._pages = {}
+        # bytes patched over the memory (i.e. original bytes of hooks and edits)
+        self._patches = []
+
+    def __len__(self):
+        return self._size
+
+    def __bool__(self):
+        return self._size > 0
+
+    def __bytes__(self):
+        return self[0:self._size]
+
+    def __iter__(self):
+        return iter(self[0:self._size])
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._size)
+            data = self._get(start, stop)
+            return data if step == 1 else data[::step]
+        if key < 0:
+            key += self._size
+        if not 0 <= key < self._size:
+            raise IndexError('range data index out of range')
+        return self._get(key, key + 1)[0]
+
+    def __setitem__(self, key, value):
+        if isinstance(key, slice):
+            start, _, _ = key.indices(self._size)
+        else:
+            start = key + self._size if key < 0 else key
+            value = bytes([value])
+        self.patch(start, bytes(value))
+
+    def missing(self, start, end):
+        """ list of [offset, length] page aligned runs in [start, end) which aren't loaded yet
+        """
+        start = max(0, start)
+        end = min(self._size, end)
+        runs = []
+        with self._lock:
+            for page in range(start - start % self.page_size, end, self.page_size):
+                if page in self._pages:
+                    continue
+                length = min(self.page_size, self._size - page)
+                if runs and runs[-1][0] + runs[-1][1] == page:
+                    runs[-1][1] += length
+                else:
+                    runs.append([page, length])
+        return runs
+
+    def is_loaded(self, start, end):
+        return not self.missing(start, end)
+
+    def fetch(self, offset, length):
+        """ read [offset, offset + length) and store its pages, returns False if the memory wasn't readable
+
+            unreadable pages are stored zeroed so they are not requested again
+        """
+        data = self._read(offset, length)
+        readable = data is not None and len(data) == length
+        if not readable:
+            data = bytes(length)
+        with self._lock:
+            for page in range(offset, offset + length, self.page_size):
+                if page not in self._pages:
+                    self._pages[page] = self._apply_patches(
+                        page, bytes(data[page - offset:page - offset + self.page_size]))
+        return readable
+
+    def patch(self, offset, bytes_):
+        """ write bytes_ at offset over the loaded pages and the ones loaded later
+        """
+        with self._lock:
+            self._patches.append((offset, bytes_))
+            for page in list(self._pages.keys()):
+                if page < offset + len(bytes_) and offset < page + len(self._pages[page]):
+                    self._pages[page] = self._apply_patches(page, self._pages[page], [(offset, bytes_)])
+
+    def _apply_patches(self, page, data, patches=None):
+        if patches is None:
+            patches = self._patches
+            if self._overlay is not None:
+                patches = self._overlay(page, len(data)) + patches
+        data_bt = None
+        for offset, bytes_ in patches:
+            start = max(offset, page)
+            end = min(offset + len(bytes_), page + len(data))
+            if start >= end:
+                continue
+            if data_bt is None:
+                data_bt = bytearray(data)
+            data_bt[start - page:end - page] = bytes_[start - offset:end - offset]
+        return data if data_bt is None else bytes(data_bt)
+
+    def _get(self, start, stop):
+        if stop <= start:
+            return bytes()
+        for offset, length in self.missing(start, stop):
+            self.fetch(offset, length)
+        first = start - start % self.page_size
+        with self._lock:
+            data = b''.join(self._pages[page] for page in range(first, stop, self.page_size))
+        return data[start - first:stop - first]
 
 
 class Range(object):
@@ -59,7 +186,7 @@ class Range(object):
 
         if self.source == Range.SOURCE_TARGET:
             try:
-                _range = self.dwarf.dwarf_api('getRange', self.start_address)
+                _range = self.dwarf.get_range(self.start_address)
             except Exception as e:
                 return 1
             if _range is None or len(_range) == 0:
@@ -75,21 +202,13 @@ class Range(object):
             self.tail = self.base + self.size
             self.start_offset = self.start_address - self.base
 
-            # read data
-            self.data = self.dwarf.read_memory(self.base, self.size)
-
-            # check if we have hooks in range and patch data
-            hooks = json.loads(self.dwarf._script.exports.hooks())
-            for key in list(hooks.keys()):
-                hook = hooks[key]
-                if utils.parse_ptr(hook['nativePtr']) != 1 and hook['bytes']:
-                    hook_address = utils.parse_ptr(hook['nativePtr'])
-                    if self.base < hook_address < self.tail:
-                        offset = hook_address - self.base
-                        # patch bytes
-                        self.patch_bytes(hook['bytes'], offset)
+            # data is read in pages when accessed, hooks original bytes are put back on each page
+            overlay = None
+            if self.dwarf.snapshot is None:
+                overlay = functools.partial(self._hook_overlay, self.base)
+            self.data = RangeData(self.size, functools.partial(self._read_target, self.base), overlay=overlay)
         elif self.source == Range.SOURCE_EMULATOR:
-            uc = self.dwarf.get_emulator().uc
+            uc = self.dwarf.emulator.uc
             if uc is not None:
                 for base, tail, perm in uc.mem_regions():
                     if base <= self.start_address <= tail:
@@ -99,20 +218,32 @@ class Range(object):
                         self.size = self.tail - self.base
                         break
                 if self.base > 0:
-                    # read data
-                    self.data = uc.mem_read(self.base, self.size)
-        if self.data is None:
+                    self.data = RangeData(self.size, functools.partial(self._read_emulator, uc, self.base))
+        if self.data is None or len(self.data) == 0:
             self.data = bytes()
             return 1
-        if len(self.data) == 0:
+        # make sure what we are going to show is readable
+        page = max(0, self.start_offset - self.start_offset % RangeData.PAGE_SIZE)
+        if not self.data.fetch(page, min(RangeData.PAGE_SIZE, self.size - page)):
             return 1
         return 0
 
     def patch_bytes(self, _bytes, offset):
-        data_bt = bytearray(self.data)
-        org_bytes = bytes.fromhex(_bytes)
-        data_bt[offset:offset+len(org_bytes)] = org_bytes
-        self.data = bytes(data_bt)
+        self.data.patch(offset, bytes.fromhex(_bytes))
+
+    def _read_target(self, base, offset, length):
+        return self.dwarf.read_memory(base + offset, length)
+
+    def _hook_overlay(self, base, offset, length):
+        patches = self.dwarf.hook_patches.find(base + offset, base + offset + length)
+        return [(address - base, bytes_) for address, bytes_ in patches]
+
+    @staticmethod
+    def _read_emulator(uc, base, offset, length):
+        try:
+            return bytes(uc.mem_read(base + offset, length))
+        except Exception:  # pylint: disable=broad-except
+            return None
 
     def set_start_offset(self, offset):
         self.start_offset = offset
@@ -0,0 +1,96 @@
+"""
+Dwarf - Copyright (C) 2019 Giovanni Rocca (iGio90)
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>
+"""
+import hashlib
+import os
+
+import frida
+
+
+class ScriptCache(object):
+    """ ScriptCache
+
+        keeps v8 snapshots of the agent on disk, keyed by source hash, frida version and target,
+        so that the agent is not compiled from source on every attach/spawn.
+        falls back to the plain source when the frida in use can't snapshot
+    """
+
+    # next to the prefs (.dwarf) and the .git_cache, in the directory dwarf runs from
+    CACHE_PATH = '.script_cache'
+
+    # source of the script created on top of the snapshot, the agent lives in the snapshot heap
+    SNAPSHOT_STUB = '/* dwarf agent snapshot */'
+
+    def __init__(self, path=CACHE_PATH):
+        self._path = path
+
+    def get_key(self, source, runtime='v8', target=''):
+        digest = hashlib.sha256()
+        for part in (frida.__version__, runtime, target, source):
+            digest.update(part.encode('utf8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def clear(self):
+        if not os.path.exists(self._path):
+            return
+        for name in os.listdir(self._path):
+            os.remove(os.path.join(self._path, name))
+
+    def create_script(self, session, source, runtime='v8', target=''):
+        """ returns (script, from_snapshot), script is not loaded yet
+        """
+        key = self.get_key(source, runtime, target)
+        snapshot_path = os.path.join(self._path, key + '.snapshot')
+        failed_path = os.path.join(self._path, key + '.failed')
+
+        if os.path.exists(failed_path) or not hasattr(session, 'snapshot_script'):
+            return session.create_script(source, runtime=runtime), False
+
+        snapshot = None
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path, 'rb') as f:
+                snapshot = f.read()
+        else:
+            try:
+                snapshot = session.snapshot_script(source, runtime=runtime)
+            except Exception as e:  # pylint: disable=broad-except
+                print('failed to snapshot agent: ' + str(e))
+                self._write(failed_path, b'')
+                return session.create_script(source, runtime=runtime), False
+            self._write(snapshot_path, snapshot)
+
+        try:
+            return session.create_script(self.SNAPSHOT_STUB, snapshot=snapshot, runtime=runtime), True
+        except Exception as e:  # pylint: disable=broad-except
+            print('failed to load agent snapshot: ' + str(e))
+            self.invalidate(source, runtime, target)
+            return session.create_script(source, runtime=runtime), False
+
+    def invalidate(self, source, runtime='v8', target=''):
+        """ drop the snapshot and don't try again for this key
+        """
+        key = self.get_key(source, runtime, target)
+        snapshot_path = os.path.join(self._path, key + '.snapshot')
+        if os.path.exists(snapshot_path):
+            os.remove(snapshot_path)
+        self._write(os.path.join(self._path, key + '.failed'), b'')
+
+    def _write(self, path, data):
+        if not os.path.exists(self._path):
+            os.mkdir(self._path)
+        with open(path, 'wb') as f:
+            f.write(data)
@@ -14,37 +14,34 @@ Dwarf - Copyright (C) 2019 Giovanni Rocca (iGio90)
     You should have received a copy of the GNU General Public License
     along with this program.  If not, see <https://www.gnu.org/licenses/>
 """
+from concurrent.futures import ThreadPoolExecutor
 
-from PyQt5.QtCore import QObject, pyqtSignal
-from lib.git import Git
+from PyQt5.QtCore import QObject, QThread, pyqtSignal
 
 
-class ScriptsManager(QObject):
-    """ ScriptManager
-
-        signals:
-            scriptsUpdated()
+class ScriptsThread(QThread):
+    """ fetch the scripts index and the infos of each script
     """
 
-    scriptsUpdated = pyqtSignal(name='scriptsUpdated')
+    onScriptsFetched = pyqtSignal(dict, name='onScriptsFetched')
 
-    def __init__(self):
-        super(ScriptsManager, self).__init__()
+    def __init__(self, parent=None):
+        super().__init__(parent=parent)
+        from lib.git import Git
         self._git = Git()
-        self.scripts = {}
 
-        self.update_scripts()
-
-    def update_scripts(self):
+    def run(self):
         scripts = self._git.get_dwarf_scripts()
 
         if scripts is None:
+            self.onScriptsFetched.emit({})
             return
 
         scripts = scripts.replace(' ', '').replace('\t', '').split('\n')
         submodule_path = '[submodule"'
         url_path = 'url='
         module_name = ''
+        modules = []
 
         for line in scripts:
             if line.startswith(submodule_path):
@@ -56,17 +53,51 @@ class ScriptsManager(QObject):
                     url = url[:-4]
                 url = url.replace('https://github.com',
                                   'https://raw.githubusercontent.com')
+                modules.append((module_name, url))
+
+        # infos are fetched in parallel, cached ones return right away
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            infos = list(executor.map(
+                lambda module: self._git.get_script_info(module[1] + '/master/dwarf.json'), modules))
+
+        result = {}
+        for (module_name, url), info in zip(modules, infos):
+            if info is None:
+                continue
+            result[module_name] = {
+                'info': info,
+                'script': url + '/master/script.js'
+            }
+
+        self.onScriptsFetched.emit(result)
+
+
+class ScriptsManager(QObject):
+    """ ScriptManager
+
+        scripts are fetched in background, listen to scriptsUpdated
+
+        signals:
+            scriptsUpdated()
+    """
+
+    scriptsUpdated = pyqtSignal(name='scriptsUpdated')
 
-                info_url = url + '/master/dwarf.json'
-                script_url = url + '/master/script.js'
-                info = self._git.get_script_info(info_url)
-                if info is None:
-                    continue
-                self.scripts[module_name] = {
-                    'info': info,
-                    'script': script_url
-                }
+    def __init__(self):
+        super(ScriptsManager, self).__init__()
+        self.scripts = {}
+
+        self._scripts_thread = ScriptsThread(self)
+        self._scripts_thread.onScriptsFetched.connect(self._on_scripts_fetched)
+
+        self.update_scripts()
+
+    def update_scripts(self):
+        if not self._scripts_thread.isRunning():
+            self._scripts_thread.start()
 
+    def _on_scripts_fetched(self, scripts):
+        self.scripts = scripts
         self.scriptsUpdated.emit()
 
     def get_script(self, script_name):
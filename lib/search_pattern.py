@@ -0,0 +1,99 @@
+"""
+Dwarf - Copyright (C) 2019 Giovanni Rocca (iGio90)
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>
+"""
+import binascii
+import re
+
+
+class SearchPattern(object):
+    """ SearchPattern
+
+        a search input turned into a frida pattern (space separated bytes, ?? and nibble wildcards)
+
+        input is hex when it parses as such, ascii otherwise.
+        'hex:', 'ascii:' and 'utf16:' prefixes force the kind, utf16 being little endian
+    """
+
+    KIND_HEX = 'hex'
+    KIND_ASCII = 'ascii'
+    KIND_UTF16 = 'utf16'
+
+    _HEX_BYTE = re.compile(r'^[0-9a-fA-F?]{2}$')
+
+    def __init__(self, text, kind, pattern):
+        self.text = text
+        self.kind = kind
+        self.pattern = pattern
+
+    def __len__(self):
+        return len(self.pattern.split(' '))
+
+    def __repr__(self):
+        return 'SearchPattern(%s, %s)' % (self.kind, self.text)
+
+    @property
+    def fixed(self):
+        """ True when some byte has no wildcard
+        """
+        return any('?' not in token for token in self.pattern.split(' '))
+
+    @staticmethod
+    def parse(text):
+        for kind in (SearchPattern.KIND_HEX, SearchPattern.KIND_ASCII, SearchPattern.KIND_UTF16):
+            if text.startswith(kind + ':'):
+                return SearchPattern._parse_kind(text, kind, text[len(kind) + 1:])
+
+        try:
+            return SearchPattern._parse_kind(text, SearchPattern.KIND_HEX, text)
+        except ValueError:
+            return SearchPattern._parse_kind(text, SearchPattern.KIND_ASCII, text)
+
+    @staticmethod
+    def parse_list(text):
+        """ one pattern per non empty line
+        """
+        return SearchPattern.check_list([SearchPattern.parse(line) for line in text.splitlines() if line.strip()])
+
+    @staticmethod
+    def check_list(patterns):
+        """ patterns searched together are matched by their fixed bytes, a lone one can do without
+        """
+        if len(patterns) > 1:
+            for pattern in patterns:
+                if not pattern.fixed:
+                    raise ValueError('pattern without fixed bytes: %s' % pattern.text)
+        return patterns
+
+    @staticmethod
+    def _parse_kind(text, kind, value):
+        if kind == SearchPattern.KIND_HEX:
+            value = value.strip()
+            if ' ' in value:
+                tokens = value.split()
+            else:
+                tokens = [value[i:i + 2] for i in range(0, len(value), 2)]
+            if not tokens or not all(SearchPattern._HEX_BYTE.match(token) for token in tokens):
+                raise ValueError('invalid hex pattern: %s' % value)
+            return SearchPattern(text, kind, ' '.join(token.lower() for token in tokens))
+
+        if not value:
+            raise ValueError('empty pattern')
+        if kind == SearchPattern.KIND_UTF16:
+            data = value.encode('utf-16-le')
+        else:
+            data = value.encode('utf8')
+        hex_str = binascii.hexlify(data).decode('utf8')
+        return SearchPattern(text, kind, ' '.join(hex_str[i:i + 2] for i in range(0, len(hex_str), 2)))
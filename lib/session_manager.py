@@ -15,11 +15,6 @@ import json
 
 from PyQt5.QtCore import QObject, pyqtSignal
 
-from lib.android_session import AndroidSession
-from lib.local_session import LocalSession
-from lib.remote_session import RemoteSession
-from lib.ios_session import IosSession
-
 
 class SessionRunningException(Exception):
     """ Exception
@@ -58,13 +53,18 @@ class SessionManager(QObject):
         if self._session is not None:
             raise SessionRunningException('there is an active session')
         else:
+            # sessions pull in frida, the device ui and the core, import them only when needed
             if session_type == 'android':
+                from lib.android_session import AndroidSession
                 self._session = AndroidSession(self._app_window)
             elif session_type == 'local':
+                from lib.local_session import LocalSession
                 self._session = LocalSession(self._app_window)
             elif session_type == 'remote':
+                from lib.remote_session import RemoteSession
                 self._session = RemoteSession(self._app_window)
             elif session_type == 'ios':
+                from lib.ios_session import IosSession
                 self._session = IosSession(self._app_window)
             else:
                 self._session = None
@@ -97,76 +97,102 @@ class SessionManager(QObject):
         if self._session is not None:
             self.sessionStopped.emit()
 
-    def _get_session_restore_ptr(self, hook):
+    def _get_session_restore_call(self, hook):
+        """ returns the api call resolving the hook address and the offset to add to its result
+        """
         module = hook['debugSymbols']['moduleName']
         if module is not None and module != '':
             name = hook['debugSymbols']['name']
         else:
-            return 0
+            return None
         add = 0
         if name.startswith('0x'):
             if '+' in name:
                 p = name.split('+')
                 name = int(p[0], 16)
                 add = int(p[1], 16)
-
-            module = self._app_window.dwarf.dwarf_api('findModule', module)
-            if module is not None:
-                module = json.loads(module)
-                return int(module['base'], 16) + name + add
+            else:
+                name = int(name, 16)
+            return ['findModule', module], name + add
         else:
             if '+' in name:
                 p = name.split('+')
                 name = p[0]
                 add = int(p[1], 16)
-            ptr = self._app_window.dwarf.dwarf_api('findExport', [name, module])
-            if ptr is not None:
-                return int(ptr, 16) + add
-        return 0
+            return ['findExport', [name, module]], add
+
+    def _get_session_restore_ptr(self, call, offset, result):
+        if result is None:
+            return 0
+        if call[0] == 'findModule':
+            if isinstance(result, str):
+                result = json.loads(result)
+            return int(result['base'], 16) + offset
+        return int(result, 16) + offset
 
     def restore_session(self):
         if self._restored_session_data is not None:
-            # restore hooks
+            dwarf = self.session.dwarf
+
+            # resolve native hooks and watchers addresses in a single round-trip
+            pending = []
+            for section in ['hooks', 'watchers']:
+                if section not in self._restored_session_data:
+                    continue
+                hooks = self._restored_session_data[section]
+                for hook_key in hooks:
+                    hook = hooks[hook_key]
+                    if not hook_key.startswith('0x'):
+                        continue
+                    if section == 'watchers' and 'flags' not in hook:
+                        continue
+                    restore_call = self._get_session_restore_call(hook)
+                    if restore_call is not None:
+                        pending.append([section, hook, restore_call[0], restore_call[1]])
+
+            resolved = []
+            if pending:
+                resolved = dwarf.dwarf_api_batch([item[2] for item in pending])
+                if resolved is None:
+                    resolved = []
+
+            # restore everything else in a second round-trip
+            calls = []
+            for item, result in zip(pending, resolved):
+                section, hook, call, offset = item
+                ptr = self._get_session_restore_ptr(call, offset, result[0])
+                if ptr > 0:
+                    if section == 'hooks':
+                        calls.append(['hookNative', ptr])
+                    else:
+                        calls.append(['addWatcher', [ptr, hook['flags']]])
+
             if 'hooks' in self._restored_session_data:
                 hooks = self._restored_session_data['hooks']
 
                 for hook_key in hooks:
                     hook = hooks[hook_key]
-                    if hook_key.startswith('0x'):
-                        # this is a native hook
-                        ptr = self._get_session_restore_ptr(hook)
-                        if ptr is not None and ptr > 0:
-                            self.session.dwarf.dwarf_api('hookNative', ptr)
-                    else:
-                        # check if it's a java hook
-                        is_java_hook = 'javaClassMethod' in hook and hook['javaClassMethod'] is not None
-                        if is_java_hook:
-                            self.session.dwarf.dwarf_api('hookJava', hook['javaClassMethod'])
+                    # check if it's a java hook
+                    is_java_hook = 'javaClassMethod' in hook and hook['javaClassMethod'] is not None
+                    if not hook_key.startswith('0x') and is_java_hook:
+                        calls.append(['hookJava', hook['javaClassMethod']])
 
             # restore native on loads
             if 'nativeOnLoads' in self._restored_session_data:
                 hooks = self._restored_session_data['nativeOnLoads']
 
                 for hook_key in hooks:
-                    self.session.dwarf.dwarf_api('hookNativeOnLoad', hook_key)
+                    calls.append(['hookNativeOnLoad', hook_key])
 
             # restore java on loads
             if 'javaOnLoads' in self._restored_session_data:
                 hooks = self._restored_session_data['javaOnLoads']
 
                 for hook_key in hooks:
-                    self.session.dwarf.dwarf_api('hookJavaOnLoad', hook_key)
+                    calls.append(['hookJavaOnLoad', hook_key])
 
-            # restore watchers
-            if 'watchers' in self._restored_session_data:
-                hooks = self._restored_session_data['watchers']
-
-                for hook_key in hooks:
-                    hook = hooks[hook_key]
-                    if hook_key.startswith('0x') and 'flags' in hook:
-                        ptr = self._get_session_restore_ptr(hook)
-                        if ptr > 0:
-                            self.session.dwarf.dwarf_api('addWatcher', [ptr, hook['flags']])
+            if calls:
+                dwarf.dwarf_api_batch(calls)
 
             # restore bookmarks
             if 'bookmarks' in self._restored_session_data:
@@ -183,5 +209,12 @@ class SessionManager(QObject):
                 self.session.dwarf.dwarf_api(
                     'evaluateFunction', self._app_window.console_panel.get_js_console().get_js_script_text())
 
+            # restore the string index
+            if 'strings' in self._restored_session_data:
+                try:
+                    dwarf.string_index.load(self._restored_session_data['strings'])
+                except (OSError, ValueError) as e:
+                    dwarf.log('unable to load the string index: ' + str(e))
+
         # invalidation
         self._restored_session_data = None
@@ -0,0 +1,265 @@
+"""
+Dwarf - Copyright (C) 2019 Giovanni Rocca (iGio90)
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>
+"""
+import bisect
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+
+from lib.context import Context
+from lib.register import Register
+
+# file layout:
+#   header   MAGIC + version (u32) + reserved (u32)
+#   data     the bytes of each range, one after the other
+#   index    json with process infos, modules, thread contexts and ranges (base, size, file offset...)
+#   footer   index offset (u64) + index length (u64) + MAGIC
+MAGIC = b'DWARFSNP'
+VERSION = 1
+_HEADER = struct.Struct('<8sII')
+_FOOTER = struct.Struct('<QQ8s')
+
+
+class SnapshotFormatError(Exception):
+    """ Raised when the file is not a dwarf snapshot
+    """
+
+
+def _dump_context(context):
+    registers = {}
+    for name, register in context.__dict__.items():
+        if isinstance(register, Register):
+            registers[name] = {'value': hex(register.value), 'isValidPointer': False}
+    return registers
+
+
+class SnapshotWriter(object):
+    """ SnapshotWriter
+
+        ranges are streamed one after the other, the index is written by close()
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.ranges = []
+
+        self._file = open(file_path, 'wb')
+        self._file.write(_HEADER.pack(MAGIC, VERSION, 0))
+        self._offset = _HEADER.size
+
+    def add_range(self, range_entry, dump):
+        """ write the memory of range_entry (as given by enumerateRanges) with a MemoryDump of it
+            returns False when the dump got cancelled
+        """
+        self._file.truncate(self._offset + dump.length)
+        if not dump.write_to(self._file, self._offset):
+            return False
+
+        entry = dict(range_entry)
+        entry['size'] = dump.length
+        entry['offset'] = self._offset
+        self.ranges.append(entry)
+        self._offset += dump.length
+        return True
+
+    def close(self, infos):
+        """ write the index and the footer, infos is merged in the index
+        """
+        index = dict(infos)
+        index['version'] = VERSION
+        index['ranges'] = self.ranges
+        index = json.dumps(index).encode('utf8')
+
+        self._file.seek(self._offset)
+        self._file.write(index)
+        self._file.write(_FOOTER.pack(self._offset, len(index), MAGIC))
+        self._file.close()
+
+    def discard(self):
+        self._file.close()
+        os.remove(self.file_path)
+
+
+class SnapshotCapture(object):
+    """ SnapshotCapture
+
+        captures every readable range of the target, the modules and the thread contexts into file_path
+        same interface of MemoryDump so it can run in the same threads
+    """
+
+    def __init__(self, dwarf, file_path, progress=None):
+        self.file_path = file_path
+        self.progress = progress
+
+        self.length = 0
+        self.written = 0
+        self.elapsed = 0
+
+        self._dwarf = dwarf
+        self._dump = None
+        self._cancel = threading.Event()
+        self._start = 0
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+        if self._dump is not None:
+            self._dump.cancel()
+
+    def run(self):
+        """ capture, returns False when cancelled (the partial file is removed)
+        """
+        self._start = time.perf_counter()
+
+        ranges = self._dwarf.dwarf_api('enumerateRanges') or []
+        ranges = [r for r in ranges if 'r' in r['protection']]
+        modules = json.loads(self._dwarf.dwarf_api('enumerateModules') or '[]')
+        self.length = sum(int(r['size']) for r in ranges)
+
+        writer = SnapshotWriter(self.file_path)
+        for range_entry in ranges:
+            if self.cancelled:
+                break
+            done = self.written
+            self._dump = self._dwarf.create_memory_dump(
+                None, int(range_entry['base'], 16), int(range_entry['size']),
+                progress=lambda written, length, rate, done=done: self._on_progress(done + written))
+            if not writer.add_range(range_entry, self._dump):
+                break
+            self.written = done + self._dump.length
+
+        self.elapsed = time.perf_counter() - self._start
+        if self.cancelled:
+            writer.discard()
+            return False
+
+        writer.close({
+            'arch': self._dwarf.arch,
+            'platform': self._dwarf.platform,
+            'pointer_size': self._dwarf.pointer_size,
+            'pid': self._dwarf.pid,
+            'time': int(time.time()),
+            'modules': modules,
+            'contexts': {tid: _dump_context(context) for tid, context in self._dwarf.contexts.items()
+                         if context.is_native_context}
+        })
+        return True
+
+    def _on_progress(self, written):
+        self.elapsed = time.perf_counter() - self._start
+        if self.progress is not None:
+            self.progress(written, self.length, written / max(self.elapsed, 1e-6))
+
+
+class Snapshot(object):
+    """ Snapshot
+
+        read only view of a snapshot file, the data is mmap'ed and looked up with an address index
+        so that opening doesn't depend on the snapshot size
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+
+        self._file = open(file_path, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise SnapshotFormatError('empty file')
+
+        try:
+            magic, version, _ = _HEADER.unpack_from(self._mmap, 0)
+            index_offset, index_length, end_magic = _FOOTER.unpack_from(self._mmap, len(self._mmap) - _FOOTER.size)
+            if magic != MAGIC or end_magic != MAGIC:
+                raise SnapshotFormatError('not a dwarf snapshot')
+            if version > VERSION:
+                raise SnapshotFormatError('unsupported snapshot version %d' % version)
+            index = json.loads(self._mmap[index_offset:index_offset + index_length].decode('utf8'))
+        except (struct.error, ValueError) as e:
+            self.close()
+            raise SnapshotFormatError(str(e))
+        except SnapshotFormatError:
+            self.close()
+            raise
+
+        self.arch = index.get('arch', '')
+        self.platform = index.get('platform', '')
+        self.pointer_size = index.get('pointer_size', 0)
+        self.pid = index.get('pid', 0)
+        self.time = index.get('time', 0)
+        self.modules = index.get('modules', [])
+        self.contexts = {tid: Context(registers) for tid, registers in index.get('contexts', {}).items()}
+
+        self.ranges = sorted(index['ranges'], key=lambda r: int(r['base'], 16))
+        self._bases = [int(r['base'], 16) for r in self.ranges]
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+    def find_range(self, ptr):
+        """ the range entry containing ptr or None
+        """
+        i = bisect.bisect_right(self._bases, ptr) - 1
+        if i < 0:
+            return None
+        entry = self.ranges[i]
+        if ptr >= self._bases[i] + entry['size']:
+            return None
+        return entry
+
+    def get_range(self, ptr):
+        """ same as the getRange api of the agent
+        """
+        entry = self.find_range(ptr)
+        if entry is None:
+            return None
+        return self._strip(entry)
+
+    def get_ranges(self):
+        """ ranges as enumerateRanges would list them
+        """
+        return [self._strip(entry) for entry in self.ranges]
+
+    @staticmethod
+    def _strip(entry):
+        return {key: value for key, value in entry.items() if key != 'offset'}
+
+    def read(self, ptr, length):
+        """ bytes at [ptr, ptr + length) or None when not entirely inside a captured range
+        """
+        entry = self.find_range(ptr)
+        if entry is None:
+            return None
+        position = ptr - int(entry['base'], 16)
+        if position + length > entry['size']:
+            return None
+        offset = entry['offset'] + position
+        return self._mmap[offset:offset + length]
+
+    def view(self, entry):
+        """ memoryview over the whole data of a range entry, without copies
+        """
+        return memoryview(self._mmap)[entry['offset']:entry['offset'] + entry['size']]
@@ -0,0 +1,91 @@
+"""
+Dwarf - Copyright (C) 2019 Giovanni Rocca (iGio90)
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>
+"""
+import cProfile
+import io
+import pstats
+import sys
+import time
+
+
+class StartupProfiler(object):
+    """ StartupProfiler
+
+        times the startup phases up to the first window, with --profile-startup
+        a cProfile of the whole startup is printed as well
+
+        usage:
+            profiler.mark('imports')
+            profiler.check_not_loaded('requests')
+            ...
+            within_budget = profiler.report(budget_ms)
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._start = time.perf_counter()
+        self._marks = []
+        self._profile = None
+        # modules which were expected to stay off the startup path
+        self._loaded = []
+
+        if self.enabled:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def mark(self, name):
+        self._marks.append((name, time.perf_counter()))
+
+    def check_not_loaded(self, *modules):
+        """ the modules already imported at this point fail the report
+        """
+        self._loaded.extend(module for module in modules
+                            if module in sys.modules and module not in self._loaded)
+
+    def elapsed(self):
+        """ ms since the profiler was created
+        """
+        return (time.perf_counter() - self._start) * 1000
+
+    def report(self, budget=None, top=25):
+        """ print phases and hot spots, returns False when over budget (ms) or when
+            modules given to check_not_loaded were imported
+        """
+        total = self.elapsed()
+        if self._profile is not None:
+            self._profile.disable()
+
+        print('startup phases:')
+        last = self._start
+        for name, when in self._marks:
+            print('  {0:<24} {1:>8.1f} ms'.format(name, (when - last) * 1000))
+            last = when
+        print('  {0:<24} {1:>8.1f} ms'.format('time to first window', total))
+
+        if self._profile is not None:
+            out = io.StringIO()
+            stats = pstats.Stats(self._profile, stream=out)
+            stats.sort_stats('cumulative').print_stats(top)
+            print(out.getvalue())
+
+        within_budget = True
+        if self._loaded:
+            print('imported on the startup path: {0}'.format(', '.join(self._loaded)))
+            within_budget = False
+        if budget is not None and total > budget:
+            print('startup over budget: {0:.1f} ms > {1} ms'.format(total, budget))
+            within_budget = False
+        return within_budget
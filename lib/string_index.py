@@ -0,0 +1,291 @@
+"""
+Dwarf - Copyright (C) 2019 Giovanni Rocca (iGio90)
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>
+"""
+import bisect
+import gzip
+import json
+import re
+import threading
+import time
+
+
+_PRINTABLE = bytes(range(0x20, 0x7f)) + b'\t'
+
+
+class StringExtractor(object):
+    """ StringExtractor
+
+        printable ascii and utf-16le strings of a memory range fed in consecutive chunks,
+        strings crossing the chunks are carried over to the next one
+    """
+
+    KIND_ASCII = 'ascii'
+    KIND_UTF16 = 'utf16'
+
+    # carried bytes are bounded, longer strings are split
+    MAX_CARRY = 1024 * 1024
+
+    def __init__(self, base, min_length=4):
+        self.base = base
+        self.min_length = min_length
+        self._ascii = re.compile(b'[\\x20-\\x7e\\t]{%d,}' % min_length)
+        self._utf16 = re.compile(b'(?:[\\x20-\\x7e\\t]\\x00){%d,}' % min_length)
+        self._carry = b''
+        self._offset = 0
+
+    def feed(self, chunk, final=False):
+        """ [(address, kind, text)] of the strings complete with chunk
+        """
+        data = self._carry + bytes(chunk)
+        start = self._offset - len(self._carry)
+        cut = len(data) if final else self._cut(data)
+        if len(data) - cut > self.MAX_CARRY:
+            cut = len(data)
+
+        # matches are maximal over the whole data, the ones starting before the cut are complete
+        strings = []
+        for kind, expression, encoding in ((self.KIND_ASCII, self._ascii, 'ascii'),
+                                           (self.KIND_UTF16, self._utf16, 'utf-16-le')):
+            for match in expression.finditer(data):
+                if match.start() >= cut:
+                    break
+                strings.append((self.base + start + match.start(), kind, match.group().decode(encoding)))
+        strings.sort()
+
+        self._carry = data[cut:]
+        self._offset += len(chunk)
+        return strings
+
+    def finish(self):
+        return self.feed(b'', final=True)
+
+    @staticmethod
+    def _cut(data):
+        # start of the printable run (of either kind) which might continue in the next chunk
+        cut = len(data.rstrip(_PRINTABLE))
+        for end in (len(data), len(data) - 1):
+            if end < len(data) and data[end] not in _PRINTABLE:
+                continue
+            position = end
+            while position >= 2 and data[position - 1] == 0 and data[position - 2] in _PRINTABLE:
+                position -= 2
+            cut = min(cut, position)
+        return cut
+
+
+class StringIndex(object):
+    """ StringIndex
+
+        host side index of the strings in the target memory, filled range by range.
+        searches run over a single text blob joining every string, rebuilt after ranges are added
+    """
+
+    VERSION = 1
+
+    def __init__(self, min_length=4):
+        self.min_length = min_length
+
+        self._lock = threading.Lock()
+        # base -> {'size', 'addresses', 'kinds', 'texts'}
+        self._ranges = {}
+        self._blob = None
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(entry['texts']) for entry in self._ranges.values())
+
+    def has_range(self, base):
+        with self._lock:
+            return base in self._ranges
+
+    def ranges(self):
+        """ [(base, size)] of the indexed ranges
+        """
+        with self._lock:
+            return sorted((base, entry['size']) for base, entry in self._ranges.items())
+
+    def add_range(self, base, size, strings):
+        """ index the [(address, kind, text)] of a range, replacing what was indexed for it before
+        """
+        entry = {'size': size, 'addresses': [], 'kinds': [], 'texts': []}
+        for address, kind, text in strings:
+            entry['addresses'].append(address)
+            entry['kinds'].append(kind)
+            entry['texts'].append(text)
+        with self._lock:
+            self._ranges[base] = entry
+            self._blob = None
+
+    def clear(self):
+        with self._lock:
+            self._ranges = {}
+            self._blob = None
+
+    def search(self, query, regex=False, case_sensitive=False, limit=None):
+        """ [(address, kind, text)] of the strings matching query, a substring unless regex
+
+            raises re.error on invalid regex
+        """
+        flags = re.MULTILINE
+        if not case_sensitive:
+            flags |= re.IGNORECASE
+        expression = re.compile(query if regex else re.escape(query), flags)
+
+        blob, starts, entries = self._get_blob()
+        results = []
+        last = -1
+        for match in expression.finditer(blob):
+            i = bisect.bisect_right(starts, match.start()) - 1
+            if i == last:
+                # a string is reported once
+                continue
+            last = i
+            results.append(entries[i])
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+    def _get_blob(self):
+        with self._lock:
+            if self._blob is None:
+                entries = []
+                for base in sorted(self._ranges.keys()):
+                    entry = self._ranges[base]
+                    entries += zip(entry['addresses'], entry['kinds'], entry['texts'])
+                # strings don't hold new lines, they keep matches inside a single string
+                starts = []
+                position = 0
+                for address, kind, text in entries:
+                    starts.append(position)
+                    position += len(text) + 1
+                self._blob = ('\n'.join(text for address, kind, text in entries), starts, entries)
+            return self._blob
+
+    def save(self, file_path):
+        with self._lock:
+            index = {
+                'version': self.VERSION,
+                'min_length': self.min_length,
+                'ranges': [{'base': hex(base), 'size': entry['size'],
+                            'strings': list(zip(entry['addresses'], entry['kinds'], entry['texts']))}
+                           for base, entry in self._ranges.items()]
+            }
+        with gzip.open(file_path, 'wt', encoding='utf8') as f:
+            json.dump(index, f)
+
+    def load(self, file_path):
+        with gzip.open(file_path, 'rt', encoding='utf8') as f:
+            index = json.load(f)
+        if index.get('version') != self.VERSION:
+            raise ValueError('unsupported string index version')
+        self.clear()
+        self.min_length = index['min_length']
+        for range_entry in index['ranges']:
+            self.add_range(int(range_entry['base'], 16), range_entry['size'], range_entry['strings'])
+
+
+class StringIndexer(object):
+    """ StringIndexer
+
+        fills a StringIndex from ranges read through MemoryDump, so reads are pipelined and
+        unreadable pages zero filled. ranges already in the index are skipped unless reindex
+
+        progress(done, length, bytes_per_sec) is called from the thread running the indexer
+    """
+
+    def __init__(self, index, ranges, create_dump, reindex=False, progress=None):
+        # create_dump(ptr, length) -> MemoryDump reading the range
+        self.index = index
+        self.ranges = ranges
+        self.progress = progress
+        self.reindex = reindex
+
+        self.length = sum(size for base, size in ranges)
+        self.done = 0
+        self.elapsed = 0
+
+        self._create_dump = create_dump
+        self._dump = None
+        self._cancel = threading.Event()
+        self._start = 0
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+        dump = self._dump
+        if dump is not None:
+            dump.cancel()
+
+    def run(self):
+        """ index the ranges, returns False when cancelled. ranges indexed before cancelling are kept
+        """
+        self._start = time.perf_counter()
+        for base, size in self.ranges:
+            if self.cancelled:
+                break
+            if not self.reindex and self.index.has_range(base):
+                self._on_progress(size)
+                continue
+
+            sink = _OrderedSink(StringExtractor(base, self.index.min_length))
+            self._dump = self._create_dump(base, size)
+            self._dump.progress = lambda written, length, rate, done=self.done: self._on_progress(written, done)
+            completed = self._dump.write_to(sink)
+            self._dump = None
+            if not completed:
+                break
+            self.index.add_range(base, size, sink.finish())
+            self.done += size
+
+        self.elapsed = time.perf_counter() - self._start
+        return not self.cancelled
+
+    def _on_progress(self, written, done=None):
+        if done is None:
+            self.done += written
+            done = self.done
+        else:
+            done += written
+        self.elapsed = time.perf_counter() - self._start
+        if self.progress is not None:
+            self.progress(done, self.length, done / max(self.elapsed, 1e-6))
+
+
+class _OrderedSink(object):
+    # file like target of MemoryDump.write_to, chunks written out of order are fed in order
+
+    def __init__(self, extractor):
+        self._extractor = extractor
+        self._position = 0
+        self._next = 0
+        self._pending = {}
+        self._strings = []
+
+    def seek(self, position):
+        self._position = position
+
+    def write(self, data):
+        self._pending[self._position] = data
+        while self._next in self._pending:
+            chunk = self._pending.pop(self._next)
+            self._strings += self._extractor.feed(chunk)
+            self._next += len(chunk)
+
+    def finish(self):
+        return self._strings + self._extractor.finish()
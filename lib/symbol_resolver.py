@@ -0,0 +1,90 @@
+"""
+Dwarf - Copyright (C) 2019 Giovanni Rocca (iGio90)
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>
+"""
+import threading
+from collections import OrderedDict
+
+
+class SymbolResolver(object):
+    """ SymbolResolver
+
+        address keyed LRU of the agent DebugSymbols. resolve looks all the misses up in a single
+        agent call, addresses without a symbol are cached as None too
+
+        invalidate whenever modules are loaded or unloaded
+    """
+
+    def __init__(self, lookup, size=16384):
+        # lookup([address, ...]) -> [symbol dict, ...] in the same order, None when it failed
+        self._lookup = lookup
+        self._size = size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        # bumped by invalidate, lookups started before are not cached
+        self._generation = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._cache)
+
+    def resolve(self, addresses):
+        """ {address: symbol dict or None}
+        """
+        result = {}
+        missing = []
+        with self._lock:
+            generation = self._generation
+            for address in addresses:
+                if address in result:
+                    continue
+                if address in self._cache:
+                    self._cache.move_to_end(address)
+                    result[address] = self._cache[address]
+                    self.hits += 1
+                else:
+                    result[address] = None
+                    missing.append(address)
+            self.misses += len(missing)
+
+        if not missing:
+            return result
+
+        symbols = self._lookup(missing)
+        if not isinstance(symbols, list) or len(symbols) != len(missing):
+            return result
+
+        with self._lock:
+            cache = generation == self._generation
+            for address, symbol in zip(missing, symbols):
+                if not isinstance(symbol, dict) or not symbol.get('name'):
+                    symbol = None
+                result[address] = symbol
+                if cache:
+                    self._cache[address] = symbol
+                    self._cache.move_to_end(address)
+            while len(self._cache) > self._size:
+                self._cache.popitem(last=False)
+        return result
+
+    def resolve_one(self, address):
+        return self.resolve([address])[address]
+
+    def invalidate(self):
+        with self._lock:
+            self._cache.clear()
+            self._generation += 1
@@ -16,16 +16,13 @@ Dwarf - Copyright (C) 2019 Giovanni Rocca (iGio90)
 """
 import os
 import socket
+import struct
 import subprocess
 import sys
 
 import pyperclip
 
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QPixmap, QFont
-from PyQt5.QtWidgets import QMessageBox
-
-from lib.prefs import Prefs
+# qt is imported inside the ui helpers so that the headless core can use this module without it
 
 VERSION = sys.version_info
 
@@ -57,6 +54,8 @@ def do_shell_command(cmd, timeout=60):
 def get_app_icon():
     """ Returns Icon (QPixmap)
     """
+    from PyQt5.QtCore import Qt
+    from PyQt5.QtGui import QPixmap
     return QPixmap(resource_path('assets/dwarf.png')).scaledToHeight(75, Qt.SmoothTransformation)
 
 
@@ -78,6 +77,15 @@ def parse_ptr(ptr):
     return ptr
 
 
+def unpack_pointers(data, pointer_size):
+    """ unpack raw pointers packed by the agent
+    """
+    if not data:
+        return []
+    fmt = '<%d%s' % (len(data) // pointer_size, 'Q' if pointer_size == 8 else 'I')
+    return list(struct.unpack(fmt, data))
+
+
 def resource_path(relative_path):
     """get path to resource
     """
@@ -92,6 +100,7 @@ def resource_path(relative_path):
 def show_message_box(text, details=None):
     """ Shows a MessageBox
     """
+    from PyQt5.QtWidgets import QMessageBox
     msg = QMessageBox()
     msg.setIconPixmap(get_app_icon())
 
@@ -105,6 +114,7 @@ def show_message_box(text, details=None):
 def get_os_monospace_font():
     """ Get MonospaceFont for OS
     """
+    from PyQt5.QtGui import QFont
     platform = sys.platform
 
     if 'linux' in platform:
@@ -130,6 +140,7 @@ def copy_str_to_clipboard(text):
 def copy_hex_to_clipboard(hex_str):
     """ Helper for copying hexstr in prefered style
     """
+    from lib.prefs import Prefs
     _prefs = Prefs()
     uppercase = (_prefs.get('dwarf_ui_hexstyle', 'upper').lower() == 'upper')
     if isinstance(hex_str, str):
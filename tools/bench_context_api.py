@@ -0,0 +1,105 @@
+"""
+Dwarf - Copyright (C) 2019 Giovanni Rocca (iGio90)
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>
+"""
+
+#
+# context api round trip benchmark, runs as a headless session script:
+#
+#   DWARF_BENCH_HOOK=nanosleep python dwarf.py -p <target> --headless tools/bench_context_api.py
+#
+# a thread of the target is parked in a hook on DWARF_BENCH_HOOK (any input accepted by hook_native),
+# then DWARF_BENCH_CALLS api calls are sent to its mailbox with dwarf_api(..., tid).
+# plain rpc calls (no hook context) are timed as well, as the floor of a round trip.
+#
+# before the mailboxes, rpc.exports.api handed the call to the parked thread through hook_context
+# and both sides polled it with Thread.sleep: 0.1s on the result, 0.2s in _loopApi.
+#
+import os
+import statistics
+import sys
+import time
+
+# 0.1s for the result poll, plus up to 0.2s before the parked thread notices the call
+SLEEP_POLLING_MIN_MS = 100
+SLEEP_POLLING_MAX_MS = 300
+
+BENCH_API = 'isValidPointer'
+
+
+def _wait_context(dwarf, destroyed, timeout):
+    until = time.perf_counter() + timeout
+    while not dwarf.contexts:
+        if destroyed.is_set() or time.perf_counter() > until:
+            return 0
+        time.sleep(0.01)
+    return int(next(iter(dwarf.contexts)))
+
+
+def _time_calls(call, count):
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def _print_timings(name, timings):
+    timings = sorted(timings)
+    print('  {0:<16} mean {1:>8.3f} ms  median {2:>8.3f} ms  p99 {3:>8.3f} ms  max {4:>8.3f} ms'.format(
+        name, statistics.mean(timings), statistics.median(timings),
+        timings[min(len(timings) - 1, int(len(timings) * .99))], timings[-1]))
+
+
+def run_bench(dwarf, destroyed, hook_input, count, timeout=30):
+    """ returns the process exit code
+    """
+    dwarf.resume_proc()
+    hook_ptr = dwarf.dwarf_api('evaluatePtr', hook_input)
+    dwarf.hook_native(hook_input)
+    print('* waiting for a thread to hit {0}'.format(hook_input))
+    tid = _wait_context(dwarf, destroyed, timeout)
+    if tid == 0:
+        print('no thread hit {0} within {1:d}s'.format(hook_input, timeout))
+        return 1
+
+    try:
+        # warm up both paths
+        dwarf.dwarf_api(BENCH_API, hook_ptr, tid)
+        dwarf._script.exports.api(0, BENCH_API, [hook_ptr])
+
+        print('* {0:d} round trips of {1} against thread {2:d}'.format(count, BENCH_API, tid))
+        mailbox = _time_calls(lambda: dwarf.dwarf_api(BENCH_API, hook_ptr, tid), count)
+        rpc = _time_calls(lambda: dwarf._script.exports.api(0, BENCH_API, [hook_ptr]), count)
+    finally:
+        dwarf.dwarf_api('deleteHook', hook_ptr, tid)
+        dwarf.dwarf_api('release', tid, tid)
+
+    _print_timings('context mailbox', mailbox)
+    _print_timings('plain rpc', rpc)
+    print('  {0:<16} min  {1:>8.3f} ms  max    {2:>8.3f} ms'.format(
+        'sleep polling', SLEEP_POLLING_MIN_MS, SLEEP_POLLING_MAX_MS))
+    print('* mailbox median is {0:.0f}x below the sleep polling floor'.format(
+        SLEEP_POLLING_MIN_MS / max(statistics.median(mailbox), 0.001)))
+    return 0
+
+
+if __name__ == '__main__':
+    if 'dwarf' not in globals():
+        print('run it with: python dwarf.py -p <target> --headless ' + __file__)
+        sys.exit(1)
+    sys.exit(run_bench(dwarf, destroyed, os.environ.get('DWARF_BENCH_HOOK', 'nanosleep'),  # noqa: F821
+                       int(os.environ.get('DWARF_BENCH_CALLS', '1000'))))
@@ -0,0 +1,42 @@
+"""
+Dwarf - Copyright (C) 2019 Giovanni Rocca (iGio90)
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>
+"""
+import os
+import subprocess
+import sys
+
+DWARF_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dwarf.py')
+
+
+def check_startup(timeout=120):
+    """ run dwarf.py --profile-startup, returns its exit code
+
+        dwarf exits with 1 when the first window comes up over the startup budget
+        or when requests was imported on the way. qt runs offscreen unless told otherwise
+    """
+    env = dict(os.environ)
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    try:
+        return subprocess.call([sys.executable, DWARF_PATH, '--profile-startup'], env=env, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        print('startup check timed out after {0:d}s'.format(timeout))
+        return 1
+
+
+if __name__ == '__main__':
+    exit_code = check_startup()
+    print('startup check ' + ('passed' if exit_code == 0 else 'failed'))
+    sys.exit(exit_code)
@@ -72,6 +72,7 @@ class AppWindow(QMainWindow):
         self.backtrace_panel = None
         self.contexts_list_panel = None
         self.data_panel = None
+        self.diagnostics_panel = None
         self.emulator_panel = None
         self.ftrace_panel = None
         self.hooks_panel = None
@@ -84,6 +85,8 @@ class AppWindow(QMainWindow):
         self.modules_panel = None
         self.ranges_panel = None
         self.search_panel = None
+        self.strings_panel = None
+        self.pointer_scan_panel = None
         self.trace_panel = None
         self.watchers_panel = None
         self.welcome_window = None
@@ -175,6 +178,9 @@ class AppWindow(QMainWindow):
         theme.triggered.connect(self._set_theme)
         dwarf_menu.addMenu(theme)
         dwarf_menu.addSeparator()
+        dwarf_menu.addAction('Save snapshot', lambda: self.dwarf.save_snapshot())
+        dwarf_menu.addAction('Open snapshot', lambda: self.dwarf.open_snapshot())
+        dwarf_menu.addSeparator()
         if self._is_newer_dwarf:
             dwarf_menu.addAction('Update', self._update_dwarf)
         dwarf_menu.addAction('Close', self.session_manager.session.stop)
@@ -195,6 +201,12 @@ class AppWindow(QMainWindow):
             'Search',
             lambda: self.show_main_tab('search'),
             shortcut=QKeySequence(Qt.CTRL + Qt.Key_F3))
+        subview_menu.addAction(
+            'Strings',
+            lambda: self.show_main_tab('strings'))
+        subview_menu.addAction(
+            'Pointer scan',
+            lambda: self.show_main_tab('pointers'))
         subview_menu.addAction(
             'Emulator',
             lambda: self.show_main_tab('emulator'),
@@ -203,6 +215,9 @@ class AppWindow(QMainWindow):
             'Disassembly',
             lambda: self.show_main_tab('disassembly'),
             shortcut=QKeySequence(Qt.CTRL + Qt.Key_F5))
+        subview_menu.addAction(
+            'Diagnostics',
+            lambda: self.show_main_tab('diagnostics'))
         self.view_menu.addMenu(subview_menu)
         self.view_menu.addSeparator()
         self.menu.addMenu(self.view_menu)
@@ -239,6 +254,8 @@ class AppWindow(QMainWindow):
                 self._ui_elems.remove(tab_text.lower())
             except ValueError: # recheck ValueError: list.remove(x): x not in list
                 pass
+            # let the panel cancel its pending work
+            self.main_tabs.widget(index).close()
             self.main_tabs.removeTab(index)
 
     def _handle_tab_change(self):
@@ -285,6 +302,10 @@ class AppWindow(QMainWindow):
             index = self.main_tabs.indexOf(self.ranges_panel)
         elif name == 'search':
             index = self.main_tabs.indexOf(self.search_panel)
+        elif name == 'strings':
+            index = self.main_tabs.indexOf(self.strings_panel)
+        elif name == 'pointers':
+            index = self.main_tabs.indexOf(self.pointer_scan_panel)
         elif name == 'modules':
             index = self.main_tabs.indexOf(self.modules_panel)
         elif name == 'disassembly':
@@ -303,6 +324,8 @@ class AppWindow(QMainWindow):
             index = self.main_tabs.indexOf(self.java_explorer_panel)
         elif name == 'smali':
             index = self.main_tabs.indexOf(self.smali_panel)
+        elif name == 'diagnostics':
+            index = self.main_tabs.indexOf(self.diagnostics_panel)
 
         self.main_tabs.setCurrentIndex(index)
 
@@ -451,6 +474,7 @@ class AppWindow(QMainWindow):
             self.ranges_panel.onItemDoubleClicked.connect(
                 self._range_dblclicked)
             self.ranges_panel.onDumpBinary.connect(self._on_dumpmodule)
+            self.ranges_panel.onMemoryDiff.connect(self._on_memory_diff)
             # connect to watcherpanel func
             self.ranges_panel.onAddWatcher.connect(
                 self.watchers_panel.do_addwatcher_dlg)
@@ -461,6 +485,18 @@ class AppWindow(QMainWindow):
             self.search_panel.onShowMemoryRequest.connect(
                 self._on_watcher_clicked)
             self.main_tabs.addTab(self.search_panel, 'Search')
+        elif elem == 'strings':
+            from ui.panel_strings import StringsPanel
+            self.strings_panel = StringsPanel(self)
+            self.strings_panel.onShowMemoryRequest.connect(
+                self._on_watcher_clicked)
+            self.main_tabs.addTab(self.strings_panel, 'Strings')
+        elif elem == 'pointers':
+            from ui.panel_pointer_scan import PointerScanPanel
+            self.pointer_scan_panel = PointerScanPanel(self)
+            self.pointer_scan_panel.onShowMemoryRequest.connect(
+                self._on_watcher_clicked)
+            self.main_tabs.addTab(self.pointer_scan_panel, 'Pointer scan')
         elif elem == 'data':
             from ui.panel_data import DataPanel
             self.data_panel = DataPanel(self)
@@ -486,6 +522,10 @@ class AppWindow(QMainWindow):
             from ui.panel_smali import SmaliPanel
             self.smali_panel = SmaliPanel()
             self.main_tabs.addTab(self.smali_panel, 'Smali')
+        elif elem == 'diagnostics':
+            from ui.panel_diagnostics import DiagnosticsPanel
+            self.diagnostics_panel = DiagnosticsPanel(self)
+            self.main_tabs.addTab(self.diagnostics_panel, 'Diagnostics')
         else:
             print('no handler for elem: ' + elem)
 
@@ -779,6 +819,12 @@ class AppWindow(QMainWindow):
         self.memory_panel.read_memory(ptr=ptr)
         self.show_main_tab('Memory')
 
+    def _on_memory_diff(self, changes):
+        """ Diff/Compare in RangesPanel, highlight the changed bytes
+        """
+        if self.memory_panel is not None:
+            self.memory_panel.set_diff(changes)
+
     def _on_dumpmodule(self, data):
         """ DumpBinary MenuItem in ModulePanel was selected
         """
@@ -806,9 +852,10 @@ class AppWindow(QMainWindow):
         self.show_main_tab('Memory')
 
     # dwarf handlers
-    def _log_js_output(self, output):
+    def _log_js_output(self, outputs):
         if self.console_panel is not None:
-            self.console_panel.get_js_console().log(output)
+            for output in outputs:
+                self.console_panel.get_js_console().log(output)
 
     def _on_setranges(self, ranges):
         """ Dwarf wants to set Ranges
@@ -928,11 +975,10 @@ class AppWindow(QMainWindow):
             self.show_main_tab('Trace')
             self.trace_panel.start()
 
-            trace_events_parts = data[1].split(',')
-            while trace_events_parts:
-                trace_event = TraceEvent(
-                    trace_events_parts.pop(0), trace_events_parts.pop(0),
-                    trace_events_parts.pop(0), trace_events_parts.pop(0))
+            for event in data:
+                if len(event) < 4:
+                    continue
+                trace_event = TraceEvent(event[0], event[1], event[2], event[3])
                 self.trace_panel.event_queue.append(trace_event)
 
     def _on_set_data(self, data):
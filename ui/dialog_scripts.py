@@ -18,7 +18,6 @@ from PyQt5.QtCore import Qt, pyqtSignal, QRect
 from PyQt5.QtGui import QStandardItemModel, QStandardItem, QPainter, QColor, QPixmap, QIcon
 from PyQt5.QtWidgets import QDialog, QVBoxLayout, QLabel, QHeaderView
 
-from lib.git import Git
 from lib.scripts_manager import ScriptsManager
 from ui.widgets.list_view import DwarfListView
 
@@ -67,6 +66,9 @@ class ScriptsTable(DwarfListView):
         """
         self._scripts_model.appendRow(data)
 
+    def clear_items(self):
+        self._scripts_model.removeRows(0, self._scripts_model.rowCount())
+
 
 class ScriptsDialog(QDialog):
     """ Scripts
@@ -78,6 +80,10 @@ class ScriptsDialog(QDialog):
         self.script = None
         self._app_window = app_window
         self._script_manager = ScriptsManager()
+        self._script_manager.scriptsUpdated.connect(self._init_list)
+
+        # requests comes along with git, kept off the startup path
+        from lib.git import Git
         self._git = Git()
 
         self.setMinimumWidth(800)
@@ -99,12 +105,15 @@ class ScriptsDialog(QDialog):
         self._dot_icon = QIcon(self._new_pixmap)
 
         box.addWidget(self.table)
+        self._status_lbl = QLabel('fetching scripts...')
+        box.addWidget(self._status_lbl)
         lbl = QLabel('OS Support - A: Android I: IOS W: Windows')
         box.addWidget(lbl)
         self.setLayout(box)
-        self._init_list()
 
     def _init_list(self):
+        self._status_lbl.setVisible(False)
+        self.table.clear_items()
         for script_name in sorted(self._script_manager.get_scripts().keys()):
             script = self._script_manager.get_script(script_name)
             info = script['info']
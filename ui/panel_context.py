@@ -360,19 +360,19 @@ class ContextPanel(QTabWidget):
                     x_in += 1
                     continue
 
-                self._app_window.dwarf.onLogToConsole.emit('error: invalid reg_value: ' + reg_val + ' - expected dec/hex')
+                self._app_window.dwarf.log('error: invalid reg_value: ' + reg_val + ' - expected dec/hex')
                 return
 
         if isinstance(reg_val, str) and reg_val.startswith('0x'):
             try:
                 reg_val = int(reg_val, 16)
             except ValueError:
-                self._app_window.dwarf.onLogToConsole.emit('error: invalid reg_value: ' + reg_val + ' - expected dec/hex')
+                self._app_window.dwarf.log('error: invalid reg_value: ' + reg_val + ' - expected dec/hex')
                 return
         try:
             reg_val = int(reg_val)
         except ValueError:
-            self._app_window.dwarf.onLogToConsole.emit('error: invalid reg_value: ' + reg_val + ' - expected dec/hex')
+            self._app_window.dwarf.log('error: invalid reg_value: ' + reg_val + ' - expected dec/hex')
             return
 
         reg_val = hex(reg_val)
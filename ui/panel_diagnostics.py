@@ -0,0 +1,170 @@
+"""
+Dwarf - Copyright (C) 2019 Giovanni Rocca (iGio90)
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>
+"""
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtGui import QStandardItemModel, QStandardItem
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
+                             QCheckBox, QSplitter, QFileDialog, QHeaderView, QLabel)
+
+from lib import prefs
+from ui.widgets.list_view import DwarfListView
+
+API_COLUMNS = [
+    ('name', 'Api'), ('count', 'Calls'), ('errors', 'Errors'), ('avg_ms', 'Avg ms'),
+    ('p50_ms', 'p50 ms'), ('p95_ms', 'p95 ms'), ('p99_ms', 'p99 ms'), ('max_ms', 'Max ms'),
+    ('agent_avg_ms', 'Agent ms'), ('transport_avg_ms', 'Transport ms'),
+    ('bytes_out', 'Bytes out'), ('bytes_in', 'Bytes in')
+]
+
+MESSAGE_COLUMNS = [
+    ('name', 'Message'), ('count', 'Count'), ('rate_s', 'Rate/s'), ('bytes', 'Bytes'),
+    ('handler_avg_ms', 'Handler ms'), ('agent_send_avg_ms', 'Agent send ms')
+]
+
+
+class DiagnosticsPanel(QWidget):
+    """ DiagnosticsPanel
+
+        shows the numbers collected by dwarf.diagnostics
+        host times are refreshed every second, agent times on refresh and dump
+    """
+
+    def __init__(self, parent=None):
+        super(DiagnosticsPanel, self).__init__(parent=parent)
+        self._app_window = parent
+
+        if self._app_window.dwarf is None:
+            print('DiagnosticsPanel created before Dwarf exists')
+            return
+
+        self._diagnostics = self._app_window.dwarf.diagnostics
+
+        main_wrap = QVBoxLayout()
+        main_wrap.setContentsMargins(1, 1, 1, 1)
+
+        h_box = QHBoxLayout()
+        h_box.setContentsMargins(5, 5, 5, 5)
+        self.record_check = QCheckBox('record')
+        self.record_check.setChecked(self._diagnostics.enabled)
+        self.record_check.toggled.connect(self._on_record_toggled)
+        h_box.addWidget(self.record_check)
+        self.cache_label = QLabel()
+        h_box.addWidget(self.cache_label)
+        h_box.addStretch(1)
+
+        refresh_btn = QPushButton('refresh')
+        refresh_btn.clicked.connect(self._on_refresh)
+        reset_btn = QPushButton('reset')
+        reset_btn.clicked.connect(self._on_reset)
+        json_btn = QPushButton('dump json')
+        json_btn.clicked.connect(self._on_dump_json)
+        csv_btn = QPushButton('dump csv')
+        csv_btn.clicked.connect(self._on_dump_csv)
+        h_box.addWidget(refresh_btn)
+        h_box.addWidget(reset_btn)
+        h_box.addWidget(json_btn)
+        h_box.addWidget(csv_btn)
+        main_wrap.addLayout(h_box)
+
+        splitter = QSplitter(Qt.Vertical)
+        self._api_model = self._create_model(API_COLUMNS)
+        self.apis = DwarfListView(self)
+        self.apis.setModel(self._api_model)
+        self.apis.header().setSectionResizeMode(QHeaderView.ResizeToContents)
+        splitter.addWidget(self.apis)
+
+        self._message_model = self._create_model(MESSAGE_COLUMNS)
+        self.messages = DwarfListView(self)
+        self.messages.setModel(self._message_model)
+        self.messages.header().setSectionResizeMode(QHeaderView.ResizeToContents)
+        splitter.addWidget(self.messages)
+        main_wrap.addWidget(splitter)
+
+        self.setLayout(main_wrap)
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(1000)
+        self._timer.timeout.connect(self._update_models)
+        self._timer.start()
+
+        self._update_models()
+
+    # ************************************************************************
+    # **************************** Functions *********************************
+    # ************************************************************************
+    @staticmethod
+    def _create_model(columns):
+        model = QStandardItemModel(0, len(columns))
+        for i, column in enumerate(columns):
+            model.setHeaderData(i, Qt.Horizontal, column[1])
+        return model
+
+    @staticmethod
+    def _fill_model(model, columns, rows):
+        model.removeRows(0, model.rowCount())
+        for row in rows:
+            items = []
+            for key, _ in columns:
+                item = QStandardItem(str(row[key]))
+                if key != 'name':
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                items.append(item)
+            model.appendRow(items)
+
+    def _update_models(self):
+        self._fill_model(self._api_model, API_COLUMNS, self._diagnostics.api_rows())
+        self._fill_model(self._message_model, MESSAGE_COLUMNS, self._diagnostics.message_rows())
+
+        cache = self._app_window.dwarf.memory_cache.stats()
+        self.cache_label.setText('memory cache: {0} hits, {1} misses, {2} pages ({3:,d} KB)'.format(
+            cache['hits'], cache['misses'], cache['pages'], cache['size'] // 1024))
+
+    def _get_dump_path(self, file_filter):
+        r = QFileDialog.getSaveFileName(self._app_window, caption='Save diagnostics', filter=file_filter)
+        if len(r) == 0 or len(r[0]) == 0:
+            return None
+        return r[0]
+
+    # ************************************************************************
+    # **************************** Handlers **********************************
+    # ************************************************************************
+    def _on_record_toggled(self, checked):
+        self._diagnostics.enabled = checked
+        self._app_window.prefs.put(prefs.DIAGNOSTICS_ENABLED, checked)
+
+    def _on_refresh(self):
+        self._app_window.dwarf.update_agent_stats()
+        self._update_models()
+
+    def _on_reset(self):
+        self._app_window.dwarf.reset_diagnostics()
+        self._update_models()
+
+    def _on_dump_json(self):
+        file_path = self._get_dump_path('JSON (*.json)')
+        if file_path is not None:
+            self._app_window.dwarf.update_agent_stats()
+            self._diagnostics.dump_json(file_path)
+
+    def _on_dump_csv(self):
+        file_path = self._get_dump_path('CSV (*.csv)')
+        if file_path is not None:
+            self._app_window.dwarf.update_agent_stats()
+            self._diagnostics.dump_csv(file_path)
+
+    def closeEvent(self, event):
+        self._timer.stop()
+        super(DiagnosticsPanel, self).closeEvent(event)
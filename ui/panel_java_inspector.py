@@ -73,14 +73,14 @@ class JavaInspector(QWidget):
     def update_classes(self):
         """ Refresh Classeslist
         """
-        self._app_window.dwarf.dwarf_api('enumerateJavaClasses')
+        self._app_window.dwarf.dwarf_api_async('enumerateJavaClasses')
 
     def update_methods(self, class_name):
         """ Refresh Methodslist
         """
         if class_name:
-            self._app_window.dwarf.dwarf_api('enumerateJavaMethods',
-                                             class_name)
+            self._app_window.dwarf.dwarf_api_async('enumerateJavaMethods',
+                                                   class_name)
 
     # ************************************************************************
     # **************************** Handlers **********************************
@@ -91,15 +91,16 @@ class JavaInspector(QWidget):
         if _class is None:
             return
 
-        self._app_window.dwarf.dwarf_api('enumerateJavaMethods', _class.text())
+        self._app_window.dwarf.dwarf_api_async('enumerateJavaMethods', _class.text())
 
     def _on_class_enumeration_start(self):
         self._java_classes.clear()
 
-    def _on_class_enumeration_match(self, java_class):
-        _class_name = QStandardItem()
-        _class_name.setText(java_class)
-        self._javaclass_model.appendRow(_class_name)
+    def _on_class_enumeration_match(self, java_classes):
+        for java_class in java_classes:
+            _class_name = QStandardItem()
+            _class_name.setText(java_class)
+            self._javaclass_model.appendRow(_class_name)
 
     def _on_class_enumeration_complete(self):
         self._java_classes.sortByColumn(0, 0)
@@ -302,38 +302,39 @@ class JavaTracePanel(QWidget):
     def on_enumeration_start(self):
         self.class_list.clear()
 
-    def on_enumeration_match(self, java_class):
-        try:
-            if PREFIXED_CLASS.index(java_class) >= 0:
-                try:
-                    if self.trace_classes.index(java_class) >= 0:
-                        return
-                except:
-                    pass
-                q = NotEditableListWidgetItem(java_class)
-                self.trace_list.addItem(q)
-                self.trace_classes.append(java_class)
-        except:
-            pass
-
-        q = NotEditableListWidgetItem(java_class)
-        self.class_list.addItem(q)
+    def on_enumeration_match(self, java_classes):
+        for java_class in java_classes:
+            try:
+                if PREFIXED_CLASS.index(java_class) >= 0:
+                    try:
+                        if self.trace_classes.index(java_class) >= 0:
+                            continue
+                    except:
+                        pass
+                    q = NotEditableListWidgetItem(java_class)
+                    self.trace_list.addItem(q)
+                    self.trace_classes.append(java_class)
+            except:
+                pass
+
+            q = NotEditableListWidgetItem(java_class)
+            self.class_list.addItem(q)
 
     def on_enumeration_complete(self):
         self.class_list.sortItems()
         self.trace_list.sortItems()
 
-    def on_event(self, data):
-        trace, event, clazz, data = data
-        if trace == 'java_trace':
-            self.events_list.add_event(
-                {
-                    'event': event,
-                    'class': clazz,
-                    'data': data.replace(',', ', ')
-                }
-            )
-            self._entries_lbl.setText('Events: %d' % len(self.events_list.data))
+    def on_event(self, events):
+        for trace, event, clazz, data in events:
+            if trace == 'java_trace':
+                self.events_list.add_event(
+                    {
+                        'event': event,
+                        'class': clazz,
+                        'data': data.replace(',', ', ')
+                    }
+                )
+        self._entries_lbl.setText('Events: %d' % len(self.events_list.data))
 
     def pause_trace(self):
         self.app.dwarf.dwarf_api('stopJavaTracer')
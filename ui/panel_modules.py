@@ -50,9 +50,14 @@ class ModulesPanel(QSplitter):
             return
 
         self._app_window.dwarf.onSetModules.connect(self.set_modules)
+        self._app_window.dwarf.onAddModules.connect(self.add_modules)
+        self._app_window.dwarf.onScriptLoaded.connect(self._on_script_loaded)
 
         self._uppercase_hex = True
         self._sized = False
+        self._module_request = None
+        self._elf_request = None
+        self._fetched = False
         self.setContentsMargins(0, 0, 0, 0)
 
         # setup models
@@ -187,7 +192,16 @@ class ModulesPanel(QSplitter):
         if self.modules_list is None:
             return
 
+        self._fetched = True
         self.modules_list.clear()
+        self.add_modules(modules)
+
+    def add_modules(self, modules):
+        """ Appends a page of modules
+        """
+        if self.modules_list is None:
+            return
+
         for module in modules:
             name = QStandardItem()
             name.setTextAlignment(Qt.AlignLeft)
@@ -219,6 +233,7 @@ class ModulesPanel(QSplitter):
     def update_modules(self):
         """ DwarfApiCall updateModules
         """
+        self._fetched = True
         return self._app_window.dwarf.dwarf_api('updateModules')
 
     def set_imports(self, imports):
@@ -316,6 +331,30 @@ class ModulesPanel(QSplitter):
     # ************************************************************************
     # **************************** Handlers **********************************
     # ************************************************************************
+    def showEvent(self, event):
+        """ modules are fetched the first time the panel is shown
+        """
+        super().showEvent(event)
+        if not self._fetched and self._app_window.dwarf.script is not None:
+            self.update_modules()
+
+    def _on_script_loaded(self):
+        """ new agent, fetch again on next show
+        """
+        self._fetched = False
+        if self.isVisible():
+            self.update_modules()
+
+    def closeEvent(self, event):
+        """ cancel pending api requests
+        """
+        for request in [self._module_request, self._elf_request]:
+            if request is not None:
+                request.cancel()
+        self._module_request = None
+        self._elf_request = None
+        super().closeEvent(event)
+
     def _module_clicked(self):
         """ Module Clicked updates imports/exports/symbols
         """
@@ -324,8 +363,22 @@ class ModulesPanel(QSplitter):
         if module is None:
             return
 
-        imports = self._app_window.dwarf.dwarf_api('enumerateImports',
-                                                   module.text())
+        if self._module_request is not None:
+            self._module_request.cancel()
+
+        self._module_request = self._app_window.dwarf.dwarf_api_batch_async([
+            ['enumerateImports', module.text()],
+            ['enumerateExports', module.text()],
+            ['enumerateSymbols', module.text()]], callback=self._on_module_infos)
+
+    def _on_module_infos(self, results):
+        """ imports/exports/symbols of the clicked module are here
+        """
+        self._module_request = None
+        if results is None:
+            return
+        imports, exports, symbols = [result for result, error in results]
+
         if imports:
             imports = json.loads(imports)
             if imports:
@@ -337,8 +390,6 @@ class ModulesPanel(QSplitter):
             else:
                 self.imports_list.setVisible(False)
 
-        exports = self._app_window.dwarf.dwarf_api('enumerateExports',
-                                                   module.text())
         if exports:
             exports = json.loads(exports)
             if exports:
@@ -349,8 +400,6 @@ class ModulesPanel(QSplitter):
             else:
                 self.exports_list.setVisible(False)
 
-        symbols = self._app_window.dwarf.dwarf_api('enumerateSymbols',
-                                                   module.text())
         if symbols:
             symbols = json.loads(symbols)
             if symbols:
@@ -502,8 +551,15 @@ class ModulesPanel(QSplitter):
             self.onAddHook.emit(str_fmt.format([ptr, name]))
 
     def _on_parse_elf(self, elf_path):
+        if self._elf_request is not None:
+            self._elf_request.cancel()
+
+        self._elf_request = self._app_window.dwarf.dwarf_api_async(
+            'parseElf', elf_path, callback=lambda parsed_infos: self._on_elf_parsed(elf_path, parsed_infos))
+
+    def _on_elf_parsed(self, elf_path, parsed_infos):
         from ui.dialogs.elf_info_dlg import ElfInfo
-        parsed_infos = self._app_window.dwarf.dwarf_api('parseElf', elf_path)
+        self._elf_request = None
         if parsed_infos:
             elf_dlg = ElfInfo(self._app_window, elf_path)
             elf_dlg.onShowMemoryRequest.connect(self.onModuleFuncSelected)
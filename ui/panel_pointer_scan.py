@@ -0,0 +1,290 @@
+"""
+Dwarf - Copyright (C) 2019 Giovanni Rocca (iGio90)
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>
+"""
+from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtGui import QStandardItemModel, QStandardItem
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLineEdit,
+                             QFileDialog, QHeaderView, QLabel, QSpinBox)
+
+from lib import utils
+from lib.core import MemoryDumpThread
+from lib.pointer_scan import PointerMap, PointerScan, save_paths, load_paths
+from ui.widgets.list_view import DwarfListView
+
+
+class PointerScanPanel(QWidget):
+    """ PointerScanPanel
+
+        module relative pointer paths to an address. the pointer map is built once (or loaded)
+        and scanned for any target, after a restart the paths found are rescanned to keep the
+        ones still leading to the target
+    """
+
+    # rows shown for a scan
+    MAX_RESULTS = 5000
+
+    onShowMemoryRequest = pyqtSignal(str, name='onShowMemoryRequest')
+
+    def __init__(self, parent=None):
+        super(PointerScanPanel, self).__init__(parent=parent)
+        self._app_window = parent
+
+        if self._app_window.dwarf is None:
+            print('PointerScanPanel created before Dwarf exists')
+            return
+
+        self._pointer_map = None
+        self._paths = []
+        self._thread = None
+
+        main_wrap = QVBoxLayout()
+        main_wrap.setContentsMargins(1, 1, 1, 1)
+
+        h_box = QHBoxLayout()
+        h_box.setContentsMargins(5, 5, 5, 0)
+        self.build_btn = QPushButton('build map')
+        self.build_btn.clicked.connect(self._on_click_build)
+        h_box.addWidget(self.build_btn)
+        self.load_map_btn = QPushButton('load map')
+        self.load_map_btn.clicked.connect(self._on_click_load_map)
+        h_box.addWidget(self.load_map_btn)
+        self.save_map_btn = QPushButton('save map')
+        self.save_map_btn.clicked.connect(self._on_click_save_map)
+        h_box.addWidget(self.save_map_btn)
+        h_box.addStretch()
+        self.load_paths_btn = QPushButton('load paths')
+        self.load_paths_btn.clicked.connect(self._on_click_load_paths)
+        h_box.addWidget(self.load_paths_btn)
+        self.save_paths_btn = QPushButton('save paths')
+        self.save_paths_btn.clicked.connect(self._on_click_save_paths)
+        h_box.addWidget(self.save_paths_btn)
+        main_wrap.addLayout(h_box)
+
+        h_box = QHBoxLayout()
+        h_box.setContentsMargins(5, 5, 5, 5)
+        self.target_input = QLineEdit()
+        self.target_input.setPlaceholderText('target address')
+        h_box.addWidget(self.target_input)
+        h_box.addWidget(QLabel('depth'))
+        self.depth_spin = QSpinBox()
+        self.depth_spin.setRange(1, 10)
+        self.depth_spin.setValue(5)
+        h_box.addWidget(self.depth_spin)
+        h_box.addWidget(QLabel('max offset'))
+        self.offset_input = QLineEdit('0x1000')
+        self.offset_input.setMaximumWidth(100)
+        h_box.addWidget(self.offset_input)
+        self.scan_btn = QPushButton('scan')
+        self.scan_btn.clicked.connect(self._on_click_scan)
+        h_box.addWidget(self.scan_btn)
+        self.rescan_btn = QPushButton('rescan')
+        self.rescan_btn.setToolTip('keep the paths still leading to the target')
+        self.rescan_btn.clicked.connect(self._on_click_rescan)
+        h_box.addWidget(self.rescan_btn)
+        main_wrap.addLayout(h_box)
+
+        self.status_label = QLabel()
+        self.status_label.setContentsMargins(5, 0, 5, 5)
+        main_wrap.addWidget(self.status_label)
+
+        self._model = QStandardItemModel(0, 2)
+        self._model.setHeaderData(0, Qt.Horizontal, 'Base')
+        self._model.setHeaderData(1, Qt.Horizontal, 'Offsets')
+        self.results = DwarfListView(self)
+        self.results.setModel(self._model)
+        self.results.header().setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        self.results.doubleClicked.connect(self._on_dblclicked)
+        main_wrap.addWidget(self.results)
+
+        self.setLayout(main_wrap)
+        self._refresh()
+
+    # ************************************************************************
+    # **************************** Functions *********************************
+    # ************************************************************************
+    def _refresh(self):
+        self._model.removeRows(0, self._model.rowCount())
+        str_frmt = '0x{0:X}' if self.results.uppercase_hex else '0x{0:x}'
+        for path in self._paths[:self.MAX_RESULTS]:
+            base = QStandardItem(('{0}+' + str_frmt).format(path.module, path.offset))
+            base.setData(path, Qt.UserRole + 1)
+            offsets = QStandardItem(' -> '.join(str_frmt.format(offset) for offset in path.offsets))
+            self._model.appendRow([base, offsets])
+
+        if self._pointer_map is None:
+            status = 'no pointer map'
+        else:
+            status = '{0:,d} pointers in map'.format(len(self._pointer_map))
+        if len(self._paths) > self.MAX_RESULTS:
+            status += ' - first {0:,d} of {1:,d} paths'.format(self.MAX_RESULTS, len(self._paths))
+        else:
+            status += ' - {0:,d} paths'.format(len(self._paths))
+        self.status_label.setText(status)
+
+    def _target(self):
+        target = utils.parse_ptr(self.target_input.text().strip())
+        if target == 0:
+            utils.show_message_box('invalid target address')
+        return target
+
+    def _set_busy(self, busy, label=None):
+        for btn in (self.load_map_btn, self.save_map_btn, self.load_paths_btn, self.save_paths_btn, self.rescan_btn):
+            btn.setEnabled(not busy)
+        self.build_btn.setEnabled(not busy or label == 'building pointer map...')
+        self.scan_btn.setEnabled(not busy or label == 'scanning pointer paths...')
+        if busy:
+            self._app_window.show_progress(label)
+        else:
+            self._app_window.hide_progress()
+
+    def _start(self, job, button, label, on_finished):
+        self._thread = MemoryDumpThread(job, parent=self)
+        self._thread.onProgress.connect(lambda value, rate: self._app_window.set_status_text(
+            '{0} {1:d}%'.format(label, value)))
+        self._thread.onFinished.connect(on_finished)
+        button.setText('cancel')
+        self._set_busy(True, label)
+        self._thread.start()
+
+    def _finish(self):
+        job = self._thread.dump
+        self._thread = None
+        self.build_btn.setText('build map')
+        self.scan_btn.setText('scan')
+        self._set_busy(False)
+        return job
+
+    # ************************************************************************
+    # **************************** Handlers **********************************
+    # ************************************************************************
+    def _on_click_build(self):
+        if self._thread is not None:
+            self._thread.dump.cancel()
+            return
+
+        dwarf = self._app_window.dwarf
+        if dwarf.snapshot is None and dwarf.pid == 0:
+            utils.show_message_box('attach to a process or open a snapshot first')
+            return
+        self._start(dwarf.create_pointer_map_builder(), self.build_btn, 'building pointer map...',
+                    self._on_build_finished)
+
+    def _on_build_finished(self, completed):
+        builder = self._finish()
+        if completed:
+            self._pointer_map = builder.pointer_map
+        self._app_window.set_status_text('pointer map {0} in {1:.2f}s'.format(
+            'built' if completed else 'cancelled', builder.elapsed))
+        self._refresh()
+
+    def _on_click_scan(self):
+        if self._thread is not None:
+            self._thread.dump.cancel()
+            return
+
+        if self._pointer_map is None:
+            utils.show_message_box('build or load a pointer map first')
+            return
+        target = self._target()
+        if target == 0:
+            return
+        scan = PointerScan(self._pointer_map, target, max_depth=self.depth_spin.value(),
+                           max_offset=utils.parse_ptr(self.offset_input.text().strip()))
+        self._start(scan, self.scan_btn, 'scanning pointer paths...', self._on_scan_finished)
+
+    def _on_scan_finished(self, completed):
+        scan = self._finish()
+        self._paths = scan.paths
+        self._app_window.set_status_text('pointer scan {0} in {1:.2f}s'.format(
+            'done' if completed else 'cancelled', scan.elapsed))
+        self._refresh()
+
+    def _on_click_rescan(self):
+        if not self._paths:
+            utils.show_message_box('scan or load some paths first')
+            return
+        dwarf = self._app_window.dwarf
+        if dwarf.snapshot is None and dwarf.pid == 0:
+            utils.show_message_box('attach to a process or open a snapshot first')
+            return
+        target = self._target()
+        if target == 0:
+            return
+        self._set_busy(True, 'rescanning pointer paths...')
+        paths = self._paths
+        dwarf.call_async(lambda: dwarf.resolve_pointer_paths(paths),
+                         lambda addresses: self._on_rescan_finished(paths, target, addresses))
+
+    def _on_rescan_finished(self, paths, target, addresses):
+        self._set_busy(False)
+        if addresses is None:
+            return
+        paths = [path for path, address in zip(paths, addresses) if address == target]
+        self._app_window.set_status_text('{0:,d} of {1:,d} paths survived'.format(len(paths), len(self._paths)))
+        self._paths = paths
+        self._refresh()
+
+    def _on_click_load_map(self):
+        file_path, _ = QFileDialog.getOpenFileName(self._app_window, caption='Load pointer map')
+        if not file_path:
+            return
+        try:
+            self._pointer_map = PointerMap.load(file_path)
+        except (OSError, ValueError) as e:
+            utils.show_message_box('unable to load {0}'.format(file_path), str(e))
+            return
+        self._refresh()
+
+    def _on_click_save_map(self):
+        if self._pointer_map is None:
+            utils.show_message_box('build a pointer map first')
+            return
+        file_path, _ = QFileDialog.getSaveFileName(self._app_window, caption='Save pointer map')
+        if file_path:
+            self._pointer_map.save(file_path)
+
+    def _on_click_load_paths(self):
+        file_path, _ = QFileDialog.getOpenFileName(self._app_window, caption='Load pointer paths',
+                                                   filter='*.json')
+        if not file_path:
+            return
+        try:
+            self._paths = load_paths(file_path)
+        except (OSError, ValueError, KeyError) as e:
+            utils.show_message_box('unable to load {0}'.format(file_path), str(e))
+            return
+        self._refresh()
+
+    def _on_click_save_paths(self):
+        if not self._paths:
+            return
+        file_path, _ = QFileDialog.getSaveFileName(self._app_window, caption='Save pointer paths',
+                                                   filter='*.json')
+        if file_path:
+            save_paths(file_path, self._paths)
+
+    def _on_dblclicked(self, model_index):
+        item = self._model.item(model_index.row(), 0)
+        if item is None:
+            return
+        dwarf = self._app_window.dwarf
+        dwarf.call_async(lambda: dwarf.resolve_pointer_paths([item.data(Qt.UserRole + 1)]), self._on_path_resolved)
+
+    def _on_path_resolved(self, addresses):
+        if not addresses or addresses[0] is None:
+            utils.show_message_box('the path is broken in this process')
+            return
+        self.onShowMemoryRequest.emit(hex(addresses[0]))
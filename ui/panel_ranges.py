@@ -14,13 +14,16 @@ Dwarf - Copyright (C) 2019 Giovanni Rocca (iGio90)
     You should have received a copy of the GNU General Public License
     along with this program.  If not, see <https://www.gnu.org/licenses/>
 """
+import functools
+
 from PyQt5.QtCore import Qt, pyqtSignal
-from PyQt5.QtGui import QStandardItemModel, QStandardItem
-from PyQt5.QtWidgets import QHeaderView, QMenu
+from PyQt5.QtGui import QStandardItemModel, QStandardItem, QColor
+from PyQt5.QtWidgets import QHeaderView, QMenu, QFileDialog
 
 from ui.widgets.list_view import DwarfListView
 
 from lib import utils
+from lib.snapshot import Snapshot, SnapshotFormatError
 
 
 class RangesPanel(DwarfListView):
@@ -30,11 +33,13 @@ class RangesPanel(DwarfListView):
             onItemDoubleClicked(str) - only fired when prot has +r
             onDumpBinary([ptr, size#int]) - MenuItem DumpBinary
             onAddWatcher(str) - MenuItem AddWatcher
+            onMemoryDiff([PageChange]) - pages changed since the diff baseline
     """
 
     onItemDoubleClicked = pyqtSignal(str, name='onItemDoubleClicked')
     onDumpBinary = pyqtSignal(list, name='onDumpBinary')
     onAddWatcher = pyqtSignal(str, name='onAddWatcher')
+    onMemoryDiff = pyqtSignal(list, name='onMemoryDiff')
 
     def __init__(self, parent=None):
         super(RangesPanel, self).__init__(parent=parent)
@@ -46,8 +51,13 @@ class RangesPanel(DwarfListView):
 
         # connect to dwarf
         self._app_window.dwarf.onSetRanges.connect(self.set_ranges)
+        self._app_window.dwarf.onAddRanges.connect(self.add_ranges)
+        self._app_window.dwarf.onScriptLoaded.connect(self._on_script_loaded)
 
         self._uppercase_hex = True
+        self._elf_request = None
+        self._fetched = False
+        self._diff_snapshot = None
 
         self._ranges_model = QStandardItemModel(0, 6)
         self._ranges_model.setHeaderData(0, Qt.Horizontal, 'Address')
@@ -110,7 +120,14 @@ class RangesPanel(DwarfListView):
         """ Fills Rangelist with Data
         """
         if isinstance(ranges, list):
+            self._fetched = True
             self._ranges_model.removeRows(0, self._ranges_model.rowCount())
+            self.add_ranges(ranges)
+
+    def add_ranges(self, ranges):
+        """ Appends a page of ranges
+        """
+        if isinstance(ranges, list):
             for range_entry in ranges:
                 # create items to add
                 if self._uppercase_hex:
@@ -160,14 +177,63 @@ class RangesPanel(DwarfListView):
             self.resizeColumnToContents(3)
             self.resizeColumnToContents(4)
 
+    def readable_ranges(self):
+        """ [[base, size]] of the readable ranges in the list
+        """
+        ranges = []
+        for row in range(self._ranges_model.rowCount()):
+            if 'r' in self._ranges_model.item(row, 2).text():
+                ranges.append([int(self._ranges_model.item(row, 0).text(), 16),
+                               int(self._ranges_model.item(row, 1).text().replace(',', ''))])
+        return ranges
+
+    def set_diff(self, changed_pages):
+        """ marks the ranges with changed pages, changed_pages is base -> count
+        """
+        for row in range(self._ranges_model.rowCount()):
+            item = self._ranges_model.item(row, 0)
+            count = changed_pages.get(int(item.text(), 16), 0)
+            if count:
+                item.setForeground(QColor('#ab47bc'))
+                item.setToolTip('{0:d} pages changed'.format(count))
+            else:
+                item.setData(None, Qt.ForegroundRole)
+                item.setToolTip('')
+
     def update_ranges(self):
         """ DwarfApiCall updateRanges
         """
+        self._fetched = True
         self._app_window.dwarf.dwarf_api('updateRanges')
 
     # ************************************************************************
     # **************************** Handlers **********************************
     # ************************************************************************
+    def showEvent(self, event):
+        """ ranges are fetched the first time the panel is shown
+        """
+        super().showEvent(event)
+        if not self._fetched and self._app_window.dwarf.script is not None:
+            self.update_ranges()
+
+    def _on_script_loaded(self):
+        """ new agent, fetch again on next show
+        """
+        self._fetched = False
+        if self.isVisible():
+            self.update_ranges()
+
+    def closeEvent(self, event):
+        """ cancel pending api requests
+        """
+        if self._elf_request is not None:
+            self._elf_request.cancel()
+            self._elf_request = None
+        if self._diff_snapshot is not None:
+            self._diff_snapshot.close()
+            self._diff_snapshot = None
+        super().closeEvent(event)
+
     def _on_contextmenu(self, pos):
         """ ContextMenu
         """
@@ -206,9 +272,62 @@ class RangesPanel(DwarfListView):
                                 file_path))
                         context_menu.addSeparator()
 
+        diff_menu = context_menu.addMenu('Diff')
+        diff_menu.addAction('Take baseline', self._on_diff_baseline)
+        diff_menu.addAction('Baseline from snapshot', self._on_diff_snapshot_baseline)
+        compare = diff_menu.addAction('Compare', self._on_diff_compare)
+        compare.setEnabled(self._app_window.dwarf.memory_diff.has_baseline)
+        context_menu.addSeparator()
+
         context_menu.addAction('Refresh', self.update_ranges)
         context_menu.exec_(glbl_pt)
 
+    def _on_diff_baseline(self):
+        """ MenuItem Diff/Take baseline
+        """
+        dwarf = self._app_window.dwarf
+        self._app_window.show_progress('hashing pages...')
+        dwarf.call_async(functools.partial(dwarf.memory_diff.take_baseline, self.readable_ranges()),
+                         callback=self._on_diff_baseline_taken)
+
+    def _on_diff_snapshot_baseline(self):
+        """ MenuItem Diff/Baseline from snapshot
+        """
+        r = QFileDialog.getOpenFileName(self._app_window, caption='Open snapshot', filter='Snapshot (*.dsnap)')
+        if len(r) == 0 or len(r[0]) == 0:
+            return
+        try:
+            snapshot = Snapshot(r[0])
+        except (OSError, SnapshotFormatError) as e:
+            utils.show_message_box('unable to open snapshot', str(e))
+            return
+        if self._diff_snapshot is not None:
+            self._diff_snapshot.close()
+        self._diff_snapshot = snapshot
+
+        dwarf = self._app_window.dwarf
+        self._app_window.show_progress('hashing pages...')
+        dwarf.call_async(functools.partial(dwarf.memory_diff.take_baseline_from_snapshot, snapshot),
+                         callback=self._on_diff_baseline_taken)
+
+    def _on_diff_baseline_taken(self, baseline):
+        self._app_window.hide_progress()
+        self.set_diff({})
+        self._app_window.dwarf.log('diff baseline of {0:d} pages'.format(sum(len(h) for h in baseline.values())))
+
+    def _on_diff_compare(self):
+        """ MenuItem Diff/Compare
+        """
+        dwarf = self._app_window.dwarf
+        self._app_window.show_progress('comparing pages...')
+        dwarf.call_async(dwarf.memory_diff.compare, callback=self._on_diff_compared)
+
+    def _on_diff_compared(self, changes):
+        self._app_window.hide_progress()
+        self._app_window.dwarf.log('diff: {0:d} pages changed'.format(len(changes)))
+        self.set_diff(self._app_window.dwarf.memory_diff.changed_pages_by_range())
+        self.onMemoryDiff.emit(changes)
+
     def _range_dblclicked(self, model_index):
         """ RangeItem DoubleClicked
         """
@@ -246,8 +365,15 @@ class RangesPanel(DwarfListView):
             self.onAddWatcher.emit(ptr)
 
     def _on_parse_elf(self, elf_path):
+        if self._elf_request is not None:
+            self._elf_request.cancel()
+
+        self._elf_request = self._app_window.dwarf.dwarf_api_async(
+            'parseElf', elf_path, callback=lambda parsed_infos: self._on_elf_parsed(elf_path, parsed_infos))
+
+    def _on_elf_parsed(self, elf_path, parsed_infos):
         from ui.dialogs.elf_info_dlg import ElfInfo
-        parsed_infos = self._app_window.dwarf.dwarf_api('parseElf', elf_path)
+        self._elf_request = None
         if parsed_infos:
             elf_dlg = ElfInfo(self._app_window, elf_path)
             elf_dlg.onShowMemoryRequest.connect(self.onItemDoubleClicked)
@@ -14,54 +14,69 @@ Dwarf - Copyright (C) 2019 Giovanni Rocca (iGio90)
     You should have received a copy of the GNU General Public License
     along with this program.  If not, see <https://www.gnu.org/licenses/>
 """
-import binascii
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QModelIndex
+import functools
+import os
+
+from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal
 from PyQt5.QtGui import QStandardItemModel, QStandardItem
-from PyQt5.QtWidgets import (QWidget, QLineEdit, QVBoxLayout, QHBoxLayout,
-                             QRadioButton, QPushButton, QProgressDialog,
-                             QSizePolicy, QApplication, QHeaderView)
+from PyQt5.QtWidgets import (QWidget, QPlainTextEdit, QVBoxLayout, QHBoxLayout,
+                             QPushButton, QProgressDialog, QComboBox, QLineEdit,
+                             QSizePolicy, QHeaderView, QFileDialog)
 
+from ui.dialog_input import InputDialog
 from ui.widgets.list_view import DwarfListView
+from ui.widgets.search_results_model import SearchResultsModel
 from lib import utils
-from ui.widgets.hex_edit import HighLight, HighlightExistsError
+from lib.dwarf_core import VALUE_SCAN_TYPES, VALUE_SCAN_CONDITIONS
+from lib.host_search import HostSearch
+from lib.range import Range
+from lib.search_pattern import SearchPattern
 
 
-class SearchThread(QThread):
-    onCmdCompleted = pyqtSignal(str, name='onCmdCompleted')
-    onError = pyqtSignal(str, name='onError')
+class HostSearchThread(QThread):
+    """ runs a HostSearch, signals carry the same payloads as the live search ones
+    """
 
-    dwarf = None
-    ranges = []
-    pattern = ''
+    onResult = pyqtSignal(list, name='onResult')
+    onProgress = pyqtSignal(list, name='onProgress')
+    onFinished = pyqtSignal(list, name='onFinished')
 
-    def __init__(self, dwarf=None, parent=None):
+    def __init__(self, search, scan_id, parent=None):
         super().__init__(parent=parent)
-        self.dwarf = dwarf
+        self.search = search
+        self.scan_id = scan_id
+        search.on_result = self._on_result
+        search.progress = self._on_progress
 
     def run(self):
-        if self.dwarf is None:
-            self.onError.emit('Dwarf missing')
-            return
-        if self.pattern is '' or len(self.pattern) <= 0:
-            self.onError.emit('Pattern missing')
-            return
-        if len(self.ranges) <= 0:
-            self.onError.emit('Ranges missing')
-            return
+        completed = self.search.run()
+        self.onFinished.emit([self.scan_id, self.search.count, not completed])
 
-        #_list = []
-        for r in self.ranges:
-            self.dwarf.search(r[0], int(r[1].replace(',', '')), self.pattern)
-            #_list.append({'start': r[0], 'size': int(r[1].replace(',', ''))})
+    def _on_result(self, range_index, pattern, addresses):
+        size = len(self.search.patterns[pattern].split(':')[0].split())
+        self.onResult.emit([self.scan_id, range_index,
+                            [{'address': hex(address), 'size': size, 'pattern': pattern} for address in addresses]])
 
-        #self.dwarf.search_list(_list, self.pattern)
-        self.onCmdCompleted.emit('finished')
+    def _on_progress(self, range_index, scanned, size):
+        self.onProgress.emit([self.scan_id, range_index, scanned, size])
 
 
 class SearchPanel(QWidget):
     """ SearchPanel
     """
 
+    # where the pattern search reads memory from, all but target are searched on this side
+    SOURCE_TARGET = 'target'
+    SOURCE_SNAPSHOT = 'snapshot'
+    SOURCE_EMULATOR = 'emulator'
+    SOURCE_DUMPS = 'dump files'
+
+    # value scan candidates shown, the rest stays in the agent
+    VALUE_RESULTS_PAGE = 100
+
+    # bytes shown in the preview column of the results
+    PREVIEW_LENGTH = 16
+
     onShowMemoryRequest = pyqtSignal(str, name='onShowMemoryRequest')
 
     def __init__(self, parent=None, show_progress_dlg=False):
@@ -74,17 +89,38 @@ class SearchPanel(QWidget):
 
         self._app_window.dwarf.onMemoryScanResult.connect(
             self._on_search_result)
+        self._app_window.dwarf.onMemoryScanProgress.connect(self._on_search_progress)
+        self._app_window.dwarf.onMemoryScanComplete.connect(self._on_search_complete)
+        self._app_window.dwarf.onValueScanProgress.connect(self._on_value_scan_progress)
+        self._app_window.dwarf.onValueScanComplete.connect(self._on_value_scan_complete)
 
+        self._skip_range_pages = False
         self._app_window.dwarf.onSetRanges.connect(self._on_setranges)
+        self._app_window.dwarf.onAddRanges.connect(self._on_addranges)
 
         self._ranges_model = None
-        self._result_model = None
 
         self._blocking_search = show_progress_dlg
         self.progress = None
         self._pattern_length = 0
-
-        self._search_results = []
+        self._patterns = []
+
+        # SearchResultsModel of the running / last scan, per ranges model row
+        self._search_results = {}
+        # read(address, length) of the scanned source for the previews, symbols come from the target only
+        self._preview_read = None
+        self._resolve_symbols = False
+        self._scan_id = 0
+        self._scan_rows = []
+        self._scan_sizes = []
+        self._scan_progress = {}
+        self._scanning = False
+        self._host_search = None
+        # dump files added to the ranges, by row
+        self._dumps = {}
+
+        self._value_scan_id = 0
+        self._value_scanning = False
 
         self.setContentsMargins(0, 0, 0, 0)
 
@@ -95,10 +131,13 @@ class SearchPanel(QWidget):
         wrapping_wdgt.setContentsMargins(10, 10, 10, 10)
         v_box = QVBoxLayout(wrapping_wdgt)
         v_box.setContentsMargins(0, 0, 0, 0)
-        self.input = QLineEdit()
+        self.input = QPlainTextEdit()
         self.input.setPlaceholderText(
-            'search for a sequence of bytes in hex format: deadbeef123456aabbccddeeff...'
+            'one pattern per line, searched in a single pass\n'
+            'hex with wildcards: deadbeef123456aabbccddeeff... / de ad ?? e?\n'
+            'strings: some string / utf16:some string'
         )
+        self.input.setMaximumHeight(self.input.fontMetrics().height() * 5)
         v_box.addWidget(self.input)
 
         self.check_all_btn = QPushButton('check all')
@@ -107,24 +146,78 @@ class SearchPanel(QWidget):
         self.uncheck_all_btn.clicked.connect(self._on_click_uncheck_all)
         self.search_btn = QPushButton('search')
         self.search_btn.clicked.connect(self._on_click_search)
+        self.source = QComboBox()
+        self.source.addItems([self.SOURCE_TARGET, self.SOURCE_SNAPSHOT, self.SOURCE_EMULATOR, self.SOURCE_DUMPS])
+        self.add_dump_btn = QPushButton('add dump file')
+        self.add_dump_btn.clicked.connect(self._on_click_add_dump)
 
         h_box = QHBoxLayout()
         h_box.addWidget(self.check_all_btn)
         h_box.addWidget(self.uncheck_all_btn)
+        h_box.addWidget(self.source)
+        h_box.addWidget(self.add_dump_btn)
         h_box.addWidget(self.search_btn)
         v_box.addLayout(h_box)
 
+        # value scan, narrowed with next scan
+        self.value_type = QComboBox()
+        self.value_type.addItems(VALUE_SCAN_TYPES)
+        self.value_type.setCurrentText('int32')
+        self.value_condition = QComboBox()
+        self.value_condition.addItems(VALUE_SCAN_CONDITIONS)
+        self.value_condition.setCurrentText('equals')
+        self.value_input = QLineEdit()
+        self.value_input.setPlaceholderText('value')
+        self.first_scan_btn = QPushButton('first scan')
+        self.first_scan_btn.clicked.connect(self._on_click_first_scan)
+        self.next_scan_btn = QPushButton('next scan')
+        self.next_scan_btn.clicked.connect(self._on_click_next_scan)
+        self.next_scan_btn.setEnabled(False)
+        self.new_scan_btn = QPushButton('new scan')
+        self.new_scan_btn.clicked.connect(self._on_click_new_scan)
+        self.new_scan_btn.setEnabled(False)
+
+        h_box = QHBoxLayout()
+        h_box.addWidget(self.value_type)
+        h_box.addWidget(self.value_condition)
+        h_box.addWidget(self.value_input)
+        h_box.addWidget(self.first_scan_btn)
+        h_box.addWidget(self.next_scan_btn)
+        h_box.addWidget(self.new_scan_btn)
+        v_box.addLayout(h_box)
+
         main_wrap.addWidget(wrapping_wdgt)
 
         self.ranges = DwarfListView(self)
         self.ranges.clicked.connect(self._on_show_results)
-        self.results = DwarfListView(self)
-        self.results.setVisible(False)
+        self.results_wrap = QWidget()
+        self.results_wrap.setVisible(False)
+        v_box = QVBoxLayout(self.results_wrap)
+        v_box.setContentsMargins(0, 0, 0, 0)
+        self.results_filter = QLineEdit()
+        self.results_filter.setPlaceholderText('filter address / pattern')
+        self.results_filter.textChanged.connect(self._on_results_filter_changed)
+        v_box.addWidget(self.results_filter)
+        # the ctrl+f search of the list view walks QStandardItems, the results are filtered by the model
+        self.results = DwarfListView(self, search_enabled=False)
+        self.results.setUniformRowHeights(True)
+        self.results.header().setSortIndicatorShown(True)
+        self.results.header().setSectionsClickable(True)
+        self.results.header().sectionClicked.connect(self._on_results_header_clicked)
+        v_box.addWidget(self.results)
+
+        self._results_filter_timer = QTimer(self)
+        self._results_filter_timer.setSingleShot(True)
+        self._results_filter_timer.setInterval(200)
+        self._results_filter_timer.timeout.connect(self._apply_results_filter)
+        self.value_results = DwarfListView(self)
+        self.value_results.setVisible(False)
 
         h_box = QHBoxLayout()
         h_box.setContentsMargins(0, 0, 0, 0)
         h_box.addWidget(self.ranges)
-        h_box.addWidget(self.results)
+        h_box.addWidget(self.results_wrap)
+        h_box.addWidget(self.value_results)
         main_wrap.addLayout(h_box)
 
         main_wrap.setSpacing(0)
@@ -132,6 +225,8 @@ class SearchPanel(QWidget):
         self.setLayout(main_wrap)
 
         self._setup_models()
+        if self._app_window.dwarf.snapshot is not None:
+            self._on_setranges(self._app_window.dwarf.snapshot.get_ranges())
         self._app_window.dwarf.dwarf_api('updateRanges')
 
     # ************************************************************************
@@ -179,21 +274,47 @@ class SearchPanel(QWidget):
 
         self.ranges.doubleClicked.connect(self._on_range_dblclick)
 
-        # setup results model
-        self._result_model = QStandardItemModel(0, 1)
-        self._result_model.setHeaderData(0, Qt.Horizontal, 'Address')
-        self.results.setModel(self._result_model)
+        # results models are made per range by the search
         self.results.doubleClicked.connect(self._on_dblclicked)
 
+        self._value_model = QStandardItemModel(0, 2)
+        self._value_model.setHeaderData(0, Qt.Horizontal, 'Address')
+        self._value_model.setHeaderData(1, Qt.Horizontal, 'Value')
+        self.value_results.setModel(self._value_model)
+        self.value_results.doubleClicked.connect(self._on_value_dblclicked)
+
+    def _checked_ranges(self):
+        """ [{'start', 'size'}] of the checked ranges and their rows
+        """
+        ranges = []
+        rows = []
+        for i in range(self._ranges_model.rowCount()):
+            item = self._ranges_model.item(i, 0)
+            if item.checkState() == Qt.Checked:
+                addr = self._ranges_model.item(i, 1)
+                size = int(self._ranges_model.item(i, 2).text().replace(',', ''))
+                ranges.append({'start': addr.text(), 'size': size})
+                rows.append(i)
+        return ranges, rows
+
     def _on_setranges(self, ranges):
         """ Fills Rangelist with Data
         """
-        if self._ranges_model.rowCount():
+        # ranges are filled once, the pages of a later refresh are skipped as well
+        self._skip_range_pages = self._ranges_model.rowCount() > 0
+        if self._skip_range_pages:
             return
 
         self.ranges.header().setSectionResizeMode(0, QHeaderView.Fixed)
+        self._on_addranges(ranges)
+
+    def _on_addranges(self, ranges):
+        """ Appends a page of ranges
+        """
+        if self._skip_range_pages:
+            return
+
         if isinstance(ranges, list):
-            self._ranges_model.removeRows(0, self._ranges_model.rowCount())
             for range_entry in ranges:
                 if 'protection' in range_entry and isinstance(
                         range_entry['protection'], str):
@@ -274,37 +395,42 @@ class SearchPanel(QWidget):
             self._ranges_model.item(i, 0).setCheckState(Qt.Unchecked)
 
     def _on_dblclicked(self, model_index):
-        item = self._result_model.itemFromIndex(model_index)
-        if item:
-            self.onShowMemoryRequest.emit(
-                self._result_model.item(model_index.row(), 0).text())
+        model = self.results.model()
+        if isinstance(model, SearchResultsModel) and model_index.isValid():
+            self.onShowMemoryRequest.emit(hex(model.address(model_index.row())))
 
     def _on_click_search(self):
-        pattern = self.input.text()
-        if pattern == '':
-            return 1
+        if self._scanning:
+            self._cancel_search()
+            return 0
 
-        # check if we already provide a hex string as input
         try:
-            test = pattern.replace(' ', '')
-            int(test, 16)
-            pattern = test
-        except ValueError:
-            # search for string
-            pattern = binascii.hexlify(pattern.encode('utf8')).decode('utf8')
+            patterns = SearchPattern.parse_list(self.input.toPlainText())
+        except ValueError as e:
+            utils.show_message_box(str(e))
+            return 1
+        if not patterns:
+            return 1
 
-        ranges = []
-        self._search_results = []
-        for i in range(self._ranges_model.rowCount()):
-            item = self._ranges_model.item(i, 0)
-            if item.checkState() == Qt.Checked:
-                addr = self._ranges_model.item(i, 1)
-                size = self._ranges_model.item(i, 2)
-                ranges.append([addr.text(), size.text()])
+        # dump files are only searched as such
+        source = self.source.currentText()
+        ranges, rows = self._checked_ranges()
+        checked = [(range_, row) for range_, row in zip(ranges, rows)
+                   if (row in self._dumps) == (source == self.SOURCE_DUMPS)]
+        ranges = [range_ for range_, row in checked]
+        self._scan_rows = [row for range_, row in checked]
+        self._scan_sizes = [range_['size'] for range_ in ranges]
+        self._scan_progress = {}
 
         if len(ranges) == 0:
             return 1
 
+        host_sources = None
+        if source != self.SOURCE_TARGET:
+            host_sources = self._host_sources(source, ranges)
+            if host_sources is None:
+                return 1
+
         if self._blocking_search:
             self.progress = QProgressDialog()
             self.progress.setFixedSize(300, 50)
@@ -317,102 +443,371 @@ class SearchPanel(QWidget):
             self.progress.setWindowFlag(Qt.WindowContextHelpButtonHint, False)
             self.progress.setWindowFlag(Qt.WindowCloseButtonHint, False)
             self.progress.setModal(True)
-            self.progress.setCancelButton(None)
-            self.progress.setRange(0, 0)
+            self.progress.setRange(0, 100)
             self.progress.setMinimumDuration(0)
+            self.progress.canceled.connect(self._cancel_search)
             self.progress.forceShow()
 
         self._app_window.show_progress('searching...')
         self.input.setEnabled(False)
-        self.search_btn.setEnabled(False)
+        self.search_btn.setText('cancel')
         self.check_all_btn.setEnabled(False)
         self.uncheck_all_btn.setEnabled(False)
 
-        self._pattern_length = len(pattern) * .5
-
-        search_thread = SearchThread(self._app_window.dwarf, self)
-        search_thread.onCmdCompleted.connect(self._on_search_complete)
-        search_thread.onError.connect(self._on_search_error)
-        search_thread.pattern = pattern
-        search_thread.ranges = ranges
-        search_thread.start()
+        # results are counted in the protection column while scanning
+        if self._ranges_model.columnCount() > 4:
+            self._ranges_model.removeColumns(4, 3)
+            self._ranges_model.setHeaderData(3, Qt.Horizontal, 'Search Results')
+            self._ranges_model.setHeaderData(3, Qt.Horizontal, None,
+                                             Qt.TextAlignmentRole)
+        for i in range(self._ranges_model.rowCount()):
+            self._ranges_model.item(i, 3).setText('')
+            self._ranges_model.item(i, 3).setTextAlignment(Qt.AlignLeft)
+
+        self._patterns = patterns
+        self._pattern_length = max(len(pattern) for pattern in patterns)
+        self.results.setModel(None)
+        for model in self._search_results.values():
+            model.deleteLater()
+        self._search_results = {}
+        self.results_wrap.setVisible(False)
+        self._preview_read, self._resolve_symbols = self._details_source(source)
+        self._scanning = True
+        if host_sources is not None:
+            # host searches have negative ids, not to be confused with the agent ones
+            self._scan_id = min(self._scan_id, 0) - 1
+            self._host_search = HostSearchThread(
+                HostSearch(host_sources, [pattern.pattern for pattern in patterns],
+                           log=self._app_window.dwarf.log), self._scan_id, self)
+            self._host_search.onResult.connect(self._on_search_result)
+            self._host_search.onProgress.connect(self._on_search_progress)
+            self._host_search.onFinished.connect(self._on_search_complete)
+            self._host_search.start()
+            return 0
+
+        self._scan_id = self._app_window.dwarf.search_list(ranges, patterns) or 0
+        if self._scan_id == 0:
+            self._on_search_complete([0, 0, True])
+
+    def _cancel_search(self):
+        if self._host_search is not None:
+            self._host_search.search.cancel()
+        else:
+            self._app_window.dwarf.cancel_search()
+
+    def _host_sources(self, source, ranges):
+        """ HostSearch sources for the ranges, None when the source is not available
+        """
+        dwarf = self._app_window.dwarf
+        sources = []
+        if source == self.SOURCE_SNAPSHOT:
+            if dwarf.snapshot is None:
+                utils.show_message_box('no snapshot opened')
+                return None
+            for i, range_ in enumerate(ranges):
+                start = utils.parse_ptr(range_['start'])
+                entry = dwarf.snapshot.find_range(start)
+                if entry is None:
+                    continue
+                position = start - int(entry['base'], 16)
+                sources.append({'range': i, 'base': start, 'size': min(range_['size'], entry['size'] - position),
+                                'file': dwarf.snapshot.file_path, 'offset': entry['offset'] + position})
+        elif source == self.SOURCE_EMULATOR:
+            uc = dwarf.emulator.uc
+            if uc is None:
+                utils.show_message_box('emulator not running')
+                return None
+            regions = list(uc.mem_regions())
+            for i, range_ in enumerate(ranges):
+                start = utils.parse_ptr(range_['start'])
+                tail = start + range_['size']
+                for begin, end, perm in regions:
+                    # unicorn regions end is inclusive
+                    low = max(start, begin)
+                    high = min(tail, end + 1)
+                    if low < high:
+                        sources.append({'range': i, 'base': low, 'size': high - low,
+                                        'read': functools.partial(Range._read_emulator, uc, 0)})
+        else:
+            for i, range_ in enumerate(ranges):
+                sources.append({'range': i, 'base': utils.parse_ptr(range_['start']), 'size': range_['size'],
+                                'file': self._dumps[self._scan_rows[i]], 'offset': 0})
+        return sources
 
     def _on_search_result(self, data):
-        self._search_results.append(data)
+        scan_id, range_index, results = data
+        if not self._scanning or scan_id != self._scan_id:
+            return
+
+        row = self._scan_rows[range_index]
+        model = self._search_results.get(row)
+        if model is None:
+            model = SearchResultsModel([pattern.text for pattern in self._patterns],
+                                       uppercase_hex=self.results.uppercase_hex, parent=self)
+            model.onLookupRequest.connect(functools.partial(self._on_results_lookup, model))
+            self._search_results[row] = model
+
+        # results of a batch come from a single pattern
+        by_pattern = {}
+        for result in results:
+            by_pattern.setdefault(result['pattern'], []).append(int(result['address'], 16))
+        for pattern, addresses in by_pattern.items():
+            model.append(addresses, pattern)
+        self._ranges_model.item(row, 3).setText('Matches: {0:,d}'.format(len(model)))
+
+    def _on_search_progress(self, data):
+        scan_id, range_index, scanned, size = data
+        if not self._scanning or scan_id != self._scan_id:
+            return
+
+        # host searches complete the ranges out of order
+        self._scan_progress[range_index] = scanned
+        total = sum(self._scan_sizes)
+        done = sum(self._scan_progress.values())
+        percent = int(done * 100 / total) if total else 100
+        self._app_window.set_status_text('searching... {0}% ({1}/{2} ranges)'.format(
+            percent, range_index + 1, len(self._scan_rows)))
+        if self._blocking_search and self.progress is not None:
+            self.progress.setValue(percent)
+
+    def _on_search_complete(self, data):
+        scan_id, count, cancelled = data
+        if not self._scanning or scan_id != self._scan_id:
+            return
 
-    def _on_search_complete(self):
+        self._scanning = False
+        self._host_search = None
         self.input.setEnabled(True)
-        self.search_btn.setEnabled(True)
+        self.search_btn.setText('search')
         self.check_all_btn.setEnabled(True)
         self.uncheck_all_btn.setEnabled(True)
         self._app_window.hide_progress()
-        if self._blocking_search:
+        if self._blocking_search and self.progress is not None:
+            self.progress.canceled.disconnect()
             self.progress.cancel()
+            self.progress = None
 
-        self._ranges_model.removeColumns(4, 3)
-        self._ranges_model.setHeaderData(3, Qt.Horizontal, 'Search Results')
-        self._ranges_model.setHeaderData(3, Qt.Horizontal, None,
-                                         Qt.TextAlignmentRole)
+        for row in self._scan_rows:
+            self._ranges_model.item(row, 0).setCheckState(Qt.Unchecked)
 
-        results_count = 0
-        is_selected = False
-        for i in range(self._ranges_model.rowCount()):
-            item = self._ranges_model.item(i, 0)
-            if item.checkState() == Qt.Checked:
-                item.setCheckState(Qt.Unchecked)
-                if not is_selected:
-                    is_selected = True
-                    self.ranges.setCurrentIndex(self._ranges_model.index(i, 0))
-            else:
-                self._search_results.insert(i, None)
-                self._ranges_model.item(i, 3).setText('')
-                self._ranges_model.item(i, 3).setTextAlignment(Qt.AlignLeft)
-                continue
-
-            if len(self._search_results[i]):
-                results_count += len(self._search_results[i])
-                self._ranges_model.item(i, 3).setText('Matches: {0}'.format(
-                    len(self._search_results[i])))
-                self._ranges_model.item(i, 3).setTextAlignment(Qt.AlignLeft)
-            else:
-                self._ranges_model.item(i, 3).setText('')
-                self._ranges_model.item(i, 3).setTextAlignment(Qt.AlignLeft)
+        self._app_window.set_status_text(
+            'Search {0}: {1} matches'.format('cancelled' if cancelled else 'complete', count))
+
+        # show the results of the first range with matches
+        for row in self._scan_rows:
+            if self._search_results.get(row):
+                self.ranges.setCurrentIndex(self._ranges_model.index(row, 0))
+                self._on_show_results()
+                break
+
+    def _on_click_add_dump(self):
+        file_path, _ = QFileDialog.getOpenFileName(self._app_window, caption='Add dump file')
+        if not file_path:
+            return 1
+        accept, base = InputDialog.input(self._app_window, hint='base address of the dump', placeholder='0x...')
+        if not accept:
+            return 1
+        try:
+            base = utils.parse_ptr(base.strip())
+        except ValueError:
+            utils.show_message_box('invalid base address')
+            return 1
+
+        str_frmt = '0x{0:X}' if self.ranges._uppercase_hex else '0x{0:x}'
+        addr = QStandardItem(str_frmt.format(base))
+        addr.setTextAlignment(Qt.AlignCenter)
+        size = QStandardItem('{0:,d}'.format(os.path.getsize(file_path)))
+        size.setTextAlignment(Qt.AlignRight)
+        protection = QStandardItem('dump: ' + os.path.basename(file_path))
+        checkbox = QStandardItem()
+        checkbox.setCheckable(True)
+        checkbox.setCheckState(Qt.Checked)
+
+        row = [checkbox, addr, size, protection]
+        row += [QStandardItem() for _ in range(self._ranges_model.columnCount() - len(row))]
+        self._dumps[self._ranges_model.rowCount()] = file_path
+        self._ranges_model.appendRow(row)
+        self.source.setCurrentText(self.SOURCE_DUMPS)
+        return 0
+
+    def _on_click_first_scan(self):
+        if self._value_scanning:
+            self._app_window.dwarf.cancel_value_scan()
+            return 0
+
+        condition = self.value_condition.currentText()
+        if condition not in ('unknown', 'equals'):
+            utils.show_message_box('the first scan is either unknown or equals')
+            return 1
+
+        ranges, rows = self._checked_ranges()
+        ranges = [range_ for range_, row in zip(ranges, rows) if row not in self._dumps]
+        if not ranges:
+            return 1
+
+        self._start_value_scan(lambda dwarf, value: dwarf.value_scan(
+            ranges, self.value_type.currentText(), condition, value))
+
+    def _on_click_next_scan(self):
+        if self._value_scanning:
+            self._app_window.dwarf.cancel_value_scan()
+            return 0
+
+        condition = self.value_condition.currentText()
+        if condition == 'unknown':
+            utils.show_message_box('unknown is valid for the first scan only')
+            return 1
+
+        self._start_value_scan(lambda dwarf, value: dwarf.value_scan_next(condition, value))
+
+    def _on_click_new_scan(self):
+        self._app_window.dwarf.clear_value_scan()
+        self._value_model.removeRows(0, self._value_model.rowCount())
+        self.value_results.setVisible(False)
+        self.value_type.setEnabled(True)
+        self.next_scan_btn.setEnabled(False)
+        self.new_scan_btn.setEnabled(False)
+
+    def _start_value_scan(self, start):
+        value = None
+        if self.value_condition.currentText() == 'equals':
+            value = self.value_input.text().strip()
+            if not value:
+                return 1
+
+        self._value_scanning = True
+        self._value_scan_id = 0
+        self.value_type.setEnabled(False)
+        self.first_scan_btn.setEnabled(False)
+        self.next_scan_btn.setEnabled(False)
+        self.new_scan_btn.setEnabled(False)
+        self._app_window.show_progress('scanning values...')
+
+        self._value_scan_id = start(self._app_window.dwarf, value) or 0
+        if self._value_scan_id == 0:
+            self._on_value_scan_complete([0, self._value_model.rowCount(), True])
+            return 1
+
+        # the running pass is cancelled with the button which started it
+        sender = self.sender()
+        if sender is not None:
+            sender.setText('cancel')
+            sender.setEnabled(True)
+        return 0
+
+    def _on_value_scan_progress(self, data):
+        scan_id, done, total = data
+        if not self._value_scanning or scan_id != self._value_scan_id:
+            return
+
+        self._app_window.set_status_text('scanning values... {0}%'.format(int(done * 100 / total) if total else 100))
+
+    def _on_value_scan_complete(self, data):
+        scan_id, count, cancelled = data
+        if not self._value_scanning or scan_id != self._value_scan_id:
+            return
+
+        self._value_scanning = False
+        self._app_window.hide_progress()
+        self.first_scan_btn.setText('first scan')
+        self.first_scan_btn.setEnabled(True)
+        self.next_scan_btn.setText('next scan')
+        self.next_scan_btn.setEnabled(count > 0)
+        self.new_scan_btn.setEnabled(True)
 
         self._app_window.set_status_text(
-            'Search complete: {0} matches'.format(results_count))
-        if results_count:
-            for i in self._search_results:
-                if i and len(i):
-                    self.results.setVisible(True)
-                    for result in i:
-                        self._result_model.appendRow(
-                            QStandardItem(result['address']))
+            'Value scan {0}: {1} candidates'.format('cancelled' if cancelled else 'complete', count))
+
+        # only the first page is pulled from the agent
+        dwarf = self._app_window.dwarf
+        dwarf.call_async(lambda: dwarf.value_scan_results(0, self.VALUE_RESULTS_PAGE), self._on_value_results)
+
+    def _on_value_results(self, results):
+        self._value_model.removeRows(0, self._value_model.rowCount())
+        for address, value in results:
+            addr = QStandardItem(address)
+            value = QStandardItem(value)
+            value.setTextAlignment(Qt.AlignRight)
+            self._value_model.appendRow([addr, value])
+        self.value_results.setVisible(len(results) > 0)
+
+    def _on_value_dblclicked(self, model_index):
+        item = self._value_model.item(model_index.row(), 0)
+        if item:
+            self.onShowMemoryRequest.emit(item.text())
 
-                    break
+    def _details_source(self, source):
+        """ (read(address, length) or None, resolve symbols) for the results of a search on source
+        """
+        dwarf = self._app_window.dwarf
+        if source == self.SOURCE_TARGET:
+            return dwarf.read_target_memory, True
+        if source == self.SOURCE_SNAPSHOT and dwarf.snapshot is not None:
+            return dwarf.snapshot.read, False
+        if source == self.SOURCE_EMULATOR and dwarf.emulator.uc is not None:
+            return functools.partial(Range._read_emulator, dwarf.emulator.uc, 0), False
+        return None, False
+
+    def _on_results_lookup(self, model, addresses):
+        dwarf = self._app_window.dwarf
+        read = self._preview_read
+        resolve_symbols = self._resolve_symbols
+
+        def lookup():
+            details = {}
+            symbols = dwarf.symbol_resolver.resolve(addresses) if resolve_symbols else {}
+            for address in addresses:
+                symbol = ''
+                sym = symbols.get(address)
+                if sym is not None:
+                    symbol = '{0}!{1}'.format(sym.get('moduleName') or '-', sym['name'])
+                preview = ''
+                if read is not None:
+                    data = read(address, self.PREVIEW_LENGTH)
+                    if data:
+                        preview = ' '.join('{0:02x}'.format(b) for b in data)
+                details[address] = (symbol, preview)
+            return details
+
+        dwarf.call_async(lookup, model.set_details)
+
+    def _on_results_header_clicked(self, section):
+        model = self.results.model()
+        if isinstance(model, SearchResultsModel):
+            model.sort(section, self.results.header().sortIndicatorOrder())
+
+    def _on_results_filter_changed(self):
+        self._results_filter_timer.start()
+
+    def _apply_results_filter(self):
+        model = self.results.model()
+        if isinstance(model, SearchResultsModel):
+            model.set_filter(self.results_filter.text())
 
     def _on_search_error(self, msg):
         utils.show_message_box(msg)
 
     def _on_show_results(self):
         if self._search_results:
-            self.results.clear()
             if self._app_window.memory_panel:
                 self._app_window.memory_panel.remove_highlights('search')
             selected_index = self.ranges.selectionModel().currentIndex().row()
-            if selected_index is not None:
-                item_txt = self._ranges_model.item(selected_index, 3).text()
-                if item_txt == '':
-                    return
-
-                for result in self._search_results[selected_index]:
-                    self._result_model.appendRow(
-                        QStandardItem(result['address']))
-
-                    # TODO: fix hexview highlights performance
-                    """
-                    if self._app_window.memory_panel:
-                        try:
-                            self._app_window.memory_panel.add_highlight(
-                                HighLight('search', utils.parse_ptr(result['address']), self._pattern_length))
-                        except HighlightExistsError:
-                            pass"""
+            results = self._search_results.get(selected_index)
+            if not results:
+                return
+
+            self.results_wrap.setVisible(True)
+            if self.results.model() is not results:
+                self.results.setModel(results)
+                results.set_filter(self.results_filter.text())
+                self.results.header().setSectionResizeMode(0, QHeaderView.ResizeToContents)
+                self.results.header().setSectionResizeMode(1, QHeaderView.ResizeToContents)
+
+                # TODO: fix hexview highlights performance
+                """
+                if self._app_window.memory_panel:
+                    try:
+                        self._app_window.memory_panel.add_highlight(
+                            HighLight('search', utils.parse_ptr(result['address']), self._pattern_length))
+                    except HighlightExistsError:
+                        pass"""
@@ -0,0 +1,188 @@
+"""
+Dwarf - Copyright (C) 2019 Giovanni Rocca (iGio90)
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>
+"""
+import re
+
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+from PyQt5.QtGui import QStandardItemModel, QStandardItem
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLineEdit,
+                             QCheckBox, QFileDialog, QHeaderView, QLabel)
+
+from lib import utils
+from lib.core import MemoryDumpThread
+from ui.dialog_input import InputDialog
+from ui.widgets.list_view import DwarfListView
+
+
+class StringsPanel(QWidget):
+    """ StringsPanel
+
+        strings of the target (or snapshot, or dump files) indexed once and searched on this side
+    """
+
+    # rows shown for a query
+    MAX_RESULTS = 1000
+
+    onShowMemoryRequest = pyqtSignal(str, name='onShowMemoryRequest')
+
+    def __init__(self, parent=None):
+        super(StringsPanel, self).__init__(parent=parent)
+        self._app_window = parent
+
+        if self._app_window.dwarf is None:
+            print('StringsPanel created before Dwarf exists')
+            return
+
+        self._index = self._app_window.dwarf.string_index
+        self._index_thread = None
+
+        main_wrap = QVBoxLayout()
+        main_wrap.setContentsMargins(1, 1, 1, 1)
+
+        h_box = QHBoxLayout()
+        h_box.setContentsMargins(5, 5, 5, 5)
+        self.input = QLineEdit()
+        self.input.setPlaceholderText('search strings')
+        self.input.textChanged.connect(self._on_query_changed)
+        h_box.addWidget(self.input)
+        self.regex_check = QCheckBox('regex')
+        self.regex_check.toggled.connect(self._on_query_changed)
+        h_box.addWidget(self.regex_check)
+        self.case_check = QCheckBox('case sensitive')
+        self.case_check.toggled.connect(self._on_query_changed)
+        h_box.addWidget(self.case_check)
+        self.index_btn = QPushButton('index ranges')
+        self.index_btn.clicked.connect(self._on_click_index)
+        h_box.addWidget(self.index_btn)
+        self.index_dump_btn = QPushButton('index dump file')
+        self.index_dump_btn.clicked.connect(self._on_click_index_dump)
+        h_box.addWidget(self.index_dump_btn)
+        main_wrap.addLayout(h_box)
+
+        self.status_label = QLabel()
+        self.status_label.setContentsMargins(5, 0, 5, 5)
+        main_wrap.addWidget(self.status_label)
+
+        self._model = QStandardItemModel(0, 3)
+        self._model.setHeaderData(0, Qt.Horizontal, 'Address')
+        self._model.setHeaderData(1, Qt.Horizontal, 'Kind')
+        self._model.setHeaderData(2, Qt.Horizontal, 'String')
+        self.results = DwarfListView(self)
+        self.results.setModel(self._model)
+        self.results.header().setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        self.results.header().setSectionResizeMode(1, QHeaderView.ResizeToContents)
+        self.results.doubleClicked.connect(self._on_dblclicked)
+        main_wrap.addWidget(self.results)
+
+        self.setLayout(main_wrap)
+
+        # queries run once typing pauses
+        self._query_timer = QTimer(self)
+        self._query_timer.setSingleShot(True)
+        self._query_timer.setInterval(200)
+        self._query_timer.timeout.connect(self._refresh)
+
+        self._refresh()
+
+    # ************************************************************************
+    # **************************** Functions *********************************
+    # ************************************************************************
+    def _refresh(self):
+        self._model.removeRows(0, self._model.rowCount())
+        query = self.input.text()
+        count = len(self._index)
+        if not query:
+            self.status_label.setText('{0:,d} strings in {1:d} ranges'.format(count, len(self._index.ranges())))
+            return
+
+        try:
+            results = self._index.search(query, regex=self.regex_check.isChecked(),
+                                         case_sensitive=self.case_check.isChecked(),
+                                         limit=self.MAX_RESULTS + 1)
+        except re.error as e:
+            self.status_label.setText('invalid regex: {0}'.format(e))
+            return
+
+        str_frmt = '0x{0:X}' if self.results.uppercase_hex else '0x{0:x}'
+        for address, kind, text in results[:self.MAX_RESULTS]:
+            addr = QStandardItem(str_frmt.format(address))
+            addr.setTextAlignment(Qt.AlignCenter)
+            self._model.appendRow([addr, QStandardItem(kind), QStandardItem(text)])
+
+        if len(results) > self.MAX_RESULTS:
+            self.status_label.setText('first {0:,d} matches of {1:,d} strings'.format(self.MAX_RESULTS, count))
+        else:
+            self.status_label.setText('{0:,d} matches of {1:,d} strings'.format(len(results), count))
+
+    def _start_indexer(self, indexer):
+        self._index_thread = MemoryDumpThread(indexer, parent=self)
+        self._index_thread.onProgress.connect(self._on_index_progress)
+        self._index_thread.onFinished.connect(self._on_index_finished)
+        self.index_btn.setText('cancel')
+        self.index_dump_btn.setEnabled(False)
+        self._app_window.show_progress('indexing strings...')
+        self._index_thread.start()
+
+    # ************************************************************************
+    # **************************** Handlers **********************************
+    # ************************************************************************
+    def _on_query_changed(self):
+        self._query_timer.start()
+
+    def _on_click_index(self):
+        if self._index_thread is not None:
+            self._index_thread.dump.cancel()
+            return
+
+        dwarf = self._app_window.dwarf
+        if dwarf.snapshot is None and dwarf.pid == 0:
+            utils.show_message_box('attach to a process or open a snapshot first')
+            return
+        # ranges indexed before are skipped
+        self._start_indexer(dwarf.create_string_indexer())
+
+    def _on_click_index_dump(self):
+        file_path, _ = QFileDialog.getOpenFileName(self._app_window, caption='Index dump file')
+        if not file_path:
+            return
+        accept, base = InputDialog.input(self._app_window, hint='base address of the dump', placeholder='0x...')
+        if not accept:
+            return
+        try:
+            indexer = self._app_window.dwarf.create_dump_string_indexer(file_path, utils.parse_ptr(base.strip()))
+        except (OSError, ValueError) as e:
+            utils.show_message_box('unable to index {0}'.format(file_path), str(e))
+            return
+        self._start_indexer(indexer)
+
+    def _on_index_progress(self, value, rate):
+        self._app_window.set_status_text(
+            'indexing strings... {0:d}% - {1:.1f} MB/s'.format(value, rate / (1024 * 1024)))
+
+    def _on_index_finished(self, completed):
+        indexer = self._index_thread.dump
+        self._index_thread = None
+        self.index_btn.setText('index ranges')
+        self.index_dump_btn.setEnabled(True)
+        self._app_window.hide_progress()
+        self._app_window.set_status_text('strings {0} in {1:.2f}s'.format(
+            'indexed' if completed else 'indexing cancelled', indexer.elapsed))
+        self._refresh()
+
+    def _on_dblclicked(self, model_index):
+        item = self._model.item(model_index.row(), 0)
+        if item:
+            self.onShowMemoryRequest.emit(item.text())
@@ -26,7 +26,6 @@ from PyQt5.QtWidgets import (QWidget, QDialog, QLabel, QVBoxLayout,
                              QSizePolicy, QStyle, qApp, QHeaderView, QMenu)
 
 from lib import utils, prefs
-from lib.git import Git
 from ui.widgets.list_view import DwarfListView
 
 
@@ -58,6 +57,9 @@ class DwarfCommitsThread(QThread):
                 self.on_status_text.emit(
                     'error: git not available on your system')
                 return
+
+        # requests is heavy, keep it out of the startup path
+        from lib.git import Git
         _git = Git()
         data = _git.get_dwarf_commits()
         if data is None:
@@ -15,6 +15,8 @@ Dwarf - Copyright (C) 2019 Giovanni Rocca (iGio90)
     along with this program.  If not, see <https://www.gnu.org/licenses/>
 """
 
+import threading
+from collections import OrderedDict
 from math import ceil
 from PyQt5.QtCore import *
 from PyQt5.QtGui import *
@@ -26,51 +28,62 @@ from capstone.arm64_const import *
 from capstone.arm_const import *
 from lib.range import Range
 from lib import utils
+from lib.disassembly import DisassemblyBlocks, MAX_INSTRUCTION_SIZE
 from lib.instruction import Instruction
 
 from lib.prefs import Prefs
 from ui.dialog_input import InputDialog
 
-# TODO: dont diasm again when jump in same range
 
 class DisassembleThread(QThread):
-    onFinished = pyqtSignal(list, name='onFinished')
-    onError = pyqtSignal(str, name='onError')
+    """ decodes the blocks requested by the view, latest request first
+    """
+    onBlockDecoded = pyqtSignal(object, int, name='onBlockDecoded')
 
     def __init__(self, parent=None):
         super().__init__(parent=parent)
-        self._dwarf = None
-        self._range = None
-        self._capstone = None
-        self._max_instructions = 256
-        self._stop_on_ret = True
+        self._pending = []
+        self._lock = threading.Lock()
+        self.finished.connect(self._on_finished)
+
+    def request(self, blocks, index):
+        with self._lock:
+            if (blocks, index) in self._pending:
+                self._pending.remove((blocks, index))
+            self._pending.append((blocks, index))
+        if not self.isRunning():
+            self.start()
+
+    def clear(self):
+        with self._lock:
+            self._pending = []
 
     def run(self):
-        if self._range is None:
-            self.onError.emit('No Range set')
-            self.onFinished.emit([])
-
-        _counter = 0
-        _instructions = []
-        for cap_inst in self._capstone.disasm(self._range.data[self._range.start_offset:], self._range.start_address):
-            if _counter > self._max_instructions:
-                break
-
-            dwarf_instruction = Instruction(self._dwarf, cap_inst)
-            _instructions.append(dwarf_instruction)
+        while True:
+            with self._lock:
+                if not self._pending:
+                    return
+                blocks, index = self._pending.pop()
+            if blocks.block(index) is None:
+                blocks.decode(index)
+            self.onBlockDecoded.emit(blocks, index)
 
-            _counter += 1
+    def _on_finished(self):
+        # requests made while the thread was returning
+        if self._pending:
+            self.start()
 
-            if self._stop_on_ret:
-                if cap_inst.group(CS_GRP_RET):
-                    break
-                if cap_inst.group(ARM64_GRP_RET):
-                    break
 
-        self.onFinished.emit(_instructions)
+class DisassemblyView(QAbstractScrollArea):
+    """ DisassemblyView
 
+        a disassembled range is scrolled as a whole: blocks are decoded on a thread around the
+        viewport, _lines holds the decoded window and the scrollbar maps to the range bytes.
+        without a range, _lines is filled through add_instruction (i.e. by the emulator)
+    """
 
-class DisassemblyView(QAbstractScrollArea):
+    # ranges whose decoded blocks are kept
+    MAX_CACHED_RANGES = 8
 
     onShowMemoryRequest = pyqtSignal(str, int, name='onShowMemoryRequest')
 
@@ -98,11 +111,21 @@ class DisassemblyView(QAbstractScrollArea):
         self._history = []
         self._lines = []
         self._range = None
-        self._max_instructions = 128
         self._longest_bytes = 0
         self._longest_mnemonic = 0
 
         self._running_disasm = False
+        # DisassemblyBlocks of the range shown and of the last ones shown
+        self._blocks = None
+        self._blocks_cache = OrderedDict()
+        # address of the top line, the scrollbar value is its range offset >> _scroll_shift
+        self._top = 0
+        self._scroll_shift = 0
+        self._disasm_thread = DisassembleThread(self)
+        self._disasm_thread.onBlockDecoded.connect(self._on_block_decoded)
+        self.verticalScrollBar().actionTriggered.connect(self._on_scroll_action)
+        self.verticalScrollBar().valueChanged.connect(self._on_scroll_value)
+
         self.capstone_arch = 0
         self.capstone_mode = 0
         self.keystone_arch = 0
@@ -221,53 +244,114 @@ class DisassemblyView(QAbstractScrollArea):
         self._lines.append(instruction)
         self.adjust()
 
-    def disassemble(self, dwarf_range, num_instructions=256, stop_on_ret=True):
-        if self._running_disasm:
+    def disassemble(self, dwarf_range):
+        if dwarf_range.size <= 0:
             return
 
-        self._running_disasm = True
-        self._app_window.show_progress('Disassembling...')
-
-        self._lines.clear()
-        self.viewport().update()
+        if self.capstone_arch == 0:
+            # no context applied yet (i.e. browsing a snapshot)
+            self.on_arch_changed()
 
         if len(self._history) == 0 or self._history[len(self._history) - 1] != dwarf_range.start_address:
             self._history.append(dwarf_range.start_address)
             if len(self._history) > 25:
                 self._history.pop(0)
 
-        self._longest_bytes = 0
         try:
             capstone = Cs(self.capstone_arch, self.capstone_mode)
             capstone.detail = True
         except CsError:
-            self._running_disasm = False
             print('[DisasmView] failed to initialize capstone with %d, %d' % (self.capstone_arch, self.capstone_mode))
             return
 
         self._range = dwarf_range
-        self._max_instructions = num_instructions
-        self.disasm_thread = DisassembleThread(self._app_window)
-        self.disasm_thread._max_instructions = self._max_instructions
-        self.disasm_thread._range = self._range
-        self.disasm_thread._dwarf = self._app_window.dwarf
-        self.disasm_thread._stop_on_ret = stop_on_ret
-        self.disasm_thread._capstone = capstone
-        self.disasm_thread.onFinished.connect(self._on_disasm_finished)
-        self.disasm_thread.start(QThread.HighestPriority)
-
-    def _on_disasm_finished(self, instructions):
-        if isinstance(instructions, list):
-            self._lines = instructions
-            self.adjust()
+        # blocks stay valid as long as the range data does
+        key = (dwarf_range.base, dwarf_range.size, capstone.mode)
+        blocks = self._blocks_cache.pop(key, None)
+        if blocks is None or blocks.data is not dwarf_range.data:
+            blocks = DisassemblyBlocks(self._app_window.dwarf, dwarf_range, capstone)
+        self._blocks_cache[key] = blocks
+        while len(self._blocks_cache) > self.MAX_CACHED_RANGES:
+            self._blocks_cache.popitem(last=False)
+
+        blocks.add_anchor(dwarf_range.start_address)
+        self._blocks = blocks
+        self._disasm_thread.clear()
+        self._lines = []
+        self._longest_bytes = 0
+        self._longest_mnemonic = 0
+        self._top = dwarf_range.start_address
+        self._scroll_shift = 0
+        while (blocks.size >> self._scroll_shift) > 0x7fffffff:
+            self._scroll_shift += 1
+        self.verticalScrollBar().setRange(0, max(0, blocks.size - 1) >> self._scroll_shift)
+        self._set_top(dwarf_range.start_address)
+
+    def _set_top(self, address):
+        """ scroll to the instruction at address (or the first one after), decoding what is missing
+        """
+        blocks = self._blocks
+        self._top = min(max(address, blocks.base), blocks.tail - 1)
+        index = blocks.block_index(self._top)
+        wanted = self._wanted_blocks()
+        missing = [i for i in wanted if blocks.block(i) is None]
+        # the thread takes the latest request first, the top block goes last
+        for i in sorted(missing, key=lambda i: abs(i - index), reverse=True):
+            self._disasm_thread.request(blocks, i)
+
+        first = index - 1 if index > 0 and blocks.block(index - 1) is not None else index
+        self._lines = blocks.instructions(first, wanted[-1])
+        self.pos = blocks.find(self._lines, self._top)
+        if self.pos < len(self._lines):
+            self._top = self._lines[self.pos].address
+
+        running = blocks.block(index) is None
+        if running != self._running_disasm:
+            self._running_disasm = running
+            if running:
+                self._app_window.show_progress('Disassembling...')
+            else:
+                self._app_window.hide_progress()
 
-        self._running_disasm = False
-        self._app_window.hide_progress()
+        bar = self.verticalScrollBar()
+        bar.setPageStep(max(1, (self.visible_lines() * 4) >> self._scroll_shift))
+        bar.setValue(self._scroll_value())
+        self.adjust()
+
+    def _wanted_blocks(self):
+        """ blocks shown from the top line, plus the one before to scroll back and the one after to scroll forward
+        """
+        blocks = self._blocks
+        index = blocks.block_index(self._top)
+        last = blocks.block_index(min(self._top + (self.visible_lines() + 1) * MAX_INSTRUCTION_SIZE, blocks.tail - 1))
+        return range(max(index - 1, 0), min(last + 1, blocks.count - 1) + 1)
 
+    def _scroll_value(self):
+        return (self._top - self._blocks.base) >> self._scroll_shift
+
+    def _scroll_lines(self, count):
+        """ move the top line by count instructions
+        """
+        target = self.pos + count
+        if not self._lines or self._running_disasm:
+            return
+        if target < 0:
+            # the block before is being decoded, the window moves once it's there
+            self._set_top(self._lines[0].address)
+        elif target < len(self._lines):
+            self._set_top(self._lines[target].address)
+        else:
+            last = self._lines[-1]
+            following = last.address + len(last.bytes)
+            self._set_top(following if following < self._blocks.tail else last.address)
 
     def resizeEvent(self, event):
         super().resizeEvent(event)
-        self.adjust()
+        if self._blocks is not None:
+            # more lines may need more blocks
+            self._set_top(self._top)
+        else:
+            self.adjust()
 
     def adjust(self):
         for line in self._lines:
@@ -276,8 +360,9 @@ class DisassemblyView(QAbstractScrollArea):
                     self._longest_bytes = len(line.bytes)
                 if len(line.mnemonic) > self._longest_mnemonic:
                     self._longest_mnemonic = len(line.mnemonic)
-        self.verticalScrollBar().setRange(0, len(self._lines) - self.visible_lines() + 1)
-        self.verticalScrollBar().setPageStep(self.visible_lines())
+        if self._blocks is None:
+            self.verticalScrollBar().setRange(0, len(self._lines) - self.visible_lines() + 1)
+            self.verticalScrollBar().setPageStep(self.visible_lines())
         self.viewport().update()
 
     def visible_lines(self):
@@ -554,7 +639,8 @@ class DisassemblyView(QAbstractScrollArea):
         if not self._lines:
             return
 
-        self.pos = self.verticalScrollBar().value()
+        if self._blocks is None:
+            self.pos = self.verticalScrollBar().value()
 
         # fill background
         painter.fillRect(0, 0, self.viewport().width(), self.viewport().height(), self._ctrl_colors['background'])
@@ -631,6 +717,41 @@ class DisassemblyView(QAbstractScrollArea):
                 self.keystone_arch = ks.KS_ARCH_X86
                 self.keystone_mode = ks.KS_MODE_64
 
+    def wheelEvent(self, event):
+        if self._blocks is None:
+            return super().wheelEvent(event)
+        if event.angleDelta().y() == 0:
+            return
+        # the scrollbar steps are bytes, the wheel steps are lines
+        steps = -event.angleDelta().y() / 120
+        self._scroll_lines(int(steps * QApplication.wheelScrollLines()) or (1 if steps > 0 else -1))
+
+    def _on_scroll_action(self, action):
+        if self._blocks is None:
+            return
+        lines = {
+            QAbstractSlider.SliderSingleStepAdd: 1,
+            QAbstractSlider.SliderSingleStepSub: -1,
+            QAbstractSlider.SliderPageStepAdd: self.visible_lines() - 1,
+            QAbstractSlider.SliderPageStepSub: 1 - self.visible_lines(),
+        }.get(action)
+        if lines is not None:
+            self._scroll_lines(lines)
+            # the scrollbar applies the slider position once this returns
+            self.verticalScrollBar().setSliderPosition(self._scroll_value())
+
+    def _on_scroll_value(self, value):
+        if self._blocks is None or value == self._scroll_value():
+            return
+        # dragged, the top line syncs to the instruction at the offset
+        self._set_top(self._blocks.base + (value << self._scroll_shift))
+
+    def _on_block_decoded(self, blocks, index):
+        if blocks is not self._blocks:
+            return
+        if index in self._wanted_blocks():
+            self._set_top(self._top)
+
     def mouseDoubleClickEvent(self, event):
         loc_x = event.pos().x()
         loc_y = event.pos().y()
@@ -741,6 +862,9 @@ class DisassemblyView(QAbstractScrollArea):
 
         if self._app_window.dwarf.arch == 'arm':
             self._lines.clear()
+            if self._blocks is not None:
+                # stay where we are
+                self._range.set_start_offset(self._top - self._range.base)
 
             if self.capstone_mode == CS_MODE_ARM:
                 self.capstone_mode = CS_MODE_THUMB
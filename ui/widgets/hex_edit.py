@@ -15,6 +15,7 @@ Dwarf - Copyright (C) 2019 Giovanni Rocca (iGio90)
     along with this program.  If not, see <https://www.gnu.org/licenses/>
 """
 
+import functools
 import sys
 from math import ceil, floor
 
@@ -28,7 +29,7 @@ from PyQt5.QtWidgets import (QAbstractScrollArea, QMenu)
 
 from ui.dialog_input import InputDialog
 from lib import utils
-from lib.range import Range
+from lib.range import Range, RangeData
 
 # pylint: disable=too-many-lines
 # pylint: disable=too-many-statements
@@ -248,6 +249,11 @@ class HexEditor(QAbstractScrollArea):
 
     # pylint: disable=too-many-instance-attributes
 
+    # bytes fetched around the visible lines of a lazy range
+    READ_AHEAD = 16 * RangeData.PAGE_SIZE
+    # highlights are looked up for each painted byte, don't let a big diff flood them
+    MAX_DIFF_HIGHLIGHTS = 4096
+
     selectionChanged = pyqtSignal(name='selectionChanged')
     viewChanged = pyqtSignal(name='viewChanged')
     dataChanged = pyqtSignal(int, int, name='dataChanged')
@@ -283,13 +289,16 @@ class HexEditor(QAbstractScrollArea):
             'patched': QColor('#ff5722'),
             'string': QColor('#8bc34a'),
             'pointer': QColor('#ff9900'),
-            'search': QColor('#fc3')
+            'search': QColor('#fc3'),
+            'diff': QColor('#ab47bc')
         }
 
         self.app = app
 
         self.range = None
         self.data = None
+        # pages of a lazy range being fetched
+        self._pending_pages = set()
 
         self.base = 0
 
@@ -576,16 +585,62 @@ class HexEditor(QAbstractScrollArea):
 
     def get_lines(self, pos=0):
         """ get bytes from data
+            ascii is None for the lines of a lazy range which aren't loaded yet
         """
         if self.data is None:
             return None
 
         while pos < len(self.data) - self._bytes_per_line:
             yield (pos, self._bytes_per_line,
-                   self.to_ascii(self.data[pos:pos + self._bytes_per_line]))
+                   self._line_ascii(pos, pos + self._bytes_per_line))
             pos += self._bytes_per_line
 
-        yield (pos, len(self.data) - pos, self.to_ascii(self.data[pos:]))
+        yield (pos, len(self.data) - pos, self._line_ascii(pos, len(self.data)))
+
+    def _line_ascii(self, start, end):
+        if isinstance(self.data, RangeData) and not self.data.is_loaded(start, end):
+            return None
+        return self.to_ascii(self.data[start:end])
+
+    def _load_visible_pages(self):
+        """ fetch the missing pages of a lazy range around what's displayed, off the ui thread
+        """
+        if not isinstance(self.data, RangeData):
+            return
+
+        start = self.pos - HexEditor.READ_AHEAD
+        end = self.pos + self.visible_lines() * self._bytes_per_line + HexEditor.READ_AHEAD
+        runs = []
+        for offset, length in self.data.missing(start, end):
+            for page in range(offset, offset + length, self.data.page_size):
+                if page in self._pending_pages:
+                    continue
+                self._pending_pages.add(page)
+                page_length = min(self.data.page_size, offset + length - page)
+                if runs and runs[-1][0] + runs[-1][1] == page:
+                    runs[-1][1] += page_length
+                else:
+                    runs.append([page, page_length])
+
+        for offset, length in runs:
+            self.app.dwarf.call_async(
+                functools.partial(self.data.fetch, offset, length),
+                callback=functools.partial(self._on_pages_loaded, self.data, offset, length))
+
+    def _on_pages_loaded(self, data, offset, length, readable):
+        if data is not self.data:
+            return
+        for page in range(offset, offset + length, data.page_size):
+            self._pending_pages.discard(page)
+        self.viewport().update()
+
+    def _write_data(self, offset, bytes_):
+        if isinstance(self.data, RangeData):
+            self.data[offset:offset + len(bytes_)] = bytes_
+        else:
+            data_bt = bytearray(self.data)
+            data_bt[offset:offset + len(bytes_)] = bytes_
+            self.data = bytes(data_bt)
 
     def get_bytes(self, count=1):
         """ get bytes from data
@@ -805,9 +860,7 @@ class HexEditor(QAbstractScrollArea):
             return
 
         # change byte in data
-        data_bt = bytearray(self.data)
-        data_bt[self.caret.position] = _byte
-        self.data = bytes(data_bt)
+        self._write_data(self.caret.position, bytes([_byte]))
 
         # emit datachanged
         self.dataChanged.emit(self.caret.position, 1)
@@ -881,6 +934,18 @@ class HexEditor(QAbstractScrollArea):
         if highlight.what == 'changed' or highlight.what == 'attention':
             self._highlight_timer.start()
 
+    def set_diff(self, changes):
+        """ highlights the bytes of a MemoryDiff (list of PageChange), replacing the previous ones
+        """
+        self._highlights = [x for x in self._highlights if x.what != 'diff']
+        for change in changes:
+            for address, length in change.changed_runs():
+                if len(self._highlights) >= HexEditor.MAX_DIFF_HIGHLIGHTS:
+                    break
+                self._highlights.append(HighLight('diff', address, length))
+        self.viewChanged.emit()
+        self.viewport().update()
+
     def _clear_highlights(self):
         """ handles temporary highlights
             'changed', 'attention'
@@ -1003,6 +1068,7 @@ class HexEditor(QAbstractScrollArea):
         """ Set new Data
         """
         self.data = data
+        self._pending_pages = set()
         self.adjust()
         self.viewChanged.emit()
 
@@ -1460,12 +1526,7 @@ class HexEditor(QAbstractScrollArea):
         else:
             start_loc = start
 
-        data_bt = bytearray(self.data)
-
-        for i in range(start_loc, start_loc + count):
-            data_bt[i] = byte
-
-        self.data = bytes(data_bt)
+        self._write_data(start_loc, bytes([byte]) * count)
         self.add_highlight(HighLight('edited', start_loc + self.base, count))
         self.dataChanged.emit(start_loc, count)
         self.viewChanged.emit()
@@ -1796,6 +1857,7 @@ class HexEditor(QAbstractScrollArea):
                 return
 
         self.pos = self.verticalScrollBar().value() * self._bytes_per_line
+        self._load_visible_pages()
 
         # set pos_y
         drawing_pos_y = self._header_height + self._char_height + self._ver_spacing
@@ -1822,7 +1884,10 @@ class HexEditor(QAbstractScrollArea):
 
             # get data
             (address, length, ascii_) = line
-            data = self.data[address:address + length]
+            if ascii_ is None:
+                data = None
+            else:
+                data = self.data[address:address + length]
 
             # fixup offset
             address += self.base
@@ -1851,6 +1916,14 @@ class HexEditor(QAbstractScrollArea):
             painter.drawText(rect, addr.format(address),
                              QTextOption(Qt.AlignHCenter | Qt.AlignBaseline))
 
+            if data is None:
+                # placeholder until the page is loaded
+                painter.setPen(self._ctrl_colors['foreground'])
+                painter.drawText(self._hex_start, drawing_pos_y, '?? ' * length)
+                painter.drawText(self._ascii_start, drawing_pos_y, ' ' * length)
+                drawing_pos_y += self._char_height + self._ver_spacing
+                continue
+
             drawing_pos_x = self._hex_start
             is_in_selection = False
 
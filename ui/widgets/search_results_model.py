@@ -0,0 +1,202 @@
+"""
+Dwarf - Copyright (C) 2019 Giovanni Rocca (iGio90)
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>
+"""
+from array import array
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer, pyqtSignal
+
+
+class SearchResultsModel(QAbstractTableModel):
+    """ SearchResultsModel
+
+        search hits kept as arrays of addresses and pattern indexes, a row becomes text only when
+        the view paints it. sorting and filtering work on an array of row indexes
+
+        symbol and preview are looked up for the painted rows only: onLookupRequest carries the
+        addresses missing them, answered with set_details
+    """
+
+    COLUMNS = ('Address', 'Pattern', 'Symbol', 'Preview')
+    ADDRESS, PATTERN, SYMBOL, PREVIEW = range(4)
+
+    # rows appended while sorted or filtered are merged at most this often
+    REFRESH_INTERVAL = 500
+
+    onLookupRequest = pyqtSignal(list, name='onLookupRequest')
+
+    def __init__(self, patterns, uppercase_hex=True, parent=None):
+        super(SearchResultsModel, self).__init__(parent)
+        # texts of the patterns, indexed by the hits
+        self._patterns = patterns
+        self._str_frmt = '0x{0:X}' if uppercase_hex else '0x{0:x}'
+
+        self._addresses = array('Q')
+        self._pattern_ids = array('H')
+
+        # shown rows as indexes in the arrays, None while unsorted and unfiltered
+        self._rows = None
+        self._sort_column = -1
+        self._sort_order = Qt.AscendingOrder
+        self._filter = ''
+
+        # address -> (symbol, preview)
+        self._details = {}
+        self._wanted = set()
+        self._requested = set()
+
+        self._lookup_timer = QTimer(self)
+        self._lookup_timer.setSingleShot(True)
+        self._lookup_timer.setInterval(50)
+        self._lookup_timer.timeout.connect(self._request_lookup)
+
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setSingleShot(True)
+        self._refresh_timer.setInterval(self.REFRESH_INTERVAL)
+        self._refresh_timer.timeout.connect(self._update_rows)
+
+    def __len__(self):
+        return len(self._addresses)
+
+    # ************************************************************************
+    # **************************** Functions *********************************
+    # ************************************************************************
+    def append(self, addresses, pattern_id):
+        """ hits of pattern_id
+        """
+        if not addresses:
+            return
+        if self._rows is not None:
+            self._addresses.extend(addresses)
+            self._pattern_ids.extend([pattern_id] * len(addresses))
+            if not self._refresh_timer.isActive():
+                self._refresh_timer.start()
+            return
+
+        count = len(self._addresses)
+        self.beginInsertRows(QModelIndex(), count, count + len(addresses) - 1)
+        self._addresses.extend(addresses)
+        self._pattern_ids.extend([pattern_id] * len(addresses))
+        self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self._addresses = array('Q')
+        self._pattern_ids = array('H')
+        self._rows = None if self._sort_column < 0 and not self._filter else array('L')
+        self._details.clear()
+        self._wanted.clear()
+        self._requested.clear()
+        self.endResetModel()
+
+    def address(self, row):
+        return self._addresses[self._index(row)]
+
+    def set_details(self, details):
+        """ {address: (symbol, preview)} looked up for onLookupRequest
+        """
+        self._details.update(details)
+        self._requested.difference_update(details)
+        if self.rowCount() and details:
+            self.dataChanged.emit(self.index(0, self.SYMBOL), self.index(self.rowCount() - 1, self.PREVIEW))
+
+    def set_filter(self, text):
+        """ keep the rows whose address or pattern contains text
+        """
+        self._filter = text.strip().lower()
+        self._update_rows()
+
+    def _index(self, row):
+        if self._rows is None:
+            return row
+        return self._rows[row]
+
+    def _update_rows(self):
+        self._refresh_timer.stop()
+        self.beginResetModel()
+        if self._sort_column < 0 and not self._filter:
+            self._rows = None
+        else:
+            rows = range(len(self._addresses))
+            if self._filter:
+                text = self._filter
+                patterns = set(i for i, pattern in enumerate(self._patterns) if text in pattern.lower())
+                addresses, pattern_ids = self._addresses, self._pattern_ids
+                rows = [i for i in rows if pattern_ids[i] in patterns or text in '0x{0:x}'.format(addresses[i])]
+            if self._sort_column == self.PATTERN:
+                key = lambda i: (self._pattern_ids[i], self._addresses[i])
+            else:
+                key = self._addresses.__getitem__
+            if self._sort_column >= 0:
+                rows = sorted(rows, key=key, reverse=self._sort_order == Qt.DescendingOrder)
+            self._rows = array('L', rows)
+        self.endResetModel()
+
+    def _request_lookup(self):
+        addresses = sorted(self._wanted - self._requested)
+        self._wanted.clear()
+        if addresses:
+            self._requested.update(addresses)
+            self.onLookupRequest.emit(addresses)
+
+    # ************************************************************************
+    # **************************** Model *************************************
+    # ************************************************************************
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        if self._rows is None:
+            return len(self._addresses)
+        return len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        i = self._index(index.row())
+        column = index.column()
+        if role == Qt.DisplayRole:
+            address = self._addresses[i]
+            if column == self.ADDRESS:
+                return self._str_frmt.format(address)
+            if column == self.PATTERN:
+                return self._patterns[self._pattern_ids[i]]
+            details = self._details.get(address)
+            if details is None:
+                self._wanted.add(address)
+                if not self._lookup_timer.isActive():
+                    self._lookup_timer.start()
+                return ''
+            return details[column - self.SYMBOL]
+        if role == Qt.TextAlignmentRole and column == self.ADDRESS:
+            return Qt.AlignCenter
+        if role == Qt.UserRole:
+            return self._addresses[i]
+        return None
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        # symbol and preview are not known for every row, they sort by address
+        self._sort_column = column if column == self.PATTERN else self.ADDRESS
+        self._sort_order = order
+        self._update_rows()